@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+bench_contacts.py
+Benchmark extract_contacts_from_html on a corpus of real pages, comparing the
+tiered extractor with the run-every-pass path and checking both give the same output.
+
+Pages come from the on-disk page cache that main.py fills (--cache-dir) and/or a
+directory of saved .html files.
+
+Usage:
+  python -m benchmarks.bench_contacts --cache-dir .cache/pages
+  python -m benchmarks.bench_contacts --html-dir saved_pages/ --repeat 5
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import time
+import zlib
+
+from modules.contact_extractor import extract_contacts_from_html
+
+
+def load_corpus(html_dir=None, cache_dir=None, limit=None):
+    """Return a list of (url, html) pairs."""
+    pages = []
+    if html_dir:
+        for path in sorted(glob.glob(os.path.join(html_dir, '**', '*.htm*'), recursive=True)):
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                pages.append((os.path.basename(path), f.read()))
+    if cache_dir:
+        db_path = os.path.join(cache_dir, 'pages.sqlite')
+        if os.path.exists(db_path):
+            db = sqlite3.connect(db_path)
+            for url, body in db.execute('SELECT url, body FROM pages'):
+                pages.append((url, zlib.decompress(body).decode('utf-8', errors='replace')))
+            db.close()
+    return pages[:limit] if limit else pages
+
+
+def run(pages, tiered, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for url, html in pages:
+            extract_contacts_from_html(html, base_url=url, tiered=tiered)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--html-dir', help='Directory of saved .html pages')
+    p.add_argument('--cache-dir', default='.cache/pages', help='Page cache directory filled by main.py')
+    p.add_argument('--limit', type=int, help='Use at most this many pages')
+    p.add_argument('--repeat', type=int, default=3, help='Timed passes per mode (best is reported)')
+    args = p.parse_args()
+
+    pages = load_corpus(args.html_dir, args.cache_dir, args.limit)
+    if not pages:
+        print("No pages found; run main.py once to fill the page cache or pass --html-dir.")
+        return
+    total_mb = sum(len(h) for _, h in pages) / 1e6
+
+    mismatches = [url for url, html in pages
+                  if extract_contacts_from_html(html, url, tiered=True) != extract_contacts_from_html(html, url, tiered=False)]
+
+    print(f"{len(pages)} pages, {total_mb:.1f} MB")
+    results = {}
+    for label, tiered in (('all passes', False), ('tiered', True)):
+        secs = run(pages, tiered, args.repeat)
+        results[label] = secs
+        print(f"{label:>11}: {secs:.3f}s  {len(pages) / secs:8.1f} pages/s  {1000 * secs / len(pages):7.2f} ms/page")
+    print(f"    speedup: {results['all passes'] / results['tiered']:.2f}x")
+    print(f" mismatches: {len(mismatches)}" + (f" (e.g. {mismatches[0]})" if mismatches else ''))
+
+
+if __name__ == '__main__':
+    main()
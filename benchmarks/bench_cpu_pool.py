@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+bench_cpu_pool.py
+Throughput of the parse / extract / structural-analysis step (modules.cpu_pool.process_page)
+on a fixed HTML corpus: serially, on N threads (GIL-bound) and on a pool of N processes.
+
+The default corpus is synthetic and deterministic (--pages pages of roughly --kb KB, with
+contacts, obfuscated emails, JSON-LD and images), so numbers are comparable between
+machines and commits. Pages saved by main.py's page cache or a directory of .html files
+can be used instead.
+
+Usage:
+  python -m benchmarks.bench_cpu_pool
+  python -m benchmarks.bench_cpu_pool --workers 1 2 4 8 --pages 400
+  python -m benchmarks.bench_cpu_pool --cache-dir .cache/pages
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.cpu_pool import CPUPool, process_page
+
+WORDS = ("plumbing heating repair emergency service licensed insured family owned local estimates "
+         "water heater drain cleaning boiler installation maintenance commercial residential").split()
+
+
+def synthetic_page(i, kb, rng):
+    domain = f"business{i}.example.com"
+    parts = [f"<html><head><title>Business {i}</title>",
+             '<script type="application/ld+json">' + json.dumps({
+                 '@context': 'https://schema.org', '@type': 'LocalBusiness', 'name': f"Business {i}",
+                 'telephone': f"+1-555-{i % 1000:03d}-{rng.randint(1000, 9999)}",
+                 'email': f"office@{domain}"}) + '</script>',
+             '</head><body><nav>' + ''.join(f'<a href="/p{j}">Page {j}</a>' for j in range(15)) + '</nav>',
+             f'<h1>Business {i}</h1>']
+    size = sum(map(len, parts))
+    j = 0
+    while size < kb * 1024:
+        text = ' '.join(rng.choice(WORDS) for _ in range(60))
+        block = f'<section><h2>Section {j}</h2><p>{text}</p><img src="/img{j}.jpg"></section>'
+        if j % 7 == 3:
+            block += f'<p>Write to info [at] {domain} [dot] com or call (555) 010-{j:04d}</p>'
+        parts.append(block)
+        size += len(block)
+        j += 1
+    parts.append(f'<footer><a href="mailto:hello@{domain}">hello@{domain}</a></footer></body></html>')
+    return f"https://{domain}/", ''.join(parts)
+
+
+def load_pages(args):
+    if args.html_dir or args.cache_dir:
+        from benchmarks.bench_contacts import load_corpus
+        pages = load_corpus(args.html_dir, args.cache_dir, args.pages)
+        if pages:
+            return pages
+        print("No cached pages found; using the synthetic corpus")
+    rng = random.Random(0)
+    return [synthetic_page(i, args.kb, rng) for i in range(args.pages)]
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--pages', type=int, default=200, help='Pages in the corpus')
+    p.add_argument('--kb', type=int, default=80, help='Approximate size of each synthetic page')
+    p.add_argument('--workers', type=int, nargs='+', help='Thread / process counts to try (default: 1, 2, 4 ... cores)')
+    p.add_argument('--html-dir', help='Directory of saved .html pages instead of the synthetic corpus')
+    p.add_argument('--cache-dir', help='Page cache directory filled by main.py instead of the synthetic corpus')
+    args = p.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({1, *[n for n in (2, 4, 8, 16) if n <= cores], cores})
+    pages = [(url, html.encode('utf-8')) for url, html in load_pages(args)]
+    total_mb = sum(len(data) for _, data in pages) / 1e6
+    print(f"{len(pages)} pages, {total_mb:.1f} MB, {cores} core(s)")
+
+    process_page(pages[0][1], pages[0][0])  # import everything before timing
+    baseline = timed(lambda: [process_page(data, url) for url, data in pages])
+    print(f"{'serial':>14}: {len(pages) / baseline:8.1f} pages/s")
+
+    for n in workers:
+        with ThreadPoolExecutor(n) as ex:
+            secs = timed(lambda: list(ex.map(lambda page: process_page(page[1], page[0]), pages)))
+        print(f"{f'threads x{n}':>14}: {len(pages) / secs:8.1f} pages/s  ({baseline / secs:.2f}x)")
+
+        start = time.perf_counter()
+        pool = CPUPool(n)
+        # Warm every worker up (process start + imports) so the timing is steady-state throughput
+        with ThreadPoolExecutor(n) as ex:
+            list(ex.map(lambda page: pool.analyze({'html': page[1], 'final_url': page[0]}), pages[:n]))
+        startup = time.perf_counter() - start
+        with ThreadPoolExecutor(n) as ex:
+            secs = timed(lambda: list(ex.map(lambda page: pool.analyze({'html': page[1], 'final_url': page[0]}), pages)))
+        pool.close()
+        print(f"{f'processes x{n}':>14}: {len(pages) / secs:8.1f} pages/s  ({baseline / secs:.2f}x, "
+              f"pool start {startup:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+bench_render.py
+Email rendering throughput: generate_email() one lead at a time, the
+generate_emails() batch API, and the shared sanitizer on its own.
+
+Contexts are synthetic leads shaped like the ones main.py builds (lead, contacts,
+pain_text, domain), with a mix of clean text and placeholder / AI-phrase noise.
+
+Usage:
+  python -m benchmarks.bench_render
+  python -m benchmarks.bench_render --leads 5000 --repeat 5
+"""
+import argparse
+import os
+import random
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAINS = [
+    "The website does not use a secure SSL certificate (HTTPS), which can harm user trust and SEO rankings.",
+    "The website appears to be missing a mobile viewport tag, suggesting it may not be mobile-friendly.",
+    "Found 12 images without descriptive 'alt' text, which negatively impacts SEO and accessibility.",
+    "As an AI language model, I noticed the site lacks a clear call-to-action on the homepage.",
+    "Contact information is difficult to locate, buried in the footer [Company].",
+    "There is no mention of emergency services or {response times}, a key selling point in this industry.",
+]
+
+
+def make_contexts(n, seed=0):
+    rng = random.Random(seed)
+    contexts = []
+    for i in range(n):
+        domain = f"business{i}.example.com"
+        jsonld = [{'name': f"Owner {i}"}] if rng.random() < 0.3 else []
+        contexts.append({
+            'lead': {'url': f"https://{domain}/", 'title': f"Business {i} <Plumbing>" if i % 7 == 0 else f"Business {i}"},
+            'contacts': {'emails': [f"info@{domain}"], 'jsonld': jsonld},
+            'pain_text': '\n- '.join(rng.sample(PAINS, rng.randint(1, 5))),
+            'domain': domain,
+        })
+    return contexts
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--leads', type=int, default=2000, help='Contexts rendered per pass')
+    p.add_argument('--repeat', type=int, default=3, help='Timed passes (best is reported)')
+    args = p.parse_args()
+
+    os.chdir(ROOT)  # the Jinja loader resolves templates/ against the working directory
+    from modules.email_generator import generate_email, generate_emails
+    from modules.sanitizer import sanitize
+
+    contexts = make_contexts(args.leads)
+    single = [generate_email(c) for c in contexts]
+    assert generate_emails(contexts) == single, "batch and single renders differ"
+    bodies = [body for _, body in single]
+
+    results = [
+        ('generate_email', best_of(args.repeat, lambda: [generate_email(c) for c in contexts])),
+        ('generate_emails', best_of(args.repeat, lambda: generate_emails(contexts))),
+        ('sanitize', best_of(args.repeat, lambda: [sanitize(b, placeholder_lines=True) for b in bodies])),
+    ]
+    print(f"{args.leads} leads, best of {args.repeat}")
+    for label, secs in results:
+        print(f"{label:>16}: {args.leads / secs:10.0f} /s  ({1e6 * secs / args.leads:7.1f} us each)")
+
+
+if __name__ == '__main__':
+    main()
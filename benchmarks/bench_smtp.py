@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+bench_smtp.py
+Throughput of modules.sender against a local SMTP stand-in (aiosmtpd), comparing a
+new connection per message (the old behaviour) with SMTPPool session reuse.
+
+The stand-in accepts everything and discards it; --latency adds a delay to each
+SMTP command reply to mimic a real server's round trips, which is where reuse pays off.
+
+Usage:
+  pip install aiosmtpd
+  python -m benchmarks.bench_smtp --messages 500 --connections 1 4
+  python -m benchmarks.bench_smtp --latency 20
+"""
+import argparse
+import asyncio
+import smtplib
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.sender import SMTPPool, build_message
+
+
+class _Sink:
+    def __init__(self, latency):
+        self.latency = latency
+        self.received = 0
+
+    async def _wait(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await self._wait()
+        session.host_name = hostname
+        return responses
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options):
+        await self._wait()
+        envelope.mail_from = address
+        return '250 OK'
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        await self._wait()
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        await self._wait()
+        self.received += 1
+        return '250 Message accepted for delivery'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _messages(n):
+    return [build_message(f"lead{i}@example.com", f"Hello {i}", f"<p>Message {i}</p>", is_html=True)
+            for i in range(n)]
+
+
+def per_message(host, port, msgs):
+    """The old path: connect, EHLO, send, QUIT for every message."""
+    for msg in msgs:
+        with smtplib.SMTP(host, port, timeout=30) as s:
+            s.ehlo()
+            s.send_message(msg)
+
+
+def pooled(host, port, msgs, connections):
+    # The aiosmtpd sink speaks plain SMTP and takes no credentials
+    pool = SMTPPool(host, port, size=connections, max_messages=10 ** 9, starttls=False)
+    with ThreadPoolExecutor(connections) as ex:
+        list(ex.map(pool.send, msgs))
+    pool.close()
+    return pool.snapshot()
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--messages', type=int, default=300, help='Messages per scenario')
+    p.add_argument('--connections', type=int, nargs='+', default=[1, 4], help='Pool sizes to try')
+    p.add_argument('--latency', type=float, default=0.0, help='Milliseconds added to each server reply')
+    args = p.parse_args()
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        raise SystemExit("aiosmtpd is not installed: pip install aiosmtpd")
+
+    sink = _Sink(args.latency / 1000.0)
+    host, port = '127.0.0.1', _free_port()
+    controller = Controller(sink, hostname=host, port=port)
+    controller.start()
+    msgs = _messages(args.messages)
+    try:
+        scenarios = [('connection per message', lambda: per_message(host, port, msgs))]
+        for n in args.connections:
+            scenarios.append((f"pool, {n} connection{'s' if n > 1 else ''}", lambda n=n: pooled(host, port, msgs, n)))
+        baseline = None
+        print(f"{args.messages} messages, {args.latency:g} ms server latency")
+        for label, run in scenarios:
+            before = sink.received
+            start = time.perf_counter()
+            stats = run()
+            secs = time.perf_counter() - start
+            rate = args.messages / secs
+            baseline = baseline or rate
+            extra = f"  connects={stats['connects']}" if stats else ''
+            print(f"{label:>24}: {rate:8.1f} msg/s  ({secs:.2f}s, {rate / baseline:.1f}x){extra}")
+            assert sink.received - before == args.messages, "server did not receive every message"
+    finally:
+        controller.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+bench_startup.py
+Measure how long the CLI takes to start, so import-time regressions show up.
+
+Two scenarios, each run in a fresh interpreter:
+  - help     `python main.py --help`
+  - dry-run  `python main.py --url-file urls.txt --dry-run` on a few pages served
+             from local HTTP servers (no network, no OpenAI key, empty caches).
+             Each page gets its own loopback address (127.0.0.2, 127.0.0.3, ...)
+             because leads on one host are deduplicated into a single site;
+             where only 127.0.0.1 exists (macOS) fewer pages may be distinct,
+             and the reported page count is the number actually processed.
+
+For each it reports the best and median wall time. For --help it also runs
+`python -X importtime` and lists the slowest top-level imports.
+
+Usage:
+  python -m benchmarks.bench_startup
+  python -m benchmarks.bench_startup --repeat 10 --top 15 --json startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from modules.url_index import site_key
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, 'main.py')
+
+PAGE = """<!doctype html>
+<html><head><title>Example Plumbing</title><meta name="viewport" content="width=device-width"></head>
+<body><h1>Example Plumbing</h1><p>Emergency repairs. Call us or email
+<a href="mailto:office@example.com">office@example.com</a>.</p></body></html>
+"""
+
+
+def serve_pages(site, pages):
+    """Start one server per page on distinct loopback hosts; returns (servers, lead URLs)."""
+    handler = partial(_QuietHandler, directory=site)
+    servers = []
+    for i in range(min(pages, 253)):
+        try:
+            servers.append(ThreadingHTTPServer((f"127.0.0.{i + 2}", 0), handler))
+        except OSError:
+            break  # no 127.0.0.0/8 beyond 127.0.0.1 on this system
+    if not servers:
+        servers.append(ThreadingHTTPServer(('127.0.0.1', 0), handler))
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    hosts = [f"{host}:{port}" for host, port in (srv.server_address[:2] for srv in servers)]
+    if len(servers) == 1:
+        hosts.append(f"localhost:{servers[0].server_address[1]}")
+    return servers, [f"http://{hosts[i % len(hosts)]}/index.html" for i in range(pages)]
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _env():
+    env = dict(os.environ)
+    env['OPENAI_API_KEY'] = ''
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def timed_runs(cmd, cwd, repeat):
+    """Wall-clock seconds for `repeat` runs of `cmd`."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=cwd, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        times.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(cmd)} exited {proc.returncode}:\n{proc.stderr.decode(errors='replace')[-2000:]}")
+    return times
+
+
+def import_profile(cmd, cwd):
+    """Run `cmd` under -X importtime; return (total_us, [(cumulative_us, module)]) for top-level imports."""
+    proc = subprocess.run([cmd[0], '-X', 'importtime'] + cmd[1:], cwd=cwd, env=_env(),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    top = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        if not name.startswith(' ' * 2):  # top level: one leading space, no nesting indent
+            top.append((int(cumulative), name.strip()))
+    return sum(us for us, _ in top), sorted(top, reverse=True)
+
+
+def summarize(times):
+    return {'best_s': round(min(times), 4), 'median_s': round(statistics.median(times), 4), 'runs': len(times)}
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--repeat', type=int, default=5, help='Runs per scenario')
+    p.add_argument('--pages', type=int, default=3, help='URLs in the dry-run lead file')
+    p.add_argument('--top', type=int, default=10, help='Slowest top-level imports to list')
+    p.add_argument('--json', help='Also write the results to this JSON file')
+    args = p.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='bench_startup_') as work:
+        site = os.path.join(work, 'site')
+        os.makedirs(site)
+        with open(os.path.join(site, 'index.html'), 'w', encoding='utf-8') as f:
+            f.write(PAGE)
+        shutil.copytree(os.path.join(ROOT, 'templates'), os.path.join(work, 'templates'))
+
+        servers, urls = serve_pages(site, args.pages)
+        with open(os.path.join(work, 'urls.txt'), 'w') as f:
+            f.writelines(url + '\n' for url in urls)
+        # What main.py will actually fetch once duplicate sites are dropped
+        pages = len({site_key(url) for url in urls})
+        if pages < args.pages:
+            print(f"Only {pages} distinct local hosts available; timing {pages} page(s), not {args.pages}",
+                  file=sys.stderr)
+
+        help_cmd = [sys.executable, MAIN, '--help']
+        total_us, top = import_profile(help_cmd, work)
+        results['help'] = summarize(timed_runs(help_cmd, work, args.repeat))
+        results['help']['import_ms'] = round(total_us / 1000, 1)
+        results['help']['slowest_imports'] = [{'module': m, 'ms': round(us / 1000, 1)} for us, m in top[:args.top]]
+
+        dry_times = []
+        for i in range(args.repeat):
+            # fresh state every run: no processed-URL log, no caches
+            run_dir = os.path.join(work, f'run{i}')
+            os.makedirs(run_dir)
+            os.symlink(os.path.join(work, 'templates'), os.path.join(run_dir, 'templates'))
+            dry_cmd = [sys.executable, MAIN, '--url-file', os.path.join(work, 'urls.txt'), '--dry-run',
+                       '--no-robots', '--cache-dir', os.path.join(run_dir, '.cache')]
+            dry_times.extend(timed_runs(dry_cmd, run_dir, 1))
+        results['dry_run'] = summarize(dry_times)
+        results['dry_run']['pages'] = pages
+        for server in servers:
+            server.shutdown()
+
+    for name in ('help', 'dry_run'):
+        r = results[name]
+        print(f"{name:>8}: best {r['best_s']:.3f}s  median {r['median_s']:.3f}s  ({r['runs']} runs)")
+    print(f"   imports for --help: {results['help']['import_ms']:.1f} ms")
+    for item in results['help']['slowest_imports']:
+        print(f"     {item['ms']:8.1f} ms  {item['module']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
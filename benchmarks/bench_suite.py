@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+bench_suite.py
+Microbenchmarks for the hot per-page and per-email functions, run on the
+checked-in synthetic corpus (benchmarks/corpus/, see make_corpus.py) and
+compared against a stored baseline (benchmarks/baseline.json).
+
+Cases:
+  contacts/<page>         extract_contacts_from_html
+  structural/<page>       check_structural_points
+  ai_prep/<page>          prepare_ai_input, the page-text preparation analyze_content_with_ai does
+                          before any OpenAI call
+  parse_embedded_json     lead_discovery.parse_embedded_json on the Maps results page
+  sanitize                email_generator._sanitize_text on rendered bodies
+  generate_email          generate_email on synthetic lead contexts
+
+Each case is timed per call as the best of --repeat runs of enough calls to
+fill --min-time (and at least MIN_CALLS), after two warm-up calls, with garbage
+collection off (like timeit). The whole set runs
+in --processes fresh worker processes and the median of their results is
+reported: a single process can be consistently 10-30% fast or slow (memory
+layout, a noisy neighbour), which would otherwise read as a change. The
+spread between processes, (max - min) / median, is recorded with each case.
+
+Results are written as JSON (--output). A case fails if it is slower than the
+baseline by more than the baseline's recorded spread plus --threshold (default
+25%), and the exit status is then 1, so this can gate CI. Compare on the machine the baseline was recorded
+on; with --normalize, times are divided by a fixed pure-Python calibration loop
+first, for a rough comparison across machines.
+
+Usage:
+  python -m benchmarks.bench_suite
+  python -m benchmarks.bench_suite --filter contacts --processes 7
+  python -m benchmarks.bench_suite --update-baseline      # after an intended speed change
+"""
+import argparse
+import gc
+import gzip
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+CORPUS_DIR = os.path.join(HERE, 'corpus')
+BASELINE = os.path.join(HERE, 'baseline.json')
+# Fewest calls per timed run: a single call is at the mercy of one scheduler hiccup
+MIN_CALLS = 3
+
+
+def load_corpus(directory=CORPUS_DIR):
+    """{page name: html} for every .html / .html.gz file in `directory`."""
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith('.html.gz'):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                pages[name[:-len('.html.gz')]] = f.read()
+        elif name.endswith('.html'):
+            with open(path, encoding='utf-8') as f:
+                pages[name[:-len('.html')]] = f.read()
+    return pages
+
+
+def build_cases(pages):
+    """[(case name, zero-argument callable)] in report order."""
+    from benchmarks.bench_render import make_contexts
+    from modules.contact_extractor import extract_contacts_from_html
+    from modules.email_generator import _sanitize_text, generate_email
+    from modules.lead_discovery import parse_embedded_json
+    from modules.pain_finder import check_structural_points, prepare_ai_input
+
+    site_pages = {name: html for name, html in pages.items() if name != 'maps_serp'}
+    url = 'https://bench.example.com/'
+    cases = []
+    for name, html in site_pages.items():
+        cases.append((f"contacts/{name}", lambda html=html: extract_contacts_from_html(html, base_url=url)))
+    for name, html in site_pages.items():
+        cases.append((f"structural/{name}", lambda html=html: check_structural_points({'html': html, 'url': url})))
+    for name, html in site_pages.items():
+        cases.append((f"ai_prep/{name}", lambda html=html: prepare_ai_input({'html': html, 'url': url})))
+    if 'maps_serp' in pages:
+        html = pages['maps_serp']
+        cases.append(('parse_embedded_json', lambda: parse_embedded_json(html)))
+
+    contexts = make_contexts(50)
+    bodies = [generate_email(c)[1] + '\n[Your Name]\nAs an AI language model, {placeholder}' for c in contexts]
+    cases.append(('sanitize', lambda: [_sanitize_text(b) for b in bodies]))
+    cases.append(('generate_email', lambda: [generate_email(c) for c in contexts]))
+    return cases
+
+
+def calibrate(repeat=5):
+    """Seconds for a fixed pure-Python workload: the unit --normalize divides by."""
+    def work():
+        total = 0
+        for i in range(300000):
+            total += i * i % 7
+        return total
+    return best_time(work, 1, repeat)
+
+
+def best_time(func, number, repeat):
+    # Like timeit: garbage collection is off while timing, so one case's leftovers
+    # (the 2 MB page's trees) don't trigger collections in the next one
+    best = None
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            elapsed = (time.perf_counter() - start) / number
+            best = elapsed if best is None else min(best, elapsed)
+            gc.collect()
+    finally:
+        gc.enable()
+    return best
+
+
+def call_count(func, min_time):
+    """Calls per timed run so that one run lasts about `min_time` (at least MIN_CALLS)."""
+    func()  # warm-up: imports, lazy compiles, caches; far slower than a steady-state call
+    start = time.perf_counter()
+    func()
+    once = max(time.perf_counter() - start, 1e-7)
+    return max(MIN_CALLS, int(min_time / once))
+
+
+def run_cases(corpus, name_filter, min_time, repeat):
+    """One worker process's pass: {'calibration_seconds', 'cases': {name: [seconds, calls]}}."""
+    os.chdir(ROOT)  # the Jinja loader resolves templates/ against the working directory
+    cases = [(name, func) for name, func in build_cases(load_corpus(corpus))
+             if not name_filter or name_filter in name]
+    timings = {}
+    for name, func in cases:
+        calls = call_count(func, min_time)
+        timings[name] = [best_time(func, calls, repeat), calls]
+    return {'calibration_seconds': calibrate(), 'cases': timings}
+
+
+def compare(results, baseline, normalize=False):
+    """
+    [(case, ratio or None, spread)]: current / baseline time and the baseline's
+    recorded spread; ratio None for cases the baseline doesn't have.
+    """
+    base_cases = baseline.get('cases', {})
+    scale = 1.0
+    if normalize:
+        scale = (baseline.get('calibration_seconds') or 1.0) / (results['calibration_seconds'] or 1.0)
+    rows = []
+    for case, entry in results['cases'].items():
+        base = base_cases.get(case)
+        if base:
+            rows.append((case, entry['seconds'] * scale / base['seconds'], base.get('spread', 0.0)))
+        else:
+            rows.append((case, None, 0.0))
+    return rows
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--corpus', default=CORPUS_DIR, help='Directory of .html / .html.gz pages')
+    p.add_argument('--filter', help='Only run cases whose name contains this text')
+    p.add_argument('--processes', type=int, default=5, help='Worker processes to run the cases in (median is kept)')
+    p.add_argument('--repeat', type=int, default=3, help='Timed runs per case per process (best is kept)')
+    p.add_argument('--min-time', type=float, default=0.5, help='Approximate seconds per timed run')
+    p.add_argument('--output', default='bench_results.json', help="Where to write this run's results")
+    p.add_argument('--baseline', default=BASELINE, help='Baseline results to compare against')
+    p.add_argument('--threshold', type=float, default=0.25,
+                   help="Fail when a case is slower than the baseline by its spread plus this fraction (0.25 = 25%%)")
+    p.add_argument('--normalize', action='store_true',
+                   help='Scale by the calibration loop before comparing (baseline from another machine)')
+    p.add_argument('--update-baseline', action='store_true', help='Store these results as the new baseline')
+    args = p.parse_args()
+
+    corpus = os.path.abspath(args.corpus)
+    if not load_corpus(corpus):
+        print(f"No pages in {args.corpus}; run python -m benchmarks.make_corpus")
+        return 2
+
+    # One fresh process per pass, one after another, so passes don't compete for the CPU
+    runs = []
+    ctx = multiprocessing.get_context('spawn')
+    for n in range(max(1, args.processes)):
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as ex:
+            runs.append(ex.submit(run_cases, corpus, args.filter, args.min_time, args.repeat).result())
+        print(f"process {n + 1}/{args.processes} done", file=sys.stderr)
+
+    results = {
+        'created': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'processes': len(runs),
+        'calibration_seconds': statistics.median(r['calibration_seconds'] for r in runs),
+        'cases': {},
+    }
+    print(f"{len(runs[0]['cases'])} cases, median of {len(runs)} process(es)")
+    for name in runs[0]['cases']:
+        samples = [r['cases'][name][0] for r in runs]
+        secs = statistics.median(samples)
+        results['cases'][name] = {'seconds': secs, 'calls': runs[0]['cases'][name][1],
+                                  'spread': round((max(samples) - min(samples)) / secs, 3)}
+        print(f"{name:>32}: {secs * 1e3:10.3f} ms/call  (spread {results['cases'][name]['spread']:.0%})")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one with --update-baseline")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if not args.normalize and (baseline.get('platform'), baseline.get('python')) != (results['platform'], results['python']):
+        print(f"\nNote: the baseline was recorded on {baseline.get('platform')} / Python {baseline.get('python')}; "
+              "consider --normalize")
+    regressions = []
+    print(f"\nAgainst {args.baseline} (threshold spread +{args.threshold:.0%}"
+          f"{', normalised' if args.normalize else ''}):")
+    for case, ratio, spread in compare(results, baseline, args.normalize):
+        if ratio is None:
+            print(f"{case:>32}:        new")
+            continue
+        limit = 1 + spread + args.threshold
+        flag = ''
+        if ratio > limit:
+            regressions.append(case)
+            flag = '  REGRESSION'
+        print(f"{case:>32}: {ratio:9.2f}x  (limit {limit:.2f}x){flag}")
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than baseline beyond spread + {args.threshold:.0%}: "
+              + ', '.join(regressions))
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
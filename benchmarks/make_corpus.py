@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+make_corpus.py
+(Re)generate the synthetic HTML corpus in benchmarks/corpus/ that bench_suite.py runs on.
+
+The pages are deterministic (fixed seed), so regenerating gives byte-identical
+files and the checked-in baseline stays comparable. Only rerun this when a page
+kind is added or changed, and refresh the baseline in the same commit
+(python -m benchmarks.bench_suite --update-baseline).
+
+Pages:
+  tiny.html                 ~1 KB brochure page
+  page_builder.html.gz      ~2 MB page-builder export (deep wrapper divs, inline styles/scripts)
+  jsonld_heavy.html         dozens of application/ld+json blocks plus microdata
+  obfuscated_emails.html    [at]/(dot) spellings, entity-encoded '@', mailto links
+  many_images.html          hundreds of <img> tags, most without alt text
+  maps_serp.html            Google Maps results page with the embedded preload JSON blob
+
+Usage:
+  python -m benchmarks.make_corpus
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+WORDS = ("plumbing heating repair emergency service licensed insured family owned local estimates "
+         "water heater drain cleaning boiler installation maintenance commercial residential "
+         "trusted affordable same day call today free quote satisfaction guaranteed").split()
+
+
+def _text(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def tiny(rng):
+    return ('<!DOCTYPE html><html><head><title>Acme Plumbing</title></head><body>'
+            '<h1>Acme Plumbing</h1><p>' + _text(rng, 40) + '</p>'
+            '<p>Call (555) 010-2040 or email <a href="mailto:office@acme-plumbing.example">office@acme-plumbing.example</a></p>'
+            '</body></html>')
+
+
+def page_builder(rng, size=2 * 1024 * 1024):
+    head = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>Summit Heating &amp; Air</title>',
+            '<meta name="viewport" content="width=device-width, initial-scale=1">']
+    for i in range(40):
+        head.append(f'<link rel="stylesheet" id="elementor-post-{i}-css" href="/wp-content/uploads/elementor/css/post-{i}.css?ver=1.{i}">')
+    head.append('<style>' + ''.join(f'.elementor-element-{i:x}{{margin:{i % 9}px;padding:{i % 5}px}}' for i in range(3000)) + '</style>')
+    head.append('<script>var elementorFrontendConfig=' + json.dumps(
+        {'environmentMode': {'edit': False}, 'i18n': {f'k{i}': _text(rng, 3) for i in range(400)}}) + ';</script>')
+    head.append('</head><body class="home page-template elementor-default elementor-kit-7">')
+    parts = head
+    total = sum(map(len, parts))
+    section = 0
+    while total < size:
+        eid = f"{rng.getrandbits(28):07x}"
+        block = (f'<section class="elementor-section elementor-top-section elementor-element elementor-element-{eid}" '
+                 f'data-id="{eid}" data-element_type="section" data-settings=\'{{"background_background":"classic"}}\'>'
+                 '<div class="elementor-container elementor-column-gap-default">'
+                 + ''.join(
+                     f'<div class="elementor-column elementor-col-33 elementor-top-column" data-element_type="column">'
+                     f'<div class="elementor-widget-wrap elementor-element-populated">'
+                     f'<div class="elementor-element elementor-widget elementor-widget-text-editor" style="color:#3a3a3a;font-size:{14 + c}px">'
+                     f'<div class="elementor-widget-container"><div class="elementor-text-editor elementor-clearfix">'
+                     f'<h3>{_text(rng, 4).title()}</h3><p>{_text(rng, 45)}</p></div></div></div>'
+                     f'<div class="elementor-element elementor-widget elementor-widget-image"><div class="elementor-widget-container">'
+                     f'<img width="800" height="533" src="/wp-content/uploads/2023/0{c + 1}/img-{section}-{c}.jpg" '
+                     f'class="attachment-large size-large" alt="" loading="lazy" '
+                     f'srcset="/img-{section}-{c}-300x200.jpg 300w, /img-{section}-{c}-768x512.jpg 768w"></div></div>'
+                     f'</div></div>' for c in range(3))
+                 + '</div></section>')
+        if section % 25 == 7:
+            block += '<div class="elementor-widget-button"><a class="elementor-button" href="/contact/">Get a free quote</a></div>'
+        parts.append(block)
+        total += len(block)
+        section += 1
+    parts.append('<footer><p>Summit Heating &amp; Air &middot; 12 Main St &middot; (555) 010-7788 &middot; '
+                 'service@summit-hvac.example</p></footer>')
+    parts.append('<script src="https://www.googletagmanager.com/gtag/js?id=G-TEST"></script></body></html>')
+    return ''.join(parts)
+
+
+def jsonld_heavy(rng, blocks=60):
+    parts = ['<!DOCTYPE html><html><head><title>Northside Dental Group</title>',
+             '<meta name="viewport" content="width=device-width">']
+    for i in range(blocks):
+        item = {
+            '@context': 'https://schema.org', '@type': 'Dentist' if i % 3 else 'LocalBusiness',
+            'name': f"Northside Dental - Location {i}", 'telephone': f"+1-555-01{i:02d}-{rng.randint(1000, 9999)}",
+            'email': f"location{i}@northside-dental.example",
+            'address': {'@type': 'PostalAddress', 'streetAddress': f"{100 + i} Elm St", 'addressLocality': 'Springfield',
+                        'postalCode': f"0{1000 + i}", 'addressCountry': 'US'},
+            'openingHoursSpecification': [{'@type': 'OpeningHoursSpecification', 'dayOfWeek': d,
+                                           'opens': '08:00', 'closes': '17:00'} for d in ('Monday', 'Tuesday', 'Wednesday',
+                                                                                         'Thursday', 'Friday')],
+            'review': [{'@type': 'Review', 'author': {'@type': 'Person', 'name': f"Patient {i}-{r}"},
+                        'reviewBody': _text(rng, 30), 'reviewRating': {'@type': 'Rating', 'ratingValue': rng.randint(3, 5)}}
+                       for r in range(4)],
+        }
+        parts.append('<script type="application/ld+json">' + json.dumps(item) + '</script>')
+    parts.append('</head><body>')
+    for i in range(20):
+        parts.append(f'<div itemscope itemtype="https://schema.org/Person"><span itemprop="name">Dr. Smith {i}</span>'
+                     f'<span itemprop="jobTitle">Dentist</span><span itemprop="telephone">(555) 010-{3000 + i}</span></div>'
+                     f'<p>{_text(rng, 50)}</p>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def obfuscated_emails(rng):
+    parts = ['<!DOCTYPE html><html><head><title>Riverside Roofing</title></head><body><h1>Riverside Roofing</h1>']
+    spellings = ('{u} [at] {d} [dot] com', '{u}(at){d}(dot)com', '{u} at {d} dot com',
+                 '{u}&#64;{d}.com', '{u}&#x40;{d}.com', '{u}&commat;{d}.com')
+    for i in range(120):
+        user, domain = f"crew{i}", f"riverside-roofing{i % 7}"
+        parts.append(f'<p>{_text(rng, 25)} Reach {spellings[i % len(spellings)].format(u=user, d=domain)} '
+                     f'or call ({555 + i % 3}) 01{i % 10}-{rng.randint(1000, 9999)}.</p>')
+        if i % 10 == 0:
+            parts.append(f'<a href="mailto:{user}@{domain}.com?subject=Quote">Email {user}</a>')
+    parts.append('<form action="/contact-submit" method="post"><input name="email"></form></body></html>')
+    return ''.join(parts)
+
+
+def many_images(rng, images=600):
+    parts = ['<!DOCTYPE html><html><head><title>Lakeside Landscaping Gallery</title></head><body><h1>Project gallery</h1>']
+    for i in range(images):
+        alt = f' alt="{_text(rng, 3)}"' if i % 5 == 0 else ''
+        parts.append(f'<figure><img src="/gallery/{i:04d}.jpg" width="640" height="480"{alt} '
+                     f'data-lazy-src="/gallery/{i:04d}-full.jpg"><figcaption>{_text(rng, 6)}</figcaption></figure>')
+    parts.append('<p>Questions? hello@lakeside-landscaping.example</p></body></html>')
+    return ''.join(parts)
+
+
+def maps_serp(rng, places=200):
+    data = [None, [[f"Place {i}", [None, None, 42.6 + i / 1000, -71.3 - i / 1000],
+                    f"https://place{i}.example.com/", f"(555) 010-{i:04d}", _text(rng, 12),
+                    [rng.randint(1, 5), rng.randint(0, 900)]] for i in range(places)]]
+    blob = ")]}'" + json.dumps(data)
+    escaped = blob.encode('unicode_escape').decode('ascii').replace("'", "\\x27")
+    return ('<!DOCTYPE html><html><head><title>plumbers near Lowell, MA - Google Maps</title>'
+            '<script>window._pageSetup=true;window.APP_INITIALIZATION_STATE=[];'
+            "google.maps.preload.data = '" + escaped + "';</script>"
+            '<script>' + 'var a=1;' * 2000 + '</script></head><body><div id="app"></div></body></html>')
+
+
+PAGES = {
+    'tiny.html': tiny,
+    'page_builder.html.gz': page_builder,
+    'jsonld_heavy.html': jsonld_heavy,
+    'obfuscated_emails.html': obfuscated_emails,
+    'many_images.html': many_images,
+    'maps_serp.html': maps_serp,
+}
+
+
+def write_corpus(directory=CORPUS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    for name, build in PAGES.items():
+        html = build(random.Random(name)).encode('utf-8')
+        path = os.path.join(directory, name)
+        if name.endswith('.gz'):
+            # mtime=0 keeps the archive byte-identical between regenerations
+            with open(path, 'wb') as f, gzip.GzipFile(filename='', mode='wb', fileobj=f, mtime=0) as gz:
+                gz.write(html)
+        else:
+            with open(path, 'wb') as f:
+                f.write(html)
+        print(f"{name:>24}: {len(html) / 1024:8.1f} KB")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--out', default=CORPUS_DIR, help='Directory to write the pages to')
+    args = p.parse_args()
+    write_corpus(args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,22 +3,17 @@ import argparse
 import logging
 import os
 import time
+from functools import partial
+from itertools import chain
 from urllib.parse import urlparse
 from dotenv import load_dotenv
-from tqdm import tqdm
 # Load environment variables from .env file
 load_dotenv()
 
-# Import modules from the modules package
-from modules.lead_discovery import discover_leads
-from modules.scraper import fetch_page
-from modules.contact_extractor import extract_contacts_from_html
-# IMPORTANT: Import our new and improved pain finder
-from modules.pain_finder import find_structural_and_ai_pain_points 
-from modules.email_generator import generate_email, preview_email
-from modules.sender import send_email_with_approval
-from modules.logger_module import OutreachLogger
-from modules.history_manager import HistoryManager
+# Pipeline modules (and through them openai, requests, lxml, jinja2, ...) are
+# imported inside the functions that use them, so `--help`, argument errors
+# and cron runs with nothing to do start in a fraction of a second.
+# benchmarks/bench_startup.py keeps an eye on this.
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -30,109 +25,420 @@ def build_parser():
     # --- Group for lead source ---
     source_group = p.add_mutually_exclusive_group(required=True)
     source_group.add_argument('--url-file', help='Path to a file containing a list of URLs to process.')
-    source_group.add_argument('--city', help='Target city, e.g., "Boston, MA"')
+    source_group.add_argument('--city', nargs='+', help='Target cities, e.g., "Boston, MA" "Cambridge, MA"')
+    source_group.add_argument('--drain-outbox', action='store_true', help='Only deliver messages already in the outbox, then exit')
+    source_group.add_argument('--resume', metavar='RUN_ID', help='Finish an interrupted run, reusing the work its checkpoints saved')
 
     p.add_argument('--category', help='Business categories (used with --city), comma-separated, e.g., "hvac,plumbing"')
-    p.add_argument('--max', type=int, default=10, help='Max leads to process per category')
+    p.add_argument('--max', type=int, default=10, help='Max leads to process per city and category')
+    p.add_argument('--discovery-workers', type=int, default=4, help='City/category discovery queries run concurrently')
     p.add_argument('--dry-run', action='store_true', help='Preview emails without sending')
     p.add_argument('--use-selenium', action='store_true', help='Use Selenium for scraping')
+    p.add_argument('--browser-pool', type=int, default=2, help='Headless Chrome instances shared by the fetch workers')
+    p.add_argument('--browser-max-pages', type=int, default=50, help='Restart a browser after this many pages')
+    p.add_argument('--browser-max-mb', type=int, default=1024, help='Restart a browser whose processes use more memory than this')
+    p.add_argument('--browser-load-media', action='store_true', help='Let the browser download images, fonts and media')
+
+    # --- On-disk caches ---
+    p.add_argument('--cache-dir', default='.cache', help='Root directory for on-disk caches (pages, robots.txt, AI responses)')
+    p.add_argument('--cache-ttl', type=float, default=7.0, help='Days a cached page is served without revalidation')
+    p.add_argument('--cache-max-mb', type=int, default=500, help='Max compressed size of the page cache (LRU eviction)')
+    p.add_argument('--no-cache', action='store_true', help='Disable the page cache for this run')
+    p.add_argument('--robots-ttl', type=float, default=1.0, help='Days a cached robots.txt is trusted')
+    p.add_argument('--no-robots', action='store_true', help='Skip robots.txt checks')
+    p.add_argument('--ai-cache-ttl', type=float, default=30.0, help='Days a cached AI pain-point analysis is reused')
+    p.add_argument('--no-ai-cache', action='store_true', help='Always call OpenAI, ignoring cached analyses')
+    p.add_argument('--discovery-ttl', type=float, help='Days a cached discovery response is reused (default: per provider)')
+    p.add_argument('--refresh-discovery', action='store_true', help='Re-run discovery queries even if cached (results are re-cached)')
+    p.add_argument('--no-discovery-cache', action='store_true', help='Do not read or write cached discovery responses')
+
+    # --- Pipeline concurrency ---
+    p.add_argument('--fetch-workers', type=int, default=8, help='Concurrent page fetches')
+    p.add_argument('--llm-workers', type=int, default=4, help='Concurrent pain-point analyses (OpenAI calls)')
+    p.add_argument('--send-workers', type=int, default=1, help='Concurrent email sends (SMTP connections)')
+    p.add_argument('--llm-rpm', type=int, default=500, help='OpenAI requests-per-minute budget')
+    p.add_argument('--llm-tpm', type=int, default=200000, help='OpenAI tokens-per-minute budget')
+    p.add_argument('--cpu-workers', type=int, default=min(4, os.cpu_count() or 1),
+                   help='Processes for HTML parsing/extraction (0 = parse in the pipeline threads)')
+    p.add_argument('--queue-size', type=int, default=50, help='Max leads buffered between pipeline stages')
+
+    # --- Delivery (outbox) ---
+    p.add_argument('--outbox', default='outbox.sqlite', help='Outbox database that rendered emails are spooled to')
+    p.add_argument('--send-rate', type=float, default=20, help='Max emails per minute overall (0 = unlimited)')
+    p.add_argument('--domain-rate', type=float, default=2, help='Max emails per minute to one recipient domain (0 = unlimited)')
+    p.add_argument('--send-retries', type=int, default=5, help='Delivery attempts before a temporarily failing email is given up')
+    p.add_argument('--drain-timeout', type=float, help='Seconds to keep delivering after processing ends (default: until nothing is due)')
+
+    # --- Checkpoints ---
+    p.add_argument('--checkpoints', default='checkpoints.sqlite', help='Database of per-lead stage outputs used by --resume')
+    p.add_argument('--no-checkpoint', action='store_true', help='Do not save stage outputs (the run cannot be resumed)')
+
+    # --- Metrics ---
+    p.add_argument('--metrics-dir', default='metrics',
+                   help="Directory for each run's metrics (<run-id>.json and Prometheus text <run-id>.prom); '' disables")
     return p
 
-def load_leads_from_file(filepath):
-    """Loads URLs from a text file and formats them as leads."""
+# Arguments that define a run's leads; --resume takes them from the original run
+LEAD_SOURCE_ARGS = ('url_file', 'city', 'category', 'max')
+
+# Stage outputs saved to the checkpoint store; restoring them lets --resume skip the stage
+STAGE_OUTPUTS = {
+    'fetch': ('url', 'page_content'),
+    'extract': ('contacts', 'structural', 'ai_input'),
+    'analyze': ('pain_points', 'ai_tokens'),
+    'render': ('subject', 'body'),
+    'send': ('status',),
+}
+
+# --- Pipeline stages: each takes a job dict and returns it (or None to drop the lead) ---
+
+def _fetch_stage(job, args, logger):
+    url = job['lead'].get("url")
+    if not url or not url.startswith('http'):
+        logging.warning(f"Skipping lead with invalid URL: {url}")
+        return None
+
+    from modules.scraper import fetch_page
+
+    logging.info(f"Scraping {url}...")
+    # We need the full page content object now, not just html
+    page_content = fetch_page(url, use_selenium=args.use_selenium, render_js=True, robots_check=not args.no_robots)
+    if not page_content.get('html'):
+        logging.error(f"Failed to fetch HTML for {url}")
+        logger.record(url=url, status='fetch_failed')
+        return None
+
+    job['url'] = url
+    job['page_content'] = page_content
+    return job
+
+def _extract_stage(job):
+    from modules.cpu_pool import analyze_page
+
+    # Parse once and run contacts, structural checks and AI text prep on that parse,
+    # in a worker process when --cpu-workers > 0; only compact results come back
+    job.update(analyze_page(job['page_content'], url=job['url']))
+    return job
+
+def _analyze_stage(job):
+    from modules.pain_finder import AIAnalysisSkipped, analyze_content_with_ai, merge_pain_points
+
+    logging.info("Analyzing for pain points...")
+    job['ai_tokens'] = {}
+    # A failed OpenAI call raises, so the lead stops here and --resume retries the call
     try:
-        with open(filepath, 'r') as f:
-            urls = [line.strip() for line in f if line.strip()]
-        # Format as a list of lead dictionaries to match discover_leads() output
-        return [{'url': url, 'title': urlparse(url).netloc} for url in urls]
-    except FileNotFoundError:
-        logging.error(f"URL file not found at: {filepath}")
-        return []
+        ai_pains = analyze_content_with_ai(None, usage=job['ai_tokens'], summary=job['ai_input'], strict=True)
+    except AIAnalysisSkipped as e:
+        logging.debug("AI analysis skipped for %s: %s", job['url'], e)
+        ai_pains = []
+        job['unsaved'] = {'analyze'}  # structural points only; not a finished analysis
+    job['pain_points'] = merge_pain_points(job['structural'], ai_pains)
+    if job['ai_tokens']:
+        logging.info("AI input for %s: %d -> %d tokens", job['url'],
+                     job['ai_tokens']['tokens_before'], job['ai_tokens']['tokens_after'])
+    logging.info(f"Found contacts: Emails - {len(job['contacts'].get('emails', []))}")
+    logging.info(f"Found pain points: {job['pain_points']}")
+    return job
+
+def _render_stage(job):
+    from modules.email_generator import generate_email, preview_email
+
+    context = {
+        'lead': job['lead'],
+        'contacts': job['contacts'],
+        'pain_text': '\n- '.join(job['pain_points']), # Formats list for the email
+        'domain': urlparse(job['url']).netloc
+    }
+    job['subject'], job['body'] = generate_email(context, use_openai=True)
+    preview_email(job['subject'], job['body'])
+    return job
+
+def _send_stage(job, args, logger, outbox=None, drainer=None):
+    from modules.sender import send_email_with_approval
+
+    url = job['url']
+    contacts = job['contacts']
+    if contacts.get('emails') and logger.already_contacted(contacts['emails'][0]):
+        logging.info(f"Already contacted {contacts['emails'][0]}; not emailing again for {url}.")
+        job['status'] = 'already_contacted'
+        logger.record(url=url, contact=contacts['emails'][0], status='already_contacted')
+    elif contacts.get('emails') and outbox is not None:
+        # Spool it; the outbox drainer delivers at --send-rate / --domain-rate and logs the result
+        recipient_email = contacts['emails'][0]
+        job['status'] = 'queued' if outbox.enqueue(recipient_email, job['subject'], job['body'], url=url) else 'already_queued'
+        logger.record(url=url, contact=recipient_email, subject=job['subject'], status=job['status'])
+        drainer.notify()
+    elif contacts.get('emails'):
+        recipient_email = contacts['emails'][0]
+        success = send_email_with_approval(recipient_email, job['subject'], job['body'], dry_run=args.dry_run, is_html=True)
+        job['status'] = 'sent_successfully' if success else 'send_failed'
+        logger.record(url=url, contact=recipient_email, subject=job['subject'], status=job['status'])
+    else:
+        logging.warning(f"No email found for {url}. Logging as 'no_email'.")
+        job['status'] = 'no_email'
+        logger.record(url=url, status='no_email')
+    return job
+
+def _checkpointed(name, func, store, run_id):
+    """
+    Wrap a stage so its outputs are saved per lead, and restored instead of recomputed on
+    resume. A stage that names itself in job['unsaved'] produced provisional output, which is
+    passed on but not saved.
+    """
+    def run(job):
+        saved = job['saved'].get(name)
+        if saved is not None:
+            job.update(saved)
+            return job
+        result = func(job)
+        if result is None:
+            store.save(run_id, job['seq'], 'dropped', {'stage': name})
+        elif name not in result.get('unsaved', ()):
+            store.save(run_id, job['seq'], name, {k: result.get(k) for k in STAGE_OUTPUTS[name]})
+        return result
+    return run
+
+def _lead_source(args, logger, seen):
+    """New leads for this run, streamed, with repeated and previously handled sites dropped before any fetch."""
+    from modules.url_index import unique_leads
+    if args.url_file:
+        if not os.path.exists(args.url_file):
+            logging.error(f"URL file not found at: {args.url_file}")
+            return None
+        from modules.lead_reader import read_leads
+        logging.info(f"💾 Streaming leads from file: {args.url_file}")
+        return unique_leads(read_leads(args.url_file), seen, skip=logger.already_processed)
+    from modules.lead_discovery import discover_many
+    from modules.discovery_cache import configure_discovery_cache, PROVIDER_TTL_DAYS
+    configure_discovery_cache(
+        path=os.path.join(args.cache_dir, 'discovery', 'responses.sqlite'),
+        ttls=dict.fromkeys(PROVIDER_TTL_DAYS, args.discovery_ttl) if args.discovery_ttl is not None else None,
+        refresh=args.refresh_discovery, enabled=not args.no_discovery_cache)
+    # Discovery results stream straight into the pipeline as each query finishes; discover_many
+    # dedups them against `seen` itself
+    return discover_many(args.city, args.category.split(','), max_results=args.max,
+                         workers=args.discovery_workers, index=seen, skip=logger.already_processed)
+
+def _jobs(leads, store, run_id, seq):
+    """Pipeline jobs for new leads, each recorded in the checkpoint store as it is handed out."""
+    for lead in leads:
+        store.add_lead(run_id, seq, lead)
+        yield {'lead': lead, 'seq': seq, 'saved': {}}
+        seq += 1
+
+def _start_outbox(args, logger):
+    """Open the outbox and start delivering from it in the background (not used for dry runs)."""
+    from modules.outbox import Outbox, OutboxDrainer, LOG_STATUS
+    from modules.sender import get_smtp_pool
+
+    get_smtp_pool(size=args.send_workers)  # one SMTP session per send worker, reused across emails
+    outbox = Outbox(args.outbox)
+    for msg in outbox.interrupted:
+        logger.record(url=msg['url'], contact=msg['recipient'], subject=msg['subject'], status=LOG_STATUS['interrupted'])
+    drainer = OutboxDrainer(outbox, logger=logger, rate=args.send_rate, domain_rate=args.domain_rate,
+                            workers=args.send_workers, max_attempts=args.send_retries).start()
+    return outbox, drainer
+
+def _finish_outbox(args, outbox, drainer, summary):
+    from modules.sender import close_smtp_pool
+
+    if outbox.next_due_in() == 0:
+        logging.info("Delivering queued emails...")
+    summary['delivery'] = drainer.close(timeout=args.drain_timeout)
+    summary['outbox'] = outbox.counts()
+    summary['smtp'] = close_smtp_pool()
+    logging.info("Outbox: %s", summary['outbox'])
+    outbox.close()
+
+def _finish_metrics(args, run_id, caches):
+    """
+    Add end-of-run figures (cache hit counts, peak RSS, wall time) to the metrics
+    registry, write it to --metrics-dir, and return the compact summary for the run history.
+    """
+    from modules.metrics import METRICS, peak_rss_bytes, write_metrics
+
+    for cache, stats in caches.items():
+        if stats:
+            METRICS.incr('cache_lookups_total', stats['hits'], cache=cache, result='hit')
+            METRICS.incr('cache_lookups_total', stats['misses'], cache=cache, result='miss')
+    METRICS.set_gauge('peak_rss_bytes', peak_rss_bytes(), process='main')
+    METRICS.set_gauge('run_seconds', round(time.time() - METRICS.started, 3))
+    if args.metrics_dir:
+        if run_id is None:
+            from modules.checkpoint import new_run_id
+            run_id = new_run_id()
+        try:
+            paths = write_metrics(os.path.join(args.metrics_dir, run_id))
+            logging.info("Metrics written to %s and %s", *paths)
+        except OSError as e:
+            logging.error("Could not write metrics to %s: %s", args.metrics_dir, e)
+    return METRICS.summary()
 
 def main():
     """Main execution function."""
     args = build_parser().parse_args()
+    if args.city and not args.category:
+        logging.error("The --category argument is required when using --city.")
+        return
+    from modules.logger_module import OutreachLogger
+    from modules.history_manager import HistoryManager
+    from modules.metrics import METRICS
+    METRICS.reset()  # times and counts cover this run only
     logger = OutreachLogger()
+    if not logger.csv_imported:
+        # Without the legacy log every lead in it would look new and be emailed again
+        logging.error("Fix or move %s so it can be imported, then run again.", logger.path)
+        return
     history = HistoryManager()
-
-    all_leads = []
-    if args.url_file:
-        logging.info(f"💾 Loading leads from file: {args.url_file}")
-        all_leads = load_leads_from_file(args.url_file)
-    elif args.city:
-        if not args.category:
-            logging.error("The --category argument is required when using --city.")
+    outbox = drainer = None
+    if not args.dry_run:
+        from modules.sender import SMTP_HOST
+        if not SMTP_HOST:
+            logging.error("SMTP_HOST is not set; configure SMTP in .env or use --dry-run.")
             return
-            
-        categories = [cat.strip() for cat in args.category.split(',')]
-        for category in categories:
-            logging.info(f"🔎 Discovering {category} in {args.city}")
-            leads = discover_leads(
-                city=args.city,
-                category=category,
-                max_results=args.max
-            )
-            if leads:
-                all_leads.extend(leads)
-    
-    if not all_leads:
+        outbox, drainer = _start_outbox(args, logger)
+
+    if args.drain_outbox:
+        summary = {'args': vars(args), 'leads_processed': 0}
+        if outbox is not None:
+            _finish_outbox(args, outbox, drainer, summary)
+        logger.export_csv()
+        history.append_run(summary=summary, details={'metrics': _finish_metrics(args, None, {})})
+        return
+
+    from modules.url_index import DomainIndex
+    store = run_id = None
+    seen = DomainIndex()
+    resumed = iter(())
+    if args.resume and args.no_checkpoint:
+        logging.error("--resume needs the checkpoint store; drop --no-checkpoint.")
+        return
+    if not args.no_checkpoint:
+        from modules.checkpoint import CheckpointStore, new_run_id
+        store = CheckpointStore(args.checkpoints)
+        if args.resume:
+            run_id = args.resume
+            saved_args = store.run_args(run_id)
+            if saved_args is None:
+                logging.error(f"No checkpointed run with ID {run_id} in {args.checkpoints}")
+                return
+            for name in LEAD_SOURCE_ARGS:
+                setattr(args, name, saved_args.get(name))
+            store.set_status(run_id, 'running')
+            # The run's own unfinished leads first, then whatever its lead source hadn't produced yet
+            for url in store.lead_urls(run_id):
+                seen.add(url)
+            resumed = ({'lead': lead, 'seq': seq, 'saved': saved} for seq, lead, saved in store.pending(run_id))
+        else:
+            run_id = new_run_id()
+            store.start_run(run_id, vars(args))
+        logging.info(f"Run ID: {run_id} (continue an interrupted run with --resume {run_id})")
+
+    leads = _lead_source(args, logger, seen)
+    if leads is None:
+        return
+    if store is not None:
+        leads = chain(resumed, _jobs(leads, store, run_id, store.next_seq(run_id)))
+    else:
+        leads = ({'lead': lead, 'saved': {}} for lead in leads)
+
+    from modules.lead_reader import LeadFormatError
+    try:
+        first = next(leads, None)
+    except LeadFormatError as e:
+        logging.error(str(e))
+        first = None
+    if first is None:
         logging.warning("No leads to process. Exiting.")
+        if outbox is not None:
+            _finish_outbox(args, outbox, drainer, {})
+        if store is not None:
+            store.finish_run(run_id)
+            store.close()
         return
 
-    logging.info(f"Processing {len(all_leads)} total leads...")
-    for lead in tqdm(all_leads, desc="Processing Leads"):
-        url = lead.get("url")
-        if not url or not url.startswith('http'):
-            logging.warning(f"Skipping lead with invalid URL: {url}")
-            continue
-
-        if logger.already_processed(url):
-            logging.info(f"Skipping already processed URL: {url}")
-            continue
-
-        logging.info(f"Scraping {url}...")
-        # We need the full page content object now, not just html
-        page_content = fetch_page(url, use_selenium=args.use_selenium, render_js=True)
-        html = page_content.get('html')
-        
-        if not html:
-            logging.error(f"Failed to fetch HTML for {url}")
-            logger.record(url=url, status='fetch_failed')
-            continue
-
-        contacts = extract_contacts_from_html(html, base_url=url)
-        
-        # --- THIS IS THE KEY UPGRADE ---
-        # We pass the full page_content object to our new function
-        logging.info("Analyzing for pain points...")
-        pain_points = find_structural_and_ai_pain_points(page_content)
-        
-        logging.info(f"Found contacts: Emails - {len(contacts.get('emails', []))}")
-        logging.info(f"Found pain points: {pain_points}")
-
-        context = {
-            'lead': lead,
-            'contacts': contacts,
-            'pain_text': '\n- '.join(pain_points), # Formats list for the email
-            'domain': urlparse(url).netloc
-        }
+    from tqdm import tqdm
+    from modules.scraper import set_page_cache, set_robots_cache
+    from modules.robots import RobotsCache
+    from modules.page_cache import PageCache
+    from modules.pain_finder import set_ai_cache
+    from modules.response_cache import ResponseCache
+    from modules.llm_executor import configure_llm_executor
+    from modules.pipeline import Stage, run_pipeline
+    from modules.cpu_pool import configure_cpu_pool, close_cpu_pool
 
-        # The rest of your logic remains the same...
-        subject, body = generate_email(context, use_openai=True)
-        preview_email(subject, body)
+    if args.use_selenium:
+        from modules.fetchers import configure_backend
+        configure_backend('selenium', pool_size=args.browser_pool, max_pages=args.browser_max_pages,
+                          max_rss_mb=args.browser_max_mb, block_media=not args.browser_load_media)
+    if not args.no_cache:
+        set_page_cache(PageCache(os.path.join(args.cache_dir, 'pages'), ttl=args.cache_ttl * 86400,
+                                 max_bytes=args.cache_max_mb * 1024 * 1024))
+        set_robots_cache(RobotsCache(store=PageCache(os.path.join(args.cache_dir, 'robots'), ttl=args.robots_ttl * 86400)))
+    cpu_pool = configure_cpu_pool(args.cpu_workers)
+    llm = configure_llm_executor(concurrency=args.llm_workers, rpm=args.llm_rpm, tpm=args.llm_tpm)
+    ai_cache = None
+    if not args.no_ai_cache:
+        ai_cache = ResponseCache(os.path.join(args.cache_dir, 'ai', 'responses.sqlite'), ttl=args.ai_cache_ttl * 86400)
+        set_ai_cache(ai_cache)
 
-        if contacts.get('emails'):
-            recipient_email = contacts['emails'][0]
-            success = send_email_with_approval(recipient_email, subject, body, dry_run=args.dry_run, is_html=True)
-            status = 'sent_successfully' if success else 'send_failed'
-            logger.record(url=url, contact=recipient_email, subject=subject, status=status)
-        else:
-            logging.warning(f"No email found for {url}. Logging as 'no_email'.")
-            logger.record(url=url, status='no_email')
+    logging.info("Processing leads as they arrive...")
+    stages = [
+        Stage('fetch', partial(_fetch_stage, args=args, logger=logger), workers=args.fetch_workers),
+        Stage('extract', _extract_stage, workers=max(1, args.cpu_workers)),
+        Stage('analyze', _analyze_stage, workers=args.llm_workers),
+        Stage('render', _render_stage),
+        Stage('send', partial(_send_stage, args=args, logger=logger, outbox=outbox, drainer=drainer)),
+    ]
+    if store is not None:
+        stages = [Stage(st.name, _checkpointed(st.name, st.func, store, run_id), workers=st.workers) for st in stages]
+    ai_tokens = []
+    processed = 0
 
-        time.sleep(2)
+    def on_done(job):
+        nonlocal processed
+        processed += 1
+        if job.get('ai_tokens') and 'analyze' not in job['saved']:
+            ai_tokens.append({'url': job['url'], **job['ai_tokens']})
+        progress.update(1)
 
-    history.append_run(summary={'args': vars(args), 'leads_processed': len(all_leads)})
+    with tqdm(desc="Processing Leads") as progress:
+        run_pipeline(chain([first], leads), stages,
+                     queue_size=args.queue_size, on_done=on_done)
+
+    summary = {'args': vars(args), 'run_id': run_id, 'leads_processed': processed}
+    if store is not None:
+        summary['run_status'] = store.finish_run(run_id)
+        store.close()
+    if outbox is not None:
+        _finish_outbox(args, outbox, drainer, summary)
+    logger.export_csv()
+    if ai_cache:
+        summary['ai_cache'] = ai_cache.stats()
+        logging.info("AI analysis cache: %(hits)d hits, %(misses)d misses", summary['ai_cache'])
+    if ai_tokens:
+        summary['ai_input_tokens'] = {
+            'before': sum(t['tokens_before'] for t in ai_tokens),
+            'after': sum(t['tokens_after'] for t in ai_tokens),
+        }
+        logging.info("AI input tokens: %(before)d -> %(after)d", summary['ai_input_tokens'])
+    summary['llm'] = llm.snapshot()
+    if cpu_pool is not None:
+        summary['cpu_pool'] = {'workers': cpu_pool.workers, 'restarts': cpu_pool.restarts}
+    close_cpu_pool()
+    from modules.discovery_cache import discovery_cache_stats
+    if discovery_cache_stats():
+        summary['discovery_cache'] = discovery_cache_stats()
+        logging.info("Discovery cache: %(hits)d hits, %(misses)d misses", summary['discovery_cache'])
+    from modules.throttle import quota_snapshots
+    if quota_snapshots():
+        summary['provider_quotas'] = quota_snapshots()
+    llm.close()
+    from modules.fetchers import close_all
+    close_all()  # quits pooled browsers, closes HTTP sessions
+    metrics = _finish_metrics(args, run_id, {'ai': summary.get('ai_cache'),
+                                             'discovery': summary.get('discovery_cache')})
+    history.append_run(summary=summary, details={'ai_tokens': ai_tokens, 'metrics': metrics})
     logging.info("✅ Run complete.")
 
 if __name__ == '__main__':
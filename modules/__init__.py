@@ -9,5 +9,24 @@ __all__ = [
     "logger_module",
     "history_manager",
     "openai_prompt",
-    "serp_proxy"
+    "serp_proxy",
+    "pipeline",
+    "throttle",
+    "fetchers",
+    "page_cache",
+    "robots",
+    "parsed_page",
+    "response_cache",
+    "sqlite_cache",
+    "llm_executor",
+    "tokenizer",
+    "page_summarizer",
+    "outbox",
+    "sanitizer",
+    "discovery_cache",
+    "url_index",
+    "lead_reader",
+    "checkpoint",
+    "cpu_pool",
+    "metrics"
 ]
@@ -0,0 +1,190 @@
+# modules/checkpoint.py
+"""
+Per-run checkpoint store so an interrupted run can be resumed.
+
+Every run gets an ID (new_run_id()). As leads enter the pipeline they are
+recorded with a sequence number, and as each stage finishes for a lead its
+outputs (fetched page, contacts, AI pain points, rendered email, send status)
+are saved as zlib-compressed JSON in a WAL-mode SQLite file. A lead a stage
+dropped gets a 'dropped' marker instead. `main.py --resume <run-id>` replays
+the run's leads, restoring each one's saved outputs so the pipeline only runs
+the stages that hadn't finished. Fetches and paid AI calls that already
+happened are not repeated.
+
+Fetched HTML is the bulk of the store, so a lead's saved page is dropped once
+the lead is finished.
+Exports:
+  - new_run_id()
+  - CheckpointStore(path='checkpoints.sqlite')
+  - TERMINAL_STAGES
+"""
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    args        TEXT NOT NULL DEFAULT '{}',
+    status      TEXT NOT NULL DEFAULT 'running',
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leads (
+    run_id  TEXT NOT NULL,
+    seq     INTEGER NOT NULL,
+    url     TEXT NOT NULL DEFAULT '',
+    lead    TEXT NOT NULL,
+    PRIMARY KEY (run_id, seq)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id     TEXT NOT NULL,
+    seq        INTEGER NOT NULL,
+    stage      TEXT NOT NULL,
+    value      BLOB NOT NULL,
+    stored_at  REAL NOT NULL,
+    PRIMARY KEY (run_id, seq, stage)
+);
+"""
+
+# A lead with one of these saved is finished and is not replayed on resume
+TERMINAL_STAGES = ('send', 'dropped')
+
+
+def new_run_id():
+    """Sortable, unique run ID, e.g. 20261017-154233-3f9a."""
+    return datetime.utcnow().strftime('%Y%m%d-%H%M%S') + '-' + secrets.token_hex(2)
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'), 6)
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+class CheckpointStore:
+    def __init__(self, path='checkpoints.sqlite'):
+        self.path = path
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+
+    # --- runs ---
+
+    def start_run(self, run_id, args):
+        now = time.time()
+        with self._lock:
+            self._db.execute('INSERT INTO runs (run_id, args, created_at, updated_at) VALUES (?, ?, ?, ?)',
+                             (run_id, json.dumps(args, default=str), now, now))
+            self._db.commit()
+
+    def run_args(self, run_id):
+        """The args a run was started with, or None if the run ID is unknown."""
+        with self._lock:
+            row = self._db.execute('SELECT args FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set_status(self, run_id, status):
+        with self._lock:
+            self._db.execute('UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?', (status, time.time(), run_id))
+            self._db.commit()
+
+    def finish_run(self, run_id):
+        """
+        Record the end of a run: 'finished' if every lead reached a terminal stage,
+        'incomplete' if some failed part-way (they are retried by --resume). Saved
+        pages of finished leads are dropped. Returns the status.
+        """
+        terminal = ','.join('?' * len(TERMINAL_STAGES))
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM artifacts WHERE run_id = ? AND stage = 'fetch' AND seq IN "
+                "(SELECT seq FROM artifacts WHERE run_id = ? AND stage IN (%s))" % terminal,
+                (run_id, run_id, *TERMINAL_STAGES))
+            left = self._db.execute(
+                'SELECT COUNT(*) FROM leads WHERE run_id = ? AND seq NOT IN '
+                '(SELECT seq FROM artifacts WHERE run_id = ? AND stage IN (%s))' % terminal,
+                (run_id, run_id, *TERMINAL_STAGES)).fetchone()[0]
+            status = 'incomplete' if left else 'finished'
+            self._db.execute('UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?', (status, time.time(), run_id))
+            self._db.commit()
+        if left:
+            logging.warning("%d lead(s) of run %s did not finish; retry them with --resume %s", left, run_id, run_id)
+        return status
+
+    def runs(self, limit=20):
+        """Most recent runs first: dicts with run_id, status, created_at, leads, finished."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT r.run_id, r.status, r.created_at, "
+                "(SELECT COUNT(*) FROM leads l WHERE l.run_id = r.run_id), "
+                "(SELECT COUNT(DISTINCT seq) FROM artifacts a WHERE a.run_id = r.run_id AND a.stage IN ('send', 'dropped')) "
+                "FROM runs r ORDER BY r.created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(zip(('run_id', 'status', 'created_at', 'leads', 'finished'), r)) for r in rows]
+
+    # --- leads and stage outputs ---
+
+    def add_lead(self, run_id, seq, lead):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO leads (run_id, seq, url, lead) VALUES (?, ?, ?, ?)',
+                             (run_id, seq, lead.get('url') or '', json.dumps(lead, ensure_ascii=False, default=str)))
+            self._db.commit()
+
+    def save(self, run_id, seq, stage, value):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO artifacts (run_id, seq, stage, value, stored_at) VALUES (?, ?, ?, ?, ?)',
+                             (run_id, seq, stage, _pack(value), time.time()))
+            self._db.commit()
+
+    def lead_urls(self, run_id):
+        with self._lock:
+            return [r[0] for r in self._db.execute('SELECT url FROM leads WHERE run_id = ?', (run_id,))]
+
+    def next_seq(self, run_id):
+        with self._lock:
+            row = self._db.execute('SELECT MAX(seq) FROM leads WHERE run_id = ?', (run_id,)).fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def pending(self, run_id):
+        """
+        Yield (seq, lead, {stage: outputs}) for every lead of the run that has not
+        reached a terminal stage, in the order the leads were added.
+        """
+        with self._lock:
+            seqs = [r[0] for r in self._db.execute(
+                'SELECT seq FROM leads WHERE run_id = ? AND seq NOT IN '
+                '(SELECT seq FROM artifacts WHERE run_id = ? AND stage IN (%s)) ORDER BY seq'
+                % ','.join('?' * len(TERMINAL_STAGES)), (run_id, run_id, *TERMINAL_STAGES))]
+        for seq in seqs:
+            # One lead at a time, so resuming a big run doesn't load every saved page at once
+            with self._lock:
+                lead = self._db.execute('SELECT lead FROM leads WHERE run_id = ? AND seq = ?', (run_id, seq)).fetchone()
+                rows = self._db.execute('SELECT stage, value FROM artifacts WHERE run_id = ? AND seq = ?',
+                                        (run_id, seq)).fetchall()
+            saved = {}
+            for stage, blob in rows:
+                try:
+                    saved[stage] = _unpack(blob)
+                except Exception as e:
+                    logging.debug("Ignoring unreadable checkpoint %s/%s/%s: %s", run_id, seq, stage, e)
+            yield seq, json.loads(lead[0]), saved
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+__all__ = ['CheckpointStore', 'new_run_id', 'TERMINAL_STAGES']
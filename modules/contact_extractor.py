@@ -2,124 +2,158 @@
 """
 Contact extractor - robust email/phone/form/JSON-LD extraction and deobfuscation.
 Exports:
-  - extract_contacts_from_html(html, base_url=None)
+  - extract_contacts_from_page(page, tiered=True)
+  - extract_contacts_from_html(html, base_url=None, tiered=True)
   - extract_contacts(html_or_url)
 """
 import re
 import logging
-from bs4 import BeautifulSoup
-import requests
-import extruct
-from w3lib.html import get_base_url
+import lxml.etree
+from modules import fetchers
+from modules.parsed_page import ParsedPage
 
 EMAIL_RE = re.compile(r"[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}", re.I)
 # Accept varied phone token patterns; we will normalize digits
 PHONE_TOKEN_RE = re.compile(r'[\d\-\(\)\.\s\+]{7,20}')
+NON_DIGIT_RE = re.compile(r'[^0-9]')
+LONG_NUMERIC_RE = re.compile(r'\d{7,}')
 
-def extract_contacts_from_html(html, base_url=None):
+# Cheap pre-scan markers over the raw HTML; a pass only runs if its marker is present.
+# '@' also counts when entity-encoded, since the parsed text decodes it.
+AT_ENTITY_RE = re.compile(r'&#0*64;|&#x0*40;', re.I)
+OBFUSCATION_MARKERS = ('(at)', '[at]', ' at ')
+
+_MAILTO_XP = lxml.etree.XPath('//a[starts-with(@href, "mailto")]/@href')
+_FORM_ACTION_XP = lxml.etree.XPath('//form/@action')
+
+
+def extract_contacts_from_html(html, base_url=None, tiered=True):
     """
     Parse the HTML and return a dict:
       {'emails': [..], 'phones': [..], 'jsonld': [..], 'form_actions': [..]}
     """
-    result = {'emails': [], 'phones': [], 'jsonld': [], 'form_actions': []}
     if not html:
+        return {'emails': [], 'phones': [], 'jsonld': [], 'form_actions': []}
+    return extract_contacts_from_page(ParsedPage(html, url=base_url or ''), tiered=tiered)
+
+
+def _prescan(html):
+    """Which optional passes does this page need? Substring checks only; no parsing."""
+    lowered = html.lower()
+    return {
+        'mailto': 'mailto' in html,
+        'at': '@' in html or '&commat;' in lowered or ('&#' in html and bool(AT_ENTITY_RE.search(html))),
+        'form': '<form' in lowered,
+        'jsonld': 'application/ld+json' in html,
+        'microdata': 'itemscope' in lowered,
+    }
+
+
+def _add_phone(phones, value):
+    digits = NON_DIGIT_RE.sub('', value)
+    if 7 <= len(digits) <= 15:
+        phones.setdefault(digits)
+
+
+def _add_structured_contact(emails, phones, value):
+    # a plain string from JSON-LD/microdata may hold an email, a phone, or neither
+    if EMAIL_RE.search(value):
+        emails.setdefault(value)
+    _add_phone(phones, value)
+
+
+def extract_contacts_from_page(page, tiered=True):
+    """
+    Same as extract_contacts_from_html, reading from an already parsed ParsedPage.
+    With `tiered` (default) a pre-scan of the raw HTML decides which passes are
+    worth running: mailto links, '@' matching, forms, and the extruct JSON-LD /
+    microdata passes are skipped when their markers are absent. The result is
+    the same as running every pass.
+    """
+    result = {'emails': [], 'phones': [], 'jsonld': [], 'form_actions': []}
+    if page.tree is None:
         return result
 
-    soup = BeautifulSoup(html, 'lxml')
+    if tiered:
+        markers = _prescan(page.html)
+    else:
+        markers = dict.fromkeys(('mailto', 'at', 'form', 'jsonld', 'microdata'), True)
+    # dicts as ordered sets: first occurrence wins, O(1) membership
+    emails = {}
+    phones = {}
 
     # 1) mailto: links
-    for a in soup.select('a[href^=mailto]'):
-        try:
-            href = a.get('href', '')
-            email = href.split(':', 1)[1].split('?')[0].strip()
-            if email and re.search(EMAIL_RE, email):
-                if email not in result['emails']:
-                    result['emails'].append(email)
-        except Exception:
-            continue
+    if markers['mailto']:
+        for href in _MAILTO_XP(page.tree):
+            try:
+                email = href.split(':', 1)[1].split('?')[0].strip()
+            except IndexError:
+                continue
+            if email and EMAIL_RE.search(email):
+                emails.setdefault(email)
 
     # 2) visible emails in text
-    text = soup.get_text(separator=' ')
-    for m in set(re.findall(EMAIL_RE, text)):
-        m = m.strip().rstrip('.,;:')
-        if m and m not in result['emails']:
-            result['emails'].append(m)
+    text = page.visible_text
+    if markers['at']:
+        for m in EMAIL_RE.findall(text):
+            m = m.strip().rstrip('.,;:')
+            if m:
+                emails.setdefault(m)
 
     # 3) phones - keep only realistic phone-like tokens (7-15 digits after stripping)
-    raw_phone_tokens = set(re.findall(PHONE_TOKEN_RE, text))
-    clean_phones = []
-    for token in raw_phone_tokens:
-        digits = re.sub(r'[^0-9]', '', token)
-        if 7 <= len(digits) <= 15:
-            if digits not in clean_phones:
-                clean_phones.append(digits)
-    for p in clean_phones:
-        if p not in result['phones']:
-            result['phones'].append(p)
+    for token in PHONE_TOKEN_RE.findall(text):
+        _add_phone(phones, token)
 
     # 4) form actions
-    for f in soup.find_all('form'):
-        action = f.get('action') or ''
-        if action:
-            result['form_actions'].append(action)
-
-    # 5) json-ld / microdata via extruct
-    try:
-        base = get_base_url(html, base_url or '')
-        data = extruct.extract(html, base_url=base, syntaxes=['json-ld', 'microdata'])
-        for j in data.get('json-ld', []) + data.get('microdata', []):
-            result['jsonld'].append(j)
-            # try to extract emails/phones from JSON-LD contact info
-            if isinstance(j, dict):
-                # contactPoint can be list or dict
-                cp = j.get('contactPoint') or j.get('email') or j.get('telephone') or j.get('sameAs')
-                if isinstance(cp, str):
-                    if re.search(EMAIL_RE, cp) and cp not in result['emails']:
-                        result['emails'].append(cp)
-                    digits = re.sub(r'[^0-9]', '', cp)
-                    if 7 <= len(digits) <= 15 and digits not in result['phones']:
-                        result['phones'].append(digits)
-                elif isinstance(cp, dict):
-                    e = cp.get('email')
-                    t = cp.get('telephone')
-                    if e and re.search(EMAIL_RE, e) and e not in result['emails']:
-                        result['emails'].append(e)
-                    if t:
-                        digits = re.sub(r'[^0-9]', '', t)
-                        if 7 <= len(digits) <= 15 and digits not in result['phones']:
-                            result['phones'].append(digits)
-                elif isinstance(cp, list):
-                    for item in cp:
-                        if isinstance(item, str):
-                            if re.search(EMAIL_RE, item) and item not in result['emails']:
-                                result['emails'].append(item)
-                            digits = re.sub(r'[^0-9]', '', item)
-                            if 7 <= len(digits) <= 15 and digits not in result['phones']:
-                                result['phones'].append(digits)
-    except Exception as e:
-        logging.debug("extruct extraction failed: %s", e)
+    if markers['form']:
+        result['form_actions'] = [a for a in _FORM_ACTION_XP(page.tree) if a]
+
+    # 5) json-ld / microdata via extruct (run on the shared tree)
+    structured = []
+    if markers['jsonld']:
+        structured.extend(page.jsonld)
+    if markers['microdata']:
+        structured.extend(page.microdata)
+    for j in structured:
+        result['jsonld'].append(j)
+        # try to extract emails/phones from JSON-LD contact info
+        if not isinstance(j, dict):
+            continue
+        # contactPoint can be list or dict
+        cp = j.get('contactPoint') or j.get('email') or j.get('telephone') or j.get('sameAs')
+        if isinstance(cp, str):
+            _add_structured_contact(emails, phones, cp)
+        elif isinstance(cp, dict):
+            e = cp.get('email')
+            t = cp.get('telephone')
+            if isinstance(e, str) and EMAIL_RE.search(e):
+                emails.setdefault(e)
+            if isinstance(t, str):
+                _add_phone(phones, t)
+        elif isinstance(cp, list):
+            for item in cp:
+                if isinstance(item, str):
+                    _add_structured_contact(emails, phones, item)
 
     # 6) deobfuscation: replace common obfuscations and re-run email find
-    try:
+    if markers['at'] or any(tok in text for tok in OBFUSCATION_MARKERS):
         deob = text
         deob = deob.replace('(at)', '@').replace('[at]', '@').replace(' at ', '@')
         deob = deob.replace('(dot)', '.').replace('[dot]', '.').replace(' dot ', '.')
-        for m in set(re.findall(EMAIL_RE, deob)):
-            if m not in result['emails']:
-                result['emails'].append(m)
-    except Exception:
-        pass
+        if '@' in deob:
+            for m in EMAIL_RE.findall(deob):
+                emails.setdefault(m)
 
     # final sanity: remove obviously invalid emails (e.g., long numeric strings) and duplicates
-    cleaned_emails = []
-    for e in result['emails']:
+    cleaned_emails = {}
+    for e in emails:
         e = e.strip().rstrip('.,;:')
         # skip crazy addresses like long numeric strings
-        if re.fullmatch(r'\d{7,}', e):
+        if LONG_NUMERIC_RE.fullmatch(e):
             continue
-        if e not in cleaned_emails:
-            cleaned_emails.append(e)
-    result['emails'] = cleaned_emails
+        cleaned_emails.setdefault(e)
+    result['emails'] = list(cleaned_emails)
+    result['phones'] = list(phones)
 
     return result
 
@@ -133,9 +167,8 @@ def extract_contacts(html_or_url):
         return {'emails': [], 'phones': []}
     if isinstance(html_or_url, str) and (html_or_url.startswith('http://') or html_or_url.startswith('https://')):
         try:
-            r = requests.get(html_or_url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-            r.raise_for_status()
-            return extract_contacts_from_html(r.text, base_url=r.url)
+            r = fetchers.fetch('direct', html_or_url, timeout=10)
+            return extract_contacts_from_html(r['html'], base_url=r['final_url'])
         except Exception as e:
             logging.debug("fetch for extract_contacts failed: %s", e)
             return {'emails': [], 'phones': []}
@@ -143,4 +176,4 @@ def extract_contacts(html_or_url):
         return extract_contacts_from_html(html_or_url)
 
 
-__all__ = ['extract_contacts', 'extract_contacts_from_html']
+__all__ = ['extract_contacts', 'extract_contacts_from_html', 'extract_contacts_from_page']
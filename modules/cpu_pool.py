@@ -0,0 +1,151 @@
+# modules/cpu_pool.py
+"""
+Process pool for the CPU-bound part of handling a page.
+
+Parsing, contact extraction (regex tiers, extruct), the structural checks and
+the AI text preparation are pure Python / lxml work that threads can't run in
+parallel because of the GIL. analyze_page() runs all of them in one call,
+process_page(), in a worker process:
+  - the HTML is encoded to UTF-8 once in the parent and crosses the process
+    boundary as a single bytes object; lxml parses those bytes directly
+  - only the compact results come back: contacts, structural pain points and
+    the summarised AI input text (no tree, no HTML)
+With no pool configured (workers=0) process_page() runs in the calling thread.
+Workers are started with 'forkserver' where available ('spawn' elsewhere), so
+they never inherit the pipeline's threads, sockets or browser handles. A worker
+that dies (e.g. out of memory on a huge page) breaks the whole executor and
+every page in flight on it; the pool is rebuilt and each of those pages is
+resubmitted once, so only a page that breaks the pool again fails. Timings
+recorded in a worker (modules.metrics) come back with each result and are
+merged into the parent's registry.
+Exports:
+  - process_page(data, url, final_url=None)
+  - CPUPool(workers)
+  - analyze_page(page_content, url=None)
+  - configure_cpu_pool(workers) / get_cpu_pool() / close_cpu_pool()
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from modules.metrics import METRICS, peak_rss_bytes
+
+
+def process_page(data, url, final_url=None):
+    """Parse UTF-8 HTML `data` once and return everything later stages need from it."""
+    from modules.contact_extractor import extract_contacts_from_page
+    from modules.pain_finder import check_structural_points, prepare_ai_input
+    from modules.parsed_page import ParsedPage
+
+    page = ParsedPage.from_bytes(data, url=url, final_url=final_url)
+    with METRICS.timer('cpu_step_seconds', step='parse'):
+        page.tree  # parse up front so the steps below are timed without it
+    with METRICS.timer('cpu_step_seconds', step='contacts'):
+        contacts = extract_contacts_from_page(page)
+    with METRICS.timer('cpu_step_seconds', step='structural'):
+        structural = check_structural_points(page)
+    with METRICS.timer('cpu_step_seconds', step='ai_prep'):
+        ai_input = prepare_ai_input(page)
+    return {'contacts': contacts, 'structural': structural, 'ai_input': ai_input}
+
+
+def _worker_init():
+    METRICS.journal()
+
+
+def _process_in_worker(data, url, final_url):
+    result = process_page(data, url, final_url)
+    result['metrics'] = METRICS.drain_events()
+    result['peak_rss'] = peak_rss_bytes()
+    return result
+
+
+def _as_bytes(page_content, url=None):
+    html = page_content.get('html') or ''
+    data = html.encode('utf-8') if isinstance(html, str) else html
+    url = url or page_content.get('url') or page_content.get('final_url', '')
+    return data, url, page_content.get('final_url')
+
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class CPUPool:
+    def __init__(self, workers):
+        self.workers = max(1, int(workers))
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+        self.restarts = 0
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=_context(), initializer=_worker_init)
+
+    def analyze(self, page_content, url=None):
+        """process_page() for a fetch_page() result, run in a worker; blocks the calling thread only."""
+        data, url, final_url = _as_bytes(page_content, url)
+        for attempt in range(2):
+            with self._lock:
+                executor = self._executor
+            try:
+                result = executor.submit(_process_in_worker, data, url, final_url).result()
+                break
+            except BrokenProcessPool:
+                # Every page in flight sees this, not just the one whose worker died
+                self._restart(executor, url)
+                if attempt:
+                    raise
+                logging.info("Resubmitting %s to the restarted CPU pool", url)
+        METRICS.replay(result.pop('metrics', None))
+        METRICS.max_gauge('peak_rss_bytes', result.pop('peak_rss', 0), process='cpu_worker')
+        return result
+
+    def _restart(self, executor, url):
+        with self._lock:
+            if self._executor is not executor:
+                return  # another thread already replaced it
+            logging.warning("A CPU worker died while handling %s; restarting the pool", url)
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+            self.restarts += 1
+            METRICS.incr('cpu_pool_restarts_total')
+
+    def close(self):
+        with self._lock:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def configure_cpu_pool(workers):
+    """Start a pool of `workers` processes (replacing any previous one); 0 means parse in-thread."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.close()
+        _POOL = CPUPool(workers) if workers and workers > 0 else None
+    return _POOL
+
+
+def get_cpu_pool():
+    return _POOL
+
+
+def close_cpu_pool():
+    configure_cpu_pool(0)
+
+
+def analyze_page(page_content, url=None):
+    """process_page() on the configured pool, or in the calling thread if there is none."""
+    pool = _POOL
+    if pool is not None:
+        return pool.analyze(page_content, url=url)
+    return process_page(*_as_bytes(page_content, url))
+
+
+__all__ = ['process_page', 'CPUPool', 'analyze_page', 'configure_cpu_pool', 'get_cpu_pool', 'close_cpu_pool']
@@ -0,0 +1,129 @@
+# modules/discovery_cache.py
+"""
+On-disk cache for lead discovery provider responses (SerpApi searches, Scrapfly
+SERP pages), so repeating a city/category sweep within the TTL costs no API
+credits and returns in milliseconds.
+
+Entries live in a modules.response_cache.ResponseCache (zlib-compressed JSON in
+SQLite) under a key built from the provider and the request parameters (engine,
+query, location, ...), with secrets such as `api_key` left out. Each provider
+has its own TTL; a forced refresh skips the lookup and overwrites the entry.
+Only successful responses with content are stored (see has_content): an empty
+SERP page or result list is refetched next time instead of being reused for
+the whole TTL.
+Exports:
+  - configure_discovery_cache(path=DEFAULT_PATH, ttls=None, refresh=False, enabled=True)
+  - get_discovery_cache()
+  - cached_response(provider, request, fetch, refresh=None)
+  - has_content(value)
+  - serpapi_search(params, refresh=None)
+  - discovery_cache_stats()
+"""
+import logging
+import os
+import threading
+
+from modules.response_cache import ResponseCache, make_key
+
+DEFAULT_PATH = os.path.join('.cache', 'discovery', 'responses.sqlite')
+
+# Days a provider's response is reused. Maps listings change slowly; organic SERPs drift faster.
+PROVIDER_TTL_DAYS = {
+    'serpapi': 7.0,
+    'scrapfly': 3.0,
+}
+DEFAULT_TTL_DAYS = 7.0
+
+# Request parameters that never go into the cache key
+SECRET_PARAMS = frozenset({'api_key', 'key', 'token'})
+
+_lock = threading.Lock()
+_settings = {'path': DEFAULT_PATH, 'ttls': dict(PROVIDER_TTL_DAYS), 'refresh': False, 'enabled': True}
+_cache = None
+
+
+def configure_discovery_cache(path=DEFAULT_PATH, ttls=None, refresh=False, enabled=True):
+    """
+    Point the cache at `path`. `ttls` maps provider -> days and is merged over
+    PROVIDER_TTL_DAYS; `refresh` makes every lookup miss (responses are still
+    stored); `enabled=False` turns caching off entirely.
+    """
+    global _cache
+    with _lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+        _settings.update(path=path, ttls={**PROVIDER_TTL_DAYS, **(ttls or {})}, refresh=refresh, enabled=enabled)
+
+
+def get_discovery_cache():
+    """The shared ResponseCache, opened on first use; None when caching is disabled."""
+    global _cache
+    if not _settings['enabled']:
+        return None
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                # Per-provider TTLs are applied on read, so the store itself never expires entries early
+                _cache = ResponseCache(_settings['path'], ttl=None)
+    return _cache
+
+
+def _ttl_seconds(provider):
+    return _settings['ttls'].get(provider, DEFAULT_TTL_DAYS) * 86400
+
+
+def has_content(value):
+    """
+    Whether a provider response is worth caching: a fetch dict with non-empty
+    'html', or a SerpApi-style payload with a non-empty '*_results' list and no
+    'error'. Anything else falsy or dict-shaped without either is not.
+    """
+    if not value:
+        return False
+    if not isinstance(value, dict):
+        return True
+    if value.get('error'):
+        return False
+    if 'html' in value:
+        return bool(value['html'])
+    return any(v for k, v in value.items() if k.endswith('_results'))
+
+
+def cached_response(provider, request, fetch, refresh=None):
+    """
+    Return the cached response for `provider` + `request` (a dict of request
+    parameters), or call `fetch()` and store what it returns. Exceptions from
+    `fetch` propagate and nothing is stored; neither is a response without
+    content (has_content).
+    """
+    cache = get_discovery_cache()
+    if cache is None:
+        return fetch()
+    refresh = _settings['refresh'] if refresh is None else refresh
+    key = make_key('discovery', provider, {k: v for k, v in request.items() if k not in SECRET_PARAMS})
+    if not refresh:
+        value = cache.get(key, ttl=_ttl_seconds(provider))
+        if value is not None:
+            logging.debug("Discovery cache hit: %s %s", provider, request.get('q') or request.get('url'))
+            return value
+    value = fetch()
+    if has_content(value):
+        cache.put(key, value)
+    else:
+        logging.debug("Not caching empty %s response for %s", provider, request.get('q') or request.get('url'))
+    return value
+
+
+def serpapi_search(params, refresh=None):
+    """modules.fetchers SerpApiBackend.search(params), served from the cache when possible."""
+    from modules.fetchers import get_backend
+    return cached_response('serpapi', params, lambda: get_backend('serpapi').search(params), refresh=refresh)
+
+
+def discovery_cache_stats():
+    return _cache.stats() if _cache is not None else None
+
+
+__all__ = ['configure_discovery_cache', 'get_discovery_cache', 'cached_response', 'has_content', 'serpapi_search',
+           'discovery_cache_stats', 'PROVIDER_TTL_DAYS', 'DEFAULT_PATH']
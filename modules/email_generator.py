@@ -1,64 +1,37 @@
 # modules/email_generator.py
+"""
+Render outreach emails from Jinja templates.
+
+Templates are compiled once per process and reused (auto_reload is off, so
+there is no per-render stat of the template file); generate_emails() renders
+a whole batch of leads reading the sender settings once.
+Exports:
+  - generate_email(context, template_path='templates/sample_template.j2', use_openai=False)
+  - generate_emails(contexts, template_path='templates/sample_template.j2', use_openai=False)
+  - preview_email(subject, body)
+"""
 import os
-import re
+from functools import lru_cache
 from jinja2 import Environment, FileSystemLoader, select_autoescape
+from modules.sanitizer import sanitize
 
-env = Environment(loader=FileSystemLoader('templates'), autoescape=select_autoescape())
+env = Environment(loader=FileSystemLoader('templates'), autoescape=select_autoescape(), auto_reload=False)
 
 # Default website from your input; override with SENDER_WEBSITE in .env
 DEFAULT_WEBSITE = 'https://retrohacker-portfolio.vercel.app/'
 
 def _sanitize_text(text: str) -> str:
     """
-    Clean common placeholders, bracketed tokens, and AI-identifying phrases.
+    Clean common placeholders, bracketed tokens, and AI-identifying phrases
+    (see modules.sanitizer, shared with openai_prompt).
     Steps:
       - remove bracketed placeholders: [..], {..}, <..>
-      - remove standalone placeholder lines like 'Your Name', 'Your Company'
       - remove 'As an AI language model' variants
+      - remove standalone placeholder lines like 'Your Name', 'Your Company'
       - collapse multiple blank lines
       - trim whitespace
     """
-    if not text:
-        return text
-
-    # Remove bracketed placeholders like [Your Name], {Company}, <Name>
-    text = re.sub(r'\[.*?\]', '', text)
-    text = re.sub(r'\{.*?\}', '', text)
-    text = re.sub(r'<.*?>', '', text)
-
-    # Remove common AI-identifying phrases (case-insensitive)
-    ai_phrases = [
-        r'as an ai language model',
-        r'i am an ai',
-        r'as an ai',
-        r'i\'m an ai',
-        r'i am a language model',
-        r'as a language model'
-    ]
-    for p in ai_phrases:
-        text = re.sub(p, '', text, flags=re.IGNORECASE)
-
-    # Remove obvious placeholder-only lines (e.g., lines that only contain words like "Your Name")
-    lines = []
-    for line in text.splitlines():
-        stripped = line.strip()
-        # common placeholder tokens (case-insensitive)
-        placeholders = {'your name','your company','company name','[name]','name','[company]','your title'}
-        # consider a line placeholder if it's short and matches or contains the token
-        lower = stripped.lower()
-        if (len(stripped) < 40) and any(tok in lower for tok in placeholders):
-            continue
-        lines.append(line)
-
-    text = '\n'.join(lines)
-
-    # collapse more than 2 newlines to 2
-    text = re.sub(r'\n{3,}', '\n\n', text)
-
-    # Trim leading/trailing whitespace
-    text = text.strip()
-
-    return text
+    return sanitize(text, placeholder_lines=True)
 
 def _append_signature(text: str, sender_name: str, website: str) -> str:
     """
@@ -77,32 +50,51 @@ def _append_signature(text: str, sender_name: str, website: str) -> str:
         text = text + '\n'
     return text.strip() + sig
 
-def generate_email(context, template_path='templates/sample_template.j2', use_openai=False):
-    """
-    Render Jinja template, sanitize output, and append signature (website).
-    Returns: (subject, body)
-    """
-    tmpl = env.get_template(template_path.split('templates/')[-1])
+@lru_cache(maxsize=32)
+def _template(template_path):
+    return env.get_template(template_path.split('templates/')[-1])
+
+def _sender_settings():
+    return {
+        'SENDER_NAME': os.getenv('SENDER_NAME', '').strip(),
+        'COMPANY_NAME': os.getenv('COMPANY_NAME', '').strip(),
+        'SENDER_WEBSITE': os.getenv('SENDER_WEBSITE', DEFAULT_WEBSITE).strip(),
+    }
+
+def _render(tmpl, context, settings):
     # allow template to access SENDER_NAME & COMPANY_NAME but we'll sanitize results later
     rendered = tmpl.render(**context,
-                           SENDER_NAME=os.getenv('SENDER_NAME', '').strip(),
-                           COMPANY_NAME=os.getenv('COMPANY_NAME', '').strip())
+                           SENDER_NAME=settings['SENDER_NAME'],
+                           COMPANY_NAME=settings['COMPANY_NAME'])
     # simple heuristic: first non-empty line as subject
     lines = [l for l in rendered.splitlines() if l.strip() != '']
     subject = lines[0].strip() if lines else f"Quick question about {context.get('lead',{}).get('domain','your site')}"
     body = '\n'.join(lines[1:]).strip() if len(lines) > 1 else ''
 
-    # sanitize and append signature (use SENDER_WEBSITE env or default)
-    sender_name = os.getenv('SENDER_NAME', '').strip()
-    sender_website = os.getenv('SENDER_WEBSITE', DEFAULT_WEBSITE).strip()
-
+    # sanitize and append signature (SENDER_WEBSITE env or default)
     body = _sanitize_text(body)
-    body = _append_signature(body, sender_name, sender_website)
+    body = _append_signature(body, settings['SENDER_NAME'], settings['SENDER_WEBSITE'])
     # also sanitize subject
     subject = _sanitize_text(subject)
 
     return subject, body
 
+def generate_email(context, template_path='templates/sample_template.j2', use_openai=False):
+    """
+    Render Jinja template, sanitize output, and append signature (website).
+    Returns: (subject, body)
+    """
+    return _render(_template(template_path), context, _sender_settings())
+
+def generate_emails(contexts, template_path='templates/sample_template.j2', use_openai=False):
+    """
+    Batch version of generate_email: one template lookup and one read of the
+    sender settings for the whole batch. Returns a list of (subject, body).
+    """
+    tmpl = _template(template_path)
+    settings = _sender_settings()
+    return [_render(tmpl, context, settings) for context in contexts]
+
 def preview_email(subject, body):
     print("\n📧 [Email Preview]")
     print("Subject:", subject)
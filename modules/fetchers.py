@@ -0,0 +1,436 @@
+# modules/fetchers.py
+"""
+Fetcher backends behind one registry.
+
+Every way we have of getting a page (plain requests, Scrapfly, ScraperAPI,
+Selenium) and the SerpApi search endpoint registers itself here. HTTP backends
+share a pooled, keep-alive `requests.Session` each, sized per backend, so
+repeated calls reuse TCP/TLS connections instead of handshaking every time.
+
+Pool size and timeout come from the class defaults, can be overridden with
+FETCH_<NAME>_POOL / FETCH_<NAME>_TIMEOUT env vars, or at runtime with
+configure_backend(). The Selenium backend pools browsers instead of sessions
+(pool size = number of Chrome instances) and also reads
+FETCH_SELENIUM_MAX_PAGES, FETCH_SELENIUM_MAX_RSS_MB and FETCH_SELENIUM_BLOCK_MEDIA.
+
+Exports:
+  - register_backend(cls)          class decorator
+  - get_backend(name)
+  - configure_backend(name, pool_size=None, timeout=None, **options)
+  - fetch(name, url, delay=None, **opts)        -> {'html', 'final_url', 'status_code'}
+  - async_fetch(name, url, delay=None, **opts)  (awaitable variant for asyncio callers)
+  - close_all()
+"""
+import asyncio
+import atexit
+import importlib.util
+import logging
+import os
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.metrics import METRICS
+from modules.throttle import HOST_SCHEDULER, provider_quota
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (compatible; outreach-bot/1.0)'}
+
+_REGISTRY = {}
+_LOCK = threading.Lock()
+
+
+class FetchBackend:
+    """Base class: a named backend with its own pooled session and default timeout."""
+
+    name = None
+    pool_size = 10
+    timeout = 20
+    # Paid APIs set this so every call draws on the shared modules.throttle.provider_quota(name)
+    metered = False
+
+    def __init__(self):
+        prefix = f"FETCH_{self.name.upper()}_"
+        self.pool_size = int(os.getenv(prefix + 'POOL') or self.pool_size)
+        self.timeout = float(os.getenv(prefix + 'TIMEOUT') or self.timeout)
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._async_slots = weakref.WeakKeyDictionary()
+
+    def available(self):
+        return True
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    s = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    s.mount('http://', adapter)
+                    s.mount('https://', adapter)
+                    s.headers.update(HEADERS)
+                    self._session = s
+        return self._session
+
+    def configure(self, pool_size=None, timeout=None):
+        if timeout is not None:
+            self.timeout = timeout
+        if pool_size is not None and pool_size != self.pool_size:
+            self.pool_size = pool_size
+            self.close()  # rebuilt with the new pool size on next use
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def fetch(self, url, timeout=None, **opts):
+        raise NotImplementedError
+
+    def async_slots(self):
+        """Per-event-loop semaphore sized like the connection pool."""
+        loop = asyncio.get_running_loop()
+        sem = self._async_slots.get(loop)
+        if sem is None:
+            sem = self._async_slots[loop] = asyncio.Semaphore(self.pool_size)
+        return sem
+
+
+def register_backend(cls):
+    """Class decorator: instantiate the backend and make it available by `cls.name`."""
+    with _LOCK:
+        _REGISTRY[cls.name] = cls()
+    return cls
+
+
+def get_backend(name):
+    try:
+        return _REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"Unknown fetch backend '{name}'. Registered: {sorted(_REGISTRY)}") from None
+
+
+def configure_backend(name, pool_size=None, timeout=None, **options):
+    """Resize / retune a backend; extra keyword options are backend-specific (see SeleniumBackend.configure)."""
+    get_backend(name).configure(pool_size=pool_size, timeout=timeout, **options)
+
+
+def close_all():
+    for backend in list(_REGISTRY.values()):
+        backend.close()
+
+
+@register_backend
+class DirectBackend(FetchBackend):
+    name = 'direct'
+    pool_size = 20
+    timeout = 15
+
+    def fetch(self, url, timeout=None, headers=None, **opts):
+        r = self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+        r.raise_for_status()
+        # 304 only happens when the caller sent validators; the body is empty then
+        return {'html': r.text if r.status_code != 304 else '', 'final_url': r.url, 'status_code': r.status_code,
+                'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified')}
+
+
+@register_backend
+class ScrapflyBackend(FetchBackend):
+    name = 'scrapfly'
+    metered = True
+    endpoint = "https://api.scrapfly.io/scrape"
+    timeout = 60
+
+    def available(self):
+        return bool(os.getenv('SCRAPFLY_KEY'))
+
+    def fetch(self, url, timeout=None, render_js=False, asp=False, **opts):
+        key = os.getenv("SCRAPFLY_KEY")
+        if not key:
+            raise RuntimeError("SCRAPFLY_KEY not set in .env")
+        params = {'key': key, 'url': url, 'render_js': str(render_js).lower()}
+        if asp:
+            params['asp'] = 'true'
+        r = self.session.get(self.endpoint, params=params, timeout=timeout or self.timeout)
+        r.raise_for_status()
+        return {'html': r.text, 'final_url': url, 'status_code': r.status_code}
+
+
+@register_backend
+class ScraperAPIBackend(FetchBackend):
+    name = 'scraperapi'
+    metered = True
+    endpoint = "http://api.scraperapi.com"
+
+    def available(self):
+        return bool(os.getenv('SCRAPERAPI_KEY'))
+
+    def fetch(self, url, timeout=None, **opts):
+        key = os.getenv("SCRAPERAPI_KEY")
+        if not key:
+            raise RuntimeError("SCRAPERAPI_KEY not set in .env")
+        r = self.session.get(self.endpoint, params={'api_key': key, 'url': url}, timeout=timeout or self.timeout)
+        r.raise_for_status()
+        return {'html': r.text, 'final_url': url, 'status_code': r.status_code}
+
+
+@register_backend
+class SerpApiBackend(FetchBackend):
+    name = 'serpapi'
+    metered = True
+    endpoint = "https://serpapi.com/search.json"
+    pool_size = 4
+    timeout = 30
+
+    def available(self):
+        return bool(os.getenv('SERPAPI_KEY'))
+
+    def search(self, params, timeout=None):
+        """Run a SerpApi query and return the decoded JSON body."""
+        params = dict(params)
+        params.setdefault('api_key', os.getenv('SERPAPI_KEY'))
+        if not params.get('api_key'):
+            raise RuntimeError("SERPAPI_KEY not set in .env")
+        with provider_quota(self.name).slot():
+            r = self.session.get(self.endpoint, params=params, timeout=timeout or self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def fetch(self, url, timeout=None, **opts):
+        r = self.session.get(url, timeout=timeout or self.timeout)
+        r.raise_for_status()
+        return {'html': r.text, 'final_url': r.url, 'status_code': r.status_code}
+
+
+def _process_tree_rss(pid):
+    """Resident memory in bytes of `pid` and all its descendants (Linux /proc), or None if unknown."""
+    try:
+        children = {}
+        rss = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat', 'rb') as f:
+                    fields = f.read().rsplit(b')', 1)[1].split()
+            except OSError:
+                continue
+            # fields[1] is ppid, fields[21] is rss in pages (counting from the field after the comm)
+            children.setdefault(int(fields[1]), []).append(int(entry))
+            rss[int(entry)] = int(fields[21])
+    except OSError:
+        return None
+    if pid not in rss:
+        return None
+    total, todo = 0, [pid]
+    while todo:
+        p = todo.pop()
+        total += rss.get(p, 0)
+        todo.extend(children.get(p, ()))
+    return total * os.sysconf('SC_PAGE_SIZE')
+
+
+class _PooledDriver:
+    def __init__(self, driver, generation):
+        self.driver = driver
+        self.generation = generation
+        self.pages = 0
+        self.base_handle = driver.current_window_handle
+
+
+@register_backend
+class SeleniumBackend(FetchBackend):
+    """
+    Headless Chrome, pooled. Up to `pool_size` long-lived drivers are shared by
+    every worker; each fetch opens a fresh tab and closes it afterwards. A driver
+    is recycled after `max_pages` fetches, when its process tree passes
+    `max_rss_mb`, or after any browser error. With `block_media` images, fonts
+    and audio/video are not downloaded.
+    """
+
+    name = 'selenium'
+    pool_size = 2
+    timeout = 30
+    max_pages = 50
+    max_rss_mb = 1024
+    block_media = True
+    acquire_timeout = 300
+    BLOCKED_URLS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico', '*.bmp',
+                    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+                    '*.mp4', '*.webm', '*.ogg', '*.mp3', '*.wav', '*.m4a', '*.mov', '*.m3u8']
+
+    def __init__(self):
+        super().__init__()
+        prefix = f"FETCH_{self.name.upper()}_"
+        self.max_pages = int(os.getenv(prefix + 'MAX_PAGES') or self.max_pages)
+        self.max_rss_mb = float(os.getenv(prefix + 'MAX_RSS_MB') or self.max_rss_mb)
+        if os.getenv(prefix + 'BLOCK_MEDIA'):
+            self.block_media = os.getenv(prefix + 'BLOCK_MEDIA').lower() not in ('0', 'false', 'no')
+        self._idle = []
+        self._live = 0
+        self._generation = 0
+        self._pool_cond = threading.Condition()
+        self._driver_path = None
+        self._atexit = False
+
+    def available(self):
+        return all(importlib.util.find_spec(m) is not None for m in ('selenium', 'webdriver_manager'))
+
+    def configure(self, pool_size=None, timeout=None, max_pages=None, max_rss_mb=None, block_media=None):
+        if max_pages is not None:
+            self.max_pages = max_pages
+        if max_rss_mb is not None:
+            self.max_rss_mb = max_rss_mb
+        if block_media is not None and block_media != self.block_media:
+            self.block_media = block_media
+            self.close()  # browser prefs only apply to new drivers
+        super().configure(pool_size=pool_size, timeout=timeout)
+
+    def close(self):
+        """Quit idle drivers now; drivers that are mid-fetch are quit when they come back."""
+        with self._pool_cond:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+            self._pool_cond.notify_all()
+        for pooled in idle:
+            self._quit(pooled)
+        super().close()
+
+    # --- pool ---
+
+    def _new_driver(self):
+        # selenium + webdriver_manager are slow to import; only pay for it when a browser is needed
+        try:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.options import Options
+            from selenium.webdriver.chrome.service import Service
+            from webdriver_manager.chrome import ChromeDriverManager
+        except ImportError:
+            raise RuntimeError("selenium / webdriver_manager not installed")
+        with self._session_lock:
+            if self._driver_path is None:
+                self._driver_path = ChromeDriverManager().install()  # once per process, not per page
+        options = Options()
+        options.add_argument('--headless=new')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--disable-extensions')
+        options.add_argument(f"--user-agent={HEADERS['User-Agent']}")
+        if self.block_media:
+            options.add_argument('--blink-settings=imagesEnabled=false')
+            options.add_argument('--autoplay-policy=user-gesture-required')
+            options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        driver = webdriver.Chrome(service=Service(self._driver_path), options=options)
+        if not self._atexit:
+            self._atexit = True
+            atexit.register(self.close)
+        return driver
+
+    def _acquire(self):
+        with self._pool_cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._live < self.pool_size:
+                    self._live += 1
+                    generation = self._generation
+                    break
+                if not self._pool_cond.wait(timeout=self.acquire_timeout):
+                    raise RuntimeError(f"no browser free after {self.acquire_timeout}s")
+        try:
+            return _PooledDriver(self._new_driver(), generation)
+        except Exception:
+            with self._pool_cond:
+                self._live -= 1
+                self._pool_cond.notify()
+            raise
+
+    def _release(self, pooled, broken=False):
+        recycle = broken or pooled.pages >= self.max_pages or pooled.generation != self._generation
+        if not recycle and self.max_rss_mb:
+            process = getattr(getattr(pooled.driver, 'service', None), 'process', None)
+            rss = _process_tree_rss(process.pid) if process is not None else None
+            if rss is not None and rss > self.max_rss_mb * 1024 * 1024:
+                logging.info("Recycling browser after %d pages: %.0f MB resident", pooled.pages, rss / 1048576)
+                recycle = True
+        if recycle:
+            self._quit(pooled)
+        with self._pool_cond:
+            if recycle:
+                self._live -= 1
+            else:
+                self._idle.append(pooled)
+            self._pool_cond.notify()
+
+    @staticmethod
+    def _quit(pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logging.debug("Error quitting browser: %s", e)
+
+    # --- fetch ---
+
+    def fetch(self, url, timeout=None, **opts):
+        pooled = self._acquire()
+        driver = pooled.driver
+        healthy = False  # a page error (e.g. load timeout) is fine as long as the tab can be closed
+        try:
+            driver.switch_to.new_window('tab')
+            try:
+                if self.block_media:
+                    driver.execute_cdp_cmd('Network.enable', {})
+                    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.BLOCKED_URLS})
+                driver.set_page_load_timeout(timeout or self.timeout)
+                driver.get(url)
+                return {'html': driver.page_source, 'final_url': driver.current_url, 'status_code': 200}
+            finally:
+                pooled.pages += 1
+                driver.close()
+                driver.switch_to.window(pooled.base_handle)
+                healthy = True
+        finally:
+            self._release(pooled, broken=not healthy)
+
+
+def fetch(name, url, delay=None, **opts):
+    """
+    Fetch `url` through backend `name`, honouring the per-host politeness gap.
+    Raises on HTTP / transport errors; callers decide whether to retry or fall back.
+    """
+    backend = get_backend(name)
+    HOST_SCHEDULER.wait(url, delay)
+    start = time.perf_counter()
+    try:
+        if backend.metered:
+            with provider_quota(name).slot():
+                result = backend.fetch(url, **opts)
+        else:
+            result = backend.fetch(url, **opts)
+    except Exception:
+        METRICS.incr('fetch_attempts_total', backend=name, outcome='error')
+        raise
+    finally:
+        METRICS.observe('fetch_attempt_seconds', time.perf_counter() - start, backend=name)
+    METRICS.incr('fetch_attempts_total', backend=name, outcome='ok')
+    return result
+
+
+async def async_fetch(name, url, delay=None, **opts):
+    """
+    Awaitable fetch for asyncio callers. Runs the pooled blocking call in a worker
+    thread, with at most `pool_size` calls in flight per backend per event loop.
+    """
+    backend = get_backend(name)
+    async with backend.async_slots():
+        return await asyncio.to_thread(fetch, name, url, delay=delay, **opts)
+
+
+__all__ = ['FetchBackend', 'register_backend', 'get_backend', 'configure_backend',
+           'fetch', 'async_fetch', 'close_all', 'HEADERS']
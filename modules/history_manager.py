@@ -1,37 +1,160 @@
 # modules/history_manager.py
-import json, os, threading
-from datetime import datetime
+"""
+Run history as an append-only JSON Lines file (one run per line).
+  - append_run() writes a single line: O(1) no matter how long the history is
+  - get_last_runs(n) reads backwards from the end of the file
+  - query() streams the file and filters by date range and run args, stopping
+    at the first run past `end` (lines are appended in timestamp order)
+The old history.json ({'runs': [...]}) is imported ahead of any runs already in
+the .jsonl, which then starts with a marker line so it happens only once. If it
+can't be read the error is logged and the import is retried on the next start;
+the old file is always left in place.
+"""
+import json, logging, os, threading
+from datetime import date, datetime
 
 LOCK = threading.Lock()
 
+_TAIL_BLOCK = 8192
+# Key of the first-line record saying the legacy history.json has been imported
+MIGRATED_KEY = 'migrated_from'
+
+
 class HistoryManager:
-    def __init__(self, path='history.json'):
+    def __init__(self, path='history.jsonl', legacy_path=None):
+        if path.endswith('.json'):
+            legacy_path = legacy_path or path
+            path = path + 'l'
         self.path = path
-        if not os.path.exists(self.path):
-            with open(self.path, 'w', encoding='utf-8') as f:
-                json.dump({'runs': []}, f)
+        self.legacy_path = legacy_path or os.path.splitext(path)[0] + '.json'
+        if os.path.exists(self.legacy_path) and not self._migrated():
+            self._migrate_legacy()
 
     def append_run(self, summary: dict, details: dict = None):
+        entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'summary': summary,
+            'details': details or {}
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str) + '\n'
         with LOCK:
-            data = self._read()
-            entry = {
-                'timestamp': datetime.utcnow().isoformat(),
-                'summary': summary,
-                'details': details or {}
-            }
-            data['runs'].append(entry)
-            tmp = self.path + '.tmp'
-            with open(tmp, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            os.replace(tmp, self.path)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        return entry
 
     def get_last_runs(self, n=3):
-        data = self._read()
-        return data.get('runs', [])[-n:] if n and data.get('runs') else []
+        if not n or not os.path.exists(self.path):
+            return []
+        runs = []
+        for line in self._tail_lines(n):
+            entry = self._decode(line)
+            if entry is not None:
+                runs.append(entry)
+        return runs[-n:]
 
-    def _read(self):
+    def query(self, start=None, end=None, limit=None, **arg_filters):
+        """
+        Runs whose timestamp falls in [start, end] (date, datetime or ISO string, either
+        optional; a date-only `end` includes that whole day) and whose summary['args'] match
+        every keyword, e.g. query(city='Boston, MA', category='hvac').
+        String args match case-insensitively; for `category` a run matches if any of its
+        comma-separated categories does, and for list args (--city A B) if any element does.
+        """
+        start = start.isoformat() if isinstance(start, date) else start
+        end = end.isoformat() if isinstance(end, date) else end
+        if end and 'T' not in end and ' ' not in end:
+            end += 'T23:59:59.999999'
+        matches = []
+        for entry in self._iter_runs():
+            ts = entry.get('timestamp', '')
+            if start and ts < start:
+                continue
+            if end and ts > end:
+                break
+            run_args = (entry.get('summary') or {}).get('args') or {}
+            if all(self._arg_matches(run_args.get(k), v) for k, v in arg_filters.items()):
+                matches.append(entry)
+                if limit and len(matches) >= limit:
+                    break
+        return matches
+
+    @staticmethod
+    def _arg_matches(actual, wanted):
+        if isinstance(actual, (list, tuple)):
+            return actual == wanted or any(HistoryManager._arg_matches(a, wanted) for a in actual)
+        if isinstance(actual, str) and isinstance(wanted, str):
+            wanted = wanted.strip().lower()
+            return actual.strip().lower() == wanted or wanted in (p.strip().lower() for p in actual.split(','))
+        return actual == wanted
+
+    def _iter_runs(self):
         try:
             with open(self.path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return {'runs': []}
+                for line in f:
+                    entry = self._decode(line)
+                    if entry is not None:
+                        yield entry
+        except FileNotFoundError:
+            return
+
+    def _tail_lines(self, n):
+        # Read fixed-size blocks backwards until we hold more than n line breaks.
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b''
+            while pos > 0 and data.count(b'\n') <= n:
+                step = min(_TAIL_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        lines = data.decode('utf-8', errors='replace').splitlines()
+        if pos > 0:
+            lines = lines[1:]  # first line may be cut mid-record
+        return lines[-n:]
+
+    @staticmethod
+    def _decode(line):
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(entry, dict) or MIGRATED_KEY in entry:
+            return None
+        return entry
+
+    def _migrated(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                first = f.readline()
+            return MIGRATED_KEY in json.loads(first)
+        except (OSError, ValueError, TypeError):
+            return False
+
+    def _migrate_legacy(self):
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                runs = json.load(f)['runs']
+            if not isinstance(runs, list):
+                raise ValueError("'runs' is not a list")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.error("Could not import run history from %s (%s); it is left in place and the import will be "
+                          "retried next time", self.legacy_path, e)
+            return False
+        with LOCK:
+            # Runs appended while an earlier import kept failing stay; re-imported ones aren't doubled
+            current = list(self._iter_runs())
+            seen = {json.dumps(e, sort_keys=True, default=str) for e in current}
+            merged = [e for e in runs if isinstance(e, dict) and json.dumps(e, sort_keys=True, default=str) not in seen]
+            merged.extend(current)
+            merged.sort(key=lambda e: str(e.get('timestamp', '')))
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({MIGRATED_KEY: os.path.basename(self.legacy_path)}) + '\n')
+                for entry in merged:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+            os.replace(tmp, self.path)
+        return True
@@ -4,9 +4,11 @@ import requests
 import logging
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse, quote_plus
-from bs4 import BeautifulSoup
 from modules.serp_proxy import scrapfly_fetch
+from modules.discovery_cache import cached_response, serpapi_search
+from modules.url_index import DomainIndex, site_key, unique_leads
 
 AGGREGATOR_PATTERNS = [
     "yelp", "angi", "whitepages", "manta", "bbb.org", "yellowpages",
@@ -21,6 +23,7 @@ def parse_embedded_json(html: str):
     Attempts to find, clean, and parse the main JSON data blob
     from a Google search results page.
     """
+    from bs4 import BeautifulSoup  # only needed for discovery runs; kept off the startup path
     try:
         soup = BeautifulSoup(html, 'lxml')
         # Find the script tag containing the primary data, often in a variable like this.
@@ -61,7 +64,6 @@ def parse_embedded_json(html: str):
 
 def _serpapi_maps_query(query, location, api_key, max_results=10):
     # ... (This function remains the same as the last version)
-    url = "https://serpapi.com/search.json"
     params = {
         "engine": "Maps",
         "q": query,
@@ -76,9 +78,7 @@ def _serpapi_maps_query(query, location, api_key, max_results=10):
         params["location"] = location
     logging.info(f"DEBUG: Sending params to SerpApi: {params}")
     try:
-        r = requests.get(url, params=params, timeout=30)
-        r.raise_for_status()
-        data = r.json()
+        data = serpapi_search(params)
         places = data.get("local_results", [])
         if not places:
              logging.warning(f"SerpApi returned no 'local_results' for '{query}' in '{location}'.")
@@ -111,7 +111,10 @@ def discover_leads(city, category, max_results=10, filter_aggregators=False, use
     logging.info(f"Using Scrapfly for SERP fallback for '{category}'")
     try:
         search_query = quote_plus(f"{category} in {city}")
-        result = scrapfly_fetch(f"https://www.google.com/search?q={search_query}&hl=en&gl=us", render_js=True, asp=True)
+        serp_url = f"https://www.google.com/search?q={search_query}&hl=en&gl=us"
+        result = cached_response('scrapfly', {'engine': 'google', 'q': category, 'location': city, 'url': serp_url,
+                                              'render_js': True, 'asp': True},
+                                 lambda: scrapfly_fetch(serp_url, render_js=True, asp=True))
         html = result.get("html", "")
         if not html:
             logging.error("Scrapfly fallback returned no HTML.")
@@ -131,8 +134,10 @@ def discover_leads(city, category, max_results=10, filter_aggregators=False, use
 
         # 2. If JSON parsing fails, use the simple HTML tag method.
         logging.warning("JSON parsing failed or is not yet implemented. Trying simple HTML parsing.")
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html, 'lxml')
         results = []
+        domains = set()
         for result_container in soup.select("div.g"): # This selector may need updates
             link_tag = result_container.select_one("a[href]")
             link = link_tag.get('href') if link_tag else None
@@ -140,7 +145,9 @@ def discover_leads(city, category, max_results=10, filter_aggregators=False, use
                 continue
             if filter_aggregators and any(p in urlparse(link).netloc for p in AGGREGATOR_PATTERNS):
                 continue
-            if not any(urlparse(link).netloc == urlparse(res.get('url', '')).netloc for res in results):
+            domain = site_key(link)
+            if domain not in domains:
+                domains.add(domain)
                 title_tag = result_container.select_one('h3')
                 title = title_tag.get_text(strip=True) if title_tag else category
                 results.append({ "title": title, "url": link, "status": "found" })
@@ -153,4 +160,51 @@ def discover_leads(city, category, max_results=10, filter_aggregators=False, use
 
     except Exception as e:
         logging.error(f"SERP fallback failed entirely: {e}")
-        return []
\ No newline at end of file
+        return []
+
+
+def plan_queries(cities, categories):
+    """The city x category cross-product, blanks and duplicates (case-insensitive) dropped, in input order."""
+    seen = set()
+    plan = []
+    for city in cities:
+        for category in categories:
+            city, category = city.strip(), category.strip()
+            key = (city.lower(), category.lower())
+            if city and category and key not in seen:
+                seen.add(key)
+                plan.append((city, category))
+    return plan
+
+
+def discover_many(cities, categories, max_results=10, workers=4, index=None, skip=None, **kwargs):
+    """
+    Run discover_leads() for every (city, category) pair on a thread pool and yield
+    leads as each query finishes, so callers can start fetching before discovery is
+    done. Each lead is tagged with its city and category. A site found by several
+    queries is yielded once: leads go through modules.url_index.unique_leads with
+    `index` (a DomainIndex; pass the caller's so it is the only dedup) and `skip`
+    (e.g. OutreachLogger.already_processed). Paid providers are paced by their
+    shared quota in modules.throttle, so `workers` only bounds how many queries
+    wait at once.
+    """
+    plan = plan_queries(cities, categories)
+    logging.info(f"🔎 Discovery plan: {len(plan)} queries ({len(set(c for c, _ in plan))} cities)")
+    index = DomainIndex() if index is None else index
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(plan) or 1)), thread_name_prefix='discover') as pool:
+        futures = {pool.submit(discover_leads, city, category, max_results, **kwargs): (city, category)
+                   for city, category in plan}
+        try:
+            for future in as_completed(futures):
+                city, category = futures[future]
+                try:
+                    leads = future.result() or []
+                except Exception as e:
+                    logging.error(f"Discovery failed for {category} in {city}: {e}")
+                    continue
+                logging.info(f"🔎 {len(leads)} lead(s) for {category} in {city}")
+                for lead in unique_leads([lead for lead in leads if lead.get('url')], index, skip=skip):
+                    yield {**lead, 'city': city, 'category': category}
+        finally:
+            for future in futures:
+                future.cancel()  # consumer stopped early: don't spend quota on queries nobody will read
@@ -0,0 +1,197 @@
+# modules/lead_reader.py
+"""
+Streaming lead ingestion for --url-file.
+
+read_leads() is a generator: it reads the file in buffered chunks, one
+record at a time, so memory stays flat for multi-million-row dumps and the
+pipeline can start fetching as soon as the first lead is parsed. Supported inputs:
+  - plain text, one URL per line (url_list.txt)
+  - CSV/TSV with a header row, mapped by column name: url / website / site /
+    domain ..., title / name ..., phone / contact ... (maps_results.csv,
+    places_export.csv)
+  - headerless CSV, first URL-looking cell per row (lowell_urls_5mi.csv from defcon.py)
+  - JSONL, one object (with the same field names) or one URL string per line
+  - a JSON document (.json): an array of such objects / URL strings, or an
+    object holding one under leads / results / data / items / urls. Unlike
+    the other formats it is loaded whole, so use JSONL for very large exports
+  - any of the above gzip-compressed (.gz)
+Bare hosts (www.x.com) get http:// in every format. The format comes from the
+file extension, or from the first line when the extension says nothing.
+Exports:
+  - read_leads(path, fmt=None)
+  - detect_format(path)
+  - LeadFormatError
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+from urllib.parse import urlparse
+
+URL_FIELDS = ('url', 'website', 'website_url', 'site', 'homepage', 'domain', 'link', 'web')
+TITLE_FIELDS = ('title', 'name', 'business_name', 'business', 'company')
+CONTACT_FIELDS = ('phone', 'phone_number', 'telephone', 'contact')
+
+_EXTENSIONS = {'.txt': 'text', '.list': 'text', '.csv': 'csv', '.tsv': 'csv',
+               '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'json'}
+READ_BUFFER = 1 << 20
+# Keys of a JSON object that may hold the list of leads
+JSON_LIST_FIELDS = ('leads', 'results', 'data', 'items', 'urls', 'local_results')
+
+
+class LeadFormatError(ValueError):
+    """The lead file's contents don't match its format."""
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(io.BufferedReader(gzip.open(path, 'rb'), READ_BUFFER),
+                                encoding='utf-8-sig', errors='replace', newline='')
+    return open(path, encoding='utf-8-sig', errors='replace', newline='', buffering=READ_BUFFER)
+
+
+def detect_format(path):
+    """'text', 'csv', 'jsonl' or 'json' for `path` (a trailing .gz is looked through)."""
+    base = path[:-3] if path.endswith('.gz') else path
+    fmt = _EXTENSIONS.get(os.path.splitext(base)[1].lower())
+    if fmt:
+        return fmt
+    with _open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                if line.startswith('['):
+                    return 'json'
+                if line.startswith(('{', '"')):
+                    return 'jsonl'
+                return 'csv' if (',' in line or '\t' in line) else 'text'
+    return 'text'
+
+
+def _as_url(value):
+    """A URL for `value`, adding http:// to bare hosts ('www.x.com'); None if it doesn't look like one."""
+    value = (value or '').strip().strip('"\'')
+    if not value or ' ' in value:
+        return None
+    if '://' in value:
+        return value
+    return 'http://' + value if '.' in value.split('/', 1)[0] else None
+
+
+def _lead(url, title=None, contact=None):
+    lead = {'url': url, 'title': title or urlparse(url).netloc}
+    if contact:
+        lead['contact'] = contact
+    return lead
+
+
+def _first(record, fields):
+    for name in fields:
+        if record.get(name):
+            return str(record[name]).strip()
+    return None
+
+
+def _from_record(record):
+    record = {str(k).strip().lower().replace(' ', '_'): v for k, v in record.items() if k}
+    url = _as_url(_first(record, URL_FIELDS))
+    return _lead(url, _first(record, TITLE_FIELDS), _first(record, CONTACT_FIELDS)) if url else None
+
+
+def _read_text(f):
+    for line in f:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            url = _as_url(line)
+            if url:
+                yield _lead(url)
+            else:
+                logging.debug("Not a URL, skipped: %s", line)
+
+
+def _read_csv(f, path):
+    head = f.readline()
+    if not head:
+        return
+    dialect = 'excel-tab' if '\t' in head and ',' not in head else 'excel'
+    header = next(csv.reader([head], dialect=dialect))
+    names = [h.strip().lower().replace(' ', '_') for h in header]
+    if any(n in URL_FIELDS for n in names):
+        for row in csv.DictReader(f, fieldnames=names, dialect=dialect):
+            lead = _from_record(row)
+            if lead:
+                yield lead
+        return
+    logging.debug("%s has no URL column header; taking the first URL-looking cell of each row", path)
+    for row in csv.reader(_chain_line(head, f), dialect=dialect):
+        url = next((u for u in map(_as_url, row) if u), None)
+        if url:
+            yield _lead(url)
+
+
+def _chain_line(first, f):
+    yield first
+    yield from f
+
+
+def _read_jsonl(f, path):
+    for n, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            logging.debug("%s:%d is not valid JSON; skipped", path, n)
+            continue
+        lead = _from_value(record)
+        if lead:
+            yield lead
+
+
+def _from_value(record):
+    if isinstance(record, str):
+        url = _as_url(record)
+        return _lead(url) if url else None
+    if isinstance(record, dict):
+        return _from_record(record)
+    return None
+
+
+def _read_json(f, path):
+    try:
+        doc = json.load(f)
+    except ValueError as e:
+        raise LeadFormatError(f"{path} is not a JSON document ({e}); use .jsonl for one record per line") from None
+    if isinstance(doc, dict):
+        items = next((doc[k] for k in JSON_LIST_FIELDS if isinstance(doc.get(k), list)), None)
+        doc = items if items is not None else [doc]
+    if not isinstance(doc, list):
+        raise LeadFormatError(f"{path} holds a JSON {type(doc).__name__}, not a list of leads")
+    for record in doc:
+        lead = _from_value(record)
+        if lead:
+            yield lead
+
+
+def read_leads(path, fmt=None):
+    """
+    Yield lead dicts ({'url', 'title'[, 'contact']}) from `path` as they are read.
+    `fmt` ('text', 'csv', 'jsonl' or 'json') overrides detection. Raises
+    FileNotFoundError, and LeadFormatError for a .json file that isn't a list of leads.
+    """
+    fmt = fmt or detect_format(path)
+    with _open(path) as f:
+        if fmt == 'csv':
+            yield from _read_csv(f, path)
+        elif fmt == 'json':
+            yield from _read_json(f, path)
+        elif fmt == 'jsonl':
+            yield from _read_jsonl(f, path)
+        else:
+            yield from _read_text(f)
+
+
+__all__ = ['read_leads', 'detect_format', 'LeadFormatError', 'URL_FIELDS', 'TITLE_FIELDS', 'CONTACT_FIELDS']
@@ -0,0 +1,293 @@
+# modules/llm_executor.py
+"""
+Shared, rate-limit-aware executor for OpenAI chat calls.
+
+All LLM traffic (pain_finder, openai_prompt) goes through one LLMExecutor so
+that calls from many leads overlap while staying inside the account limits:
+  - at most `concurrency` requests in flight
+  - a limiter with two token buckets: requests per minute and tokens per
+    minute (tokens estimated from the prompt size + max_tokens, corrected
+    with the real usage once the response arrives)
+  - 429 / 5xx / connection errors are retried with exponential backoff and
+    full jitter; a 429 also pauses the limiter for everyone (honouring
+    Retry-After) so the other workers don't pile into the same wall
+
+The executor runs its own asyncio loop in a daemon thread. Async callers
+`await executor.achat(...)`; the threaded pipeline calls `executor.chat(...)`,
+which blocks the calling thread only.
+Exports:
+  - LLMExecutor(concurrency=4, rpm=500, tpm=200000, max_retries=6)
+  - RateLimiter(rpm, tpm)
+  - estimate_tokens(messages, max_tokens=0)
+  - get_llm_executor() / configure_llm_executor(**kwargs)
+  - openai_available()
+
+The OpenAI SDK takes about half a second to import, so it is only imported
+when the first request is made.
+"""
+import asyncio
+import importlib.util
+import logging
+import random
+import threading
+import time
+
+from modules.metrics import METRICS
+
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200000
+CHARS_PER_TOKEN = 4
+
+
+def openai_available():
+    """True if the OpenAI SDK is installed (checked without importing it)."""
+    return importlib.util.find_spec('openai') is not None
+
+
+def _openai():
+    try:
+        import openai
+    except ImportError:
+        return None
+    return openai
+
+
+def estimate_tokens(messages, max_tokens=0):
+    """Rough token count for a chat request: ~4 characters per token plus the completion budget."""
+    chars = sum(len(m.get('content') or '') for m in messages)
+    return chars // CHARS_PER_TOKEN + 4 * len(messages) + (max_tokens or 0)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute token buckets. Use from a single event loop."""
+
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm or 0)
+        self._tokens = float(tpm or 0)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    async def acquire(self, tokens):
+        """Wait until one request and `tokens` tokens fit in the budgets, then take them. Waiters are served FIFO."""
+        if self.tpm:
+            tokens = min(tokens, self.tpm)  # a request bigger than the bucket still has to go through eventually
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    wait = 0.0
+                    if self.rpm and self._requests < 1:
+                        wait = (1 - self._requests) * 60.0 / self.rpm
+                    if self.tpm and self._tokens < tokens:
+                        wait = max(wait, (tokens - self._tokens) * 60.0 / self.tpm)
+                    if wait <= 0:
+                        if self.rpm:
+                            self._requests -= 1
+                        if self.tpm:
+                            self._tokens -= tokens
+                        return
+                await asyncio.sleep(wait)
+
+    def adjust(self, delta_tokens):
+        """Correct the token bucket once the real usage is known (positive = we under-estimated)."""
+        if self.tpm and delta_tokens:
+            self._tokens -= delta_tokens
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class LLMExecutor:
+    def __init__(self, concurrency=4, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_retries=6,
+                 base_delay=1.0, max_delay=60.0, client=None):
+        self.concurrency = max(1, int(concurrency))
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._client = client
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'failures': 0,
+                      'prompt_tokens': 0, 'completion_tokens': 0}
+        self._stats_lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    # --- loop management ---
+
+    def _ensure_loop(self):
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    self._semaphore = asyncio.Semaphore(self.concurrency)
+                    self._limiter = RateLimiter(self.rpm, self.tpm)
+                    ready.set()
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name='llm-executor', daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+        return self._loop
+
+    def close(self):
+        with self._start_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            openai = _openai()
+            if openai is None:
+                raise RuntimeError("OpenAI SDK not installed")
+            # our own backoff handles retries, so the SDK's are turned off
+            self._client = openai.AsyncOpenAI(max_retries=0)
+        return self._client
+
+    # --- public API ---
+
+    def chat(self, **create_kwargs):
+        """Blocking chat.completions.create(**create_kwargs) for threaded callers."""
+        loop = self._ensure_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            raise RuntimeError("LLMExecutor.chat() called from the executor loop; use achat()")
+        return asyncio.run_coroutine_threadsafe(self._run(create_kwargs), loop).result()
+
+    async def achat(self, **create_kwargs):
+        """Awaitable chat.completions.create(**create_kwargs); usable from any event loop."""
+        loop = self._ensure_loop()
+        if asyncio.get_running_loop() is loop:
+            return await self._run(create_kwargs)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._run(create_kwargs), loop))
+
+    def snapshot(self):
+        with self._stats_lock:
+            return dict(self.stats)
+
+    # --- internals ---
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for k, v in deltas.items():
+                self.stats[k] = self.stats.get(k, 0) + v
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def _retry_after(exc):
+        response = getattr(exc, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        try:
+            return float(headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _retryable(exc):
+        openai = _openai()
+        if openai is None:
+            return False, False
+        if isinstance(exc, openai.RateLimitError):
+            return True, True
+        if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)):
+            return True, False
+        return False, False
+
+    async def _run(self, create_kwargs):
+        estimate = estimate_tokens(create_kwargs.get('messages', []), create_kwargs.get('max_tokens', 0))
+        attempt = 0
+        async with self._semaphore:
+            while True:
+                await self._limiter.acquire(estimate)
+                self._count(requests=1)
+                start = time.perf_counter()
+                try:
+                    response = await self.client.chat.completions.create(**create_kwargs)
+                except Exception as e:
+                    METRICS.observe('llm_call_seconds', time.perf_counter() - start)
+                    retryable, throttled = self._retryable(e)
+                    if not retryable or attempt >= self.max_retries:
+                        self._count(failures=1)
+                        METRICS.incr('llm_requests_total', outcome='failed')
+                        raise
+                    METRICS.incr('llm_requests_total', outcome='throttled' if throttled else 'retried')
+                    METRICS.incr('retries_total', op='llm')
+                    retry_after = self._retry_after(e)
+                    delay = self._backoff(attempt, retry_after)
+                    if throttled:
+                        self._count(throttled=1)
+                        self._limiter.pause(delay)
+                    self._count(retries=1)
+                    logging.debug("LLM call failed (%s); retry %d in %.1fs", e.__class__.__name__, attempt + 1, delay)
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                    continue
+                METRICS.observe('llm_call_seconds', time.perf_counter() - start)
+                METRICS.incr('llm_requests_total', outcome='ok')
+                usage = getattr(response, 'usage', None)
+                if usage is not None:
+                    prompt = getattr(usage, 'prompt_tokens', 0) or 0
+                    completion = getattr(usage, 'completion_tokens', 0) or 0
+                    self._count(prompt_tokens=prompt, completion_tokens=completion)
+                    METRICS.incr('llm_tokens_total', prompt, kind='prompt')
+                    METRICS.incr('llm_tokens_total', completion, kind='completion')
+                    self._limiter.adjust(prompt + completion - estimate)
+                return response
+
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_llm_executor():
+    """Process-wide executor, created with defaults on first use."""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = LLMExecutor()
+    return _EXECUTOR
+
+
+def configure_llm_executor(**kwargs):
+    """Replace the process-wide executor (e.g. from main's --llm-* flags)."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.close()
+        _EXECUTOR = LLMExecutor(**kwargs)
+    return _EXECUTOR
+
+
+__all__ = ['LLMExecutor', 'RateLimiter', 'estimate_tokens', 'get_llm_executor', 'configure_llm_executor',
+           'openai_available']
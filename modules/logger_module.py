@@ -1,33 +1,122 @@
 # modules/logger_module.py
-import csv, os, tempfile, shutil
+"""
+Outreach log backed by SQLite (WAL mode).
+
+Lookups by URL and by contact are answered from in-memory sets preloaded at
+start-up, and every record() is a single indexed INSERT instead of copying the
+whole CSV. URLs are matched by registrable domain (modules.url_index), so
+http://x.com, https://www.x.com/ and https://x.com/?utm_source=... are one
+site. The CSV format is still available through export_csv(); an existing
+outreach_log.csv is imported once, in the same transaction that records the
+migration in the meta table. If the import fails it is retried on the next
+start, and export_csv() refuses to overwrite the CSV it could not read.
+"""
+import csv, logging, os, sqlite3, threading
 from datetime import datetime
 
+from modules.url_index import DomainIndex
+
+LOCK = threading.Lock()
+
+FIELDNAMES = ['timestamp', 'url', 'contact', 'subject', 'status']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outreach (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    url       TEXT NOT NULL,
+    contact   TEXT NOT NULL DEFAULT '',
+    subject   TEXT NOT NULL DEFAULT '',
+    status    TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS outreach_url ON outreach(url);
+CREATE INDEX IF NOT EXISTS outreach_contact ON outreach(contact);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_INSERT = 'INSERT INTO outreach (timestamp, url, contact, subject, status) VALUES (?, ?, ?, ?, ?)'
+
+
 class OutreachLogger:
-    def __init__(self, path='outreach_log.csv'):
+    def __init__(self, path='outreach_log.csv', db_path=None):
         self.path = path
-        if not os.path.exists(self.path):
-            with open(self.path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=['timestamp','url','contact','subject','status'])
-                writer.writeheader()
+        self.db_path = db_path or os.path.splitext(path)[0] + '.sqlite'
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        self.csv_imported = self._migrate()
+        self.domains = DomainIndex(row[0] for row in self._db.execute('SELECT DISTINCT url FROM outreach'))
+        self._contacts = {row[0] for row in self._db.execute("SELECT DISTINCT contact FROM outreach WHERE contact != ''")}
 
     def already_processed(self, url):
-        try:
-            with open(self.path, newline='', encoding='utf-8') as f:
-                for row in csv.DictReader(f):
-                    if row.get('url') == url:
-                        return True
-        except FileNotFoundError:
-            return False
-        return False
+        return url in self.domains
+
+    def already_contacted(self, contact):
+        return bool(contact) and contact in self._contacts
 
     def record(self, url, contact='', subject='', status=''):
         timestamp = datetime.utcnow().isoformat()
-        row = {'timestamp': timestamp, 'url': url, 'contact': contact, 'subject': subject, 'status': status}
-        fd, tmp = tempfile.mkstemp(prefix='outreach_', suffix='.csv')
-        os.close(fd)
-        if os.path.exists(self.path):
-            shutil.copyfile(self.path, tmp)
-        with open(tmp, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['timestamp','url','contact','subject','status'])
-            writer.writerow(row)
-        os.replace(tmp, self.path)
+        with LOCK:
+            self._db.execute(_INSERT, (timestamp, url, contact or '', subject or '', status or ''))
+            self._db.commit()
+            self.domains.add(url)
+            if contact:
+                self._contacts.add(contact)
+
+    def rows(self):
+        """Yield every logged row as a dict, oldest first (separate read connection; WAL lets writers continue)."""
+        db = sqlite3.connect(self.db_path)
+        try:
+            for row in db.execute('SELECT timestamp, url, contact, subject, status FROM outreach ORDER BY id'):
+                yield dict(zip(FIELDNAMES, row))
+        finally:
+            db.close()
+
+    def export_csv(self, path=None):
+        """
+        Write the whole log in the historical outreach_log.csv format. Returns the path
+        written, or None if that would overwrite a legacy CSV that was never imported.
+        """
+        path = path or self.path
+        if not self.csv_imported and os.path.abspath(path) == os.path.abspath(self.path):
+            logging.error("Not exporting over %s: it has not been imported into %s yet", path, self.db_path)
+            return None
+        tmp = path + '.tmp'
+        with open(tmp, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(self.rows())
+        os.replace(tmp, path)
+        return path
+
+    def close(self):
+        with LOCK:
+            self._db.close()
+
+    def _migrate(self):
+        """Import the legacy CSV once; True when the database holds everything the CSV had."""
+        if self._db.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+            return True
+        try:
+            with LOCK, self._db:  # one transaction: the rows and the marker land together or not at all
+                if os.path.exists(self.path):
+                    self._import_csv(self.path)
+                self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', '1')")
+        except (OSError, UnicodeDecodeError, csv.Error, sqlite3.Error) as e:
+            logging.error("Could not import %s into %s (will retry next run): %s", self.path, self.db_path, e)
+            return False
+        return True
+
+    def _import_csv(self, path):
+        # Databases from before the meta table may already hold these rows (or rows
+        # logged after a failed import), so only rows not present yet are added
+        existing = set(self._db.execute('SELECT timestamp, url, contact, subject, status FROM outreach'))
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = [row for row in ((r.get('timestamp') or '', r.get('url') or '', r.get('contact') or '',
+                                     r.get('subject') or '', r.get('status') or '') for r in csv.DictReader(f))
+                    if row not in existing]
+        self._db.executemany(_INSERT, rows)
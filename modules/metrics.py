@@ -0,0 +1,246 @@
+# modules/metrics.py
+"""
+Lightweight per-run instrumentation: counters, gauges and latency histograms.
+
+Code under measurement calls the module-level helpers, which record into the
+process-wide METRICS registry:
+    with timer('fetch_attempt_seconds', backend='direct'):
+        ...
+    incr('fetch_page_total', source='cache')
+Histograms use fixed Prometheus-style buckets, so recording is a lock, a
+bisect and a few additions. At the end of a run main.py writes the registry
+as JSON and in Prometheus text format (write_metrics) and stores summary()
+in the run history.
+
+Worker processes (modules.cpu_pool) record into their own registry in
+journal mode; the events travel back with each result and are replayed into
+the parent's registry, so the per-run export covers them too.
+Exports:
+  - Metrics / METRICS
+  - timer(name, **labels), incr(name, value=1, **labels), observe(name, seconds, **labels),
+    set_gauge(name, value, **labels)
+  - peak_rss_bytes()                (this process; CPU workers report theirs as they go)
+  - write_metrics(path_prefix, metrics=METRICS)
+"""
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = 'outreach_'
+# Seconds; covers sub-millisecond parsing through minute-long paid fetches
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('%s="%s"' % (k, v.replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs) + '}'
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (capped at the observed max)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS + (self.max,), self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': round(self.sum, 6), 'max': round(self.max, 6),
+                'p50': round(self.quantile(0.5), 6), 'p95': round(self.quantile(0.95), 6),
+                'buckets': dict(zip([*map(str, BUCKETS), '+Inf'], self.counts))}
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._events = None
+
+    # --- recording ---
+
+    def incr(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            if self._events is not None:
+                self._events.append(('incr', name, labels, value))
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(seconds)
+            if self._events is not None:
+                self._events.append(('observe', name, labels, seconds))
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    def max_gauge(self, name, value, **labels):
+        """Raise the gauge to `value` if that is higher (peaks reported by several sources)."""
+        key = _key(name, labels)
+        with self._lock:
+            self.gauges[key] = max(self.gauges.get(key, value), value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # --- worker processes ---
+
+    def journal(self):
+        """Also keep a list of recorded events, to be shipped with drain_events()."""
+        with self._lock:
+            self._events = []
+
+    def drain_events(self):
+        with self._lock:
+            events, self._events = self._events or [], ([] if self._events is not None else None)
+        return events
+
+    def replay(self, events):
+        for kind, name, labels, value in events or ():
+            if kind == 'incr':
+                self.incr(name, value, **labels)
+            else:
+                self.observe(name, value, **labels)
+
+    # --- export ---
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """Everything recorded, as JSON-ready lists of {'name', 'labels', ...}."""
+        with self._lock:
+            return {
+                'started': self.started,
+                'elapsed_seconds': round(time.time() - self.started, 3),
+                'counters': [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in sorted(self.counters.items())],
+                'gauges': [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in sorted(self.gauges.items())],
+                'histograms': [{'name': n, 'labels': dict(l), **h.to_dict()}
+                               for (n, l), h in sorted(self.histograms.items())],
+            }
+
+    def summary(self):
+        """Compact form for the run history: 'name{k=v}' -> value, or count/sum/p50/p95/max for histograms."""
+        def flat(name, labels):
+            return name + ('{' + ','.join(f"{k}={v}" for k, v in labels) + '}' if labels else '')
+        with self._lock:
+            out = {flat(n, l): v for (n, l), v in sorted(self.counters.items())}
+            out.update({flat(n, l): v for (n, l), v in sorted(self.gauges.items())})
+            for (n, l), h in sorted(self.histograms.items()):
+                d = h.to_dict()
+                d.pop('buckets')
+                out[flat(n, l)] = d
+        return out
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            for kind, table in (('counter', self.counters), ('gauge', self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(table.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{PREFIX}{name}{_label_text(labels)} {value}")
+            typed = set()
+            for (name, labels), hist in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {PREFIX}{name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, n in zip([*map(str, BUCKETS), '+Inf'], hist.counts):
+                    cumulative += n
+                    lines.append(f"{PREFIX}{name}_bucket{_label_text(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{_label_text(labels)} {hist.sum:.6f}")
+                lines.append(f"{PREFIX}{name}_count{_label_text(labels)} {hist.count}")
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+
+
+def timer(name, **labels):
+    return METRICS.timer(name, **labels)
+
+
+def incr(name, value=1, **labels):
+    METRICS.incr(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    METRICS.observe(name, seconds, **labels)
+
+
+def set_gauge(name, value, **labels):
+    METRICS.set_gauge(name, value, **labels)
+
+
+def peak_rss_bytes():
+    """Peak resident set size of the calling process, in bytes (0 where unavailable, e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def write_metrics(path_prefix, metrics=METRICS):
+    """Write `<path_prefix>.json` and `<path_prefix>.prom`; returns both paths."""
+    parent = os.path.dirname(path_prefix)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    paths = (path_prefix + '.json', path_prefix + '.prom')
+    for path, text in zip(paths, (json.dumps(metrics.snapshot(), indent=2), metrics.to_prometheus())):
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(path + '.tmp', path)
+    return paths
+
+
+__all__ = ['Metrics', 'METRICS', 'Histogram', 'timer', 'incr', 'observe', 'set_gauge', 'peak_rss_bytes',
+           'write_metrics']
@@ -1,9 +1,7 @@
 # modules/openai_prompt.py
 import os, logging, json, re
-try:
-    import openai
-except Exception:
-    openai = None
+from modules.llm_executor import get_llm_executor, openai_available
+from modules.sanitizer import sanitize
 
 FEW_SHOT = [
     {"role":"system","content":
@@ -14,36 +12,24 @@ FEW_SHOT = [
     }
 ]
 
-# Reuse the sanitize routine to strip bracket tokens and AI phrases in the assistant output
+# Same sanitizer as email_generator: strips bracket tokens and AI phrases from the model output
 def _post_sanitize(text: str) -> str:
-    if not text:
-        return text
-    # remove bracket tokens and braces
-    text = re.sub(r'\[.*?\]', '', text)
-    text = re.sub(r'\{.*?\}', '', text)
-    text = re.sub(r'<.*?>', '', text)
-    # remove AI phrases
-    text = re.sub(r'(?i)as an ai language model', '', text)
-    text = re.sub(r'(?i)i am an ai', '', text)
-    text = re.sub(r'(?i)as an ai', '', text)
-    text = re.sub(r'(?i)i\'m an ai', '', text)
-    # collapse multiple newlines
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    return text.strip()
+    return sanitize(text)
+
+SIGNATURE_RE = re.compile(r'(?i)(best regards|best|regards|sincerely)[\s\S]*$')
 
 def personalize_email_body(context, base_body, model='gpt-4o-mini', temp=0.6, max_tokens=300):
     """
     Call OpenAI (if available) to rewrite and personalize base_body.
     After LLM output, perform post-processing to remove placeholders and AI signatures.
     """
-    if not openai:
+    if not openai_available():
         logging.warning("OpenAI SDK not installed; returning base body.")
         return base_body
     key = os.getenv('OPENAI_API_KEY')
     if not key:
         logging.warning("OPENAI_API_KEY missing; returning base body.")
         return base_body
-    openai.api_key = key
 
     # Build user content: include lead, detected pains, and the base email
     user_content = {
@@ -57,8 +43,8 @@ def personalize_email_body(context, base_body, model='gpt-4o-mini', temp=0.6, ma
     messages.append({'role': 'user', 'content': json.dumps(user_content)})
 
     try:
-        # Use ChatCompletion or the compatible method on the SDK available
-        resp = openai.ChatCompletion.create(model=model, messages=messages, temperature=temp, max_tokens=max_tokens)
+        # Shared executor: concurrency cap, RPM/TPM budgets and 429 backoff
+        resp = get_llm_executor().chat(model=model, messages=messages, temperature=temp, max_tokens=max_tokens)
         out = resp.choices[0].message.content
         out = _post_sanitize(out)
 
@@ -68,7 +54,7 @@ def personalize_email_body(context, base_body, model='gpt-4o-mini', temp=0.6, ma
         sender_website = os.getenv('SENDER_WEBSITE', 'https://retrohacker-portfolio.vercel.app/').strip()
         # If the model accidentally left a placeholder signature, remove it and append ours
         # remove trailing lines that look like signature placeholders
-        out = re.sub(r'(?i)(best regards|best|regards|sincerely)[\s\S]*$', '', out).strip()
+        out = SIGNATURE_RE.sub('', out).strip()
         signature = ("\n\n" + (f"Best,\n{sender_name}\n{sender_website}" if sender_name else f"Best regards,\n{sender_website}"))
         out = out + signature
 
@@ -0,0 +1,280 @@
+# modules/outbox.py
+"""
+Durable outbox between email rendering and SMTP delivery.
+
+The pipeline's send stage only enqueues rendered messages (one SQLite INSERT),
+so a slow or deferring mail server never holds up fetching and analysis.
+OutboxDrainer threads deliver from the outbox at their own pace:
+  - an overall rate (messages per minute) and a per-recipient-domain rate
+  - temporary failures (4xx, dropped connections) are retried with exponential
+    backoff; permanent ones (5xx) fail immediately
+  - the final status of every message is written to OutreachLogger
+Messages that are still waiting for a retry when the run ends stay in the
+outbox and are picked up by the next run (or by `main.py --drain-outbox`).
+A message found in 'sending' state at start-up (the process died mid-send) is
+marked 'interrupted' rather than re-sent, so nobody gets the same email twice.
+Exports:
+  - Outbox(path='outbox.sqlite')
+  - OutboxDrainer(outbox, logger=None, rate=20, domain_rate=2, workers=1, max_attempts=5)
+"""
+import logging
+import os
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+
+from modules.metrics import METRICS
+from modules.sender import build_message, get_smtp_pool
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    url           TEXT NOT NULL DEFAULT '',
+    recipient     TEXT NOT NULL UNIQUE,
+    domain        TEXT NOT NULL,
+    subject       TEXT NOT NULL DEFAULT '',
+    body          TEXT NOT NULL DEFAULT '',
+    is_html       INTEGER NOT NULL DEFAULT 1,
+    status        TEXT NOT NULL DEFAULT 'queued',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    next_attempt  REAL NOT NULL,
+    last_error    TEXT NOT NULL DEFAULT '',
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox(status, next_attempt);
+"""
+
+_COLUMNS = ('id', 'url', 'recipient', 'domain', 'subject', 'body', 'is_html', 'attempts')
+
+# OutreachLogger status per final outbox state
+LOG_STATUS = {'sent': 'sent_successfully', 'failed': 'send_failed', 'interrupted': 'send_interrupted'}
+
+
+class Outbox:
+    def __init__(self, path='outbox.sqlite'):
+        self.path = path
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        self.interrupted = self._recover()
+
+    def _recover(self):
+        with self._lock:
+            rows = self._db.execute("SELECT url, recipient, subject FROM outbox WHERE status = 'sending'").fetchall()
+            if rows:
+                self._db.execute("UPDATE outbox SET status = 'interrupted', updated_at = ? WHERE status = 'sending'",
+                                 (time.time(),))
+                self._db.commit()
+                logging.warning("%d message(s) were mid-send when the last run stopped; marked interrupted", len(rows))
+        return [dict(zip(('url', 'recipient', 'subject'), r)) for r in rows]
+
+    def enqueue(self, recipient, subject, body, url='', is_html=True):
+        """Queue a message. Returns False if this recipient is already in the outbox."""
+        now = time.time()
+        domain = recipient.rsplit('@', 1)[-1].lower()
+        with self._lock:
+            cur = self._db.execute(
+                'INSERT OR IGNORE INTO outbox (url, recipient, domain, subject, body, is_html, next_attempt, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url or '', recipient, domain, subject or '', body or '', int(bool(is_html)), now, now, now),
+            )
+            self._db.commit()
+        return cur.rowcount == 1
+
+    def due(self, limit=200, now=None, per_domain=False):
+        """
+        Queued messages whose next attempt time has passed, oldest first. With
+        `per_domain` only the oldest due message of each recipient domain is returned,
+        so one busy domain can't hide the others from the scheduler.
+        """
+        now = time.time() if now is None else now
+        if per_domain:
+            # SQLite fills the bare columns from the row that has MIN(id) in each group
+            sql = ("SELECT id, url, recipient, domain, subject, body, is_html, attempts, MIN(id) FROM outbox "
+                   "WHERE status = 'queued' AND next_attempt <= ? GROUP BY domain ORDER BY next_attempt, id LIMIT ?")
+        else:
+            sql = ("SELECT id, url, recipient, domain, subject, body, is_html, attempts FROM outbox "
+                   "WHERE status = 'queued' AND next_attempt <= ? ORDER BY next_attempt, id LIMIT ?")
+        with self._lock:
+            rows = self._db.execute(sql, (now, limit)).fetchall()
+        return [dict(zip(_COLUMNS, r)) for r in rows]
+
+    def next_due_in(self):
+        """Seconds until the earliest queued message is due (0 if one is due now), or None if nothing is queued."""
+        with self._lock:
+            row = self._db.execute("SELECT MIN(next_attempt) FROM outbox WHERE status = 'queued'").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def _set(self, msg_id, status, **fields):
+        fields['status'] = status
+        fields['updated_at'] = time.time()
+        cols = ', '.join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._db.execute(f'UPDATE outbox SET {cols} WHERE id = ?', (*fields.values(), msg_id))
+            self._db.commit()
+
+    def mark_sending(self, msg_id):
+        self._set(msg_id, 'sending')
+
+    def mark_sent(self, msg_id, attempts):
+        self._set(msg_id, 'sent', attempts=attempts, last_error='')
+
+    def mark_retry(self, msg_id, attempts, delay, error):
+        self._set(msg_id, 'queued', attempts=attempts, next_attempt=time.time() + delay, last_error=str(error)[:500])
+
+    def mark_failed(self, msg_id, attempts, error):
+        self._set(msg_id, 'failed', attempts=attempts, last_error=str(error)[:500])
+
+    def counts(self):
+        with self._lock:
+            return dict(self._db.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall())
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _classify(exc):
+    """'retry' for temporary problems, 'fail' for permanent rejections."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in exc.recipients.values()]
+        return 'retry' if codes and all(400 <= c < 500 for c in codes) else 'fail'
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 'retry' if 400 <= exc.smtp_code < 500 else 'fail'
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, OSError)):
+        return 'retry'
+    return 'fail'
+
+
+class OutboxDrainer:
+    """
+    Background threads that deliver queued messages. `rate` is the overall
+    messages-per-minute budget, `domain_rate` the budget per recipient domain
+    (0 disables either). `send` defaults to the shared SMTP pool.
+    """
+
+    def __init__(self, outbox, logger=None, rate=20, domain_rate=2, workers=1, max_attempts=5,
+                 base_delay=60.0, max_delay=3600.0, send=None, poll=1.0):
+        self.outbox = outbox
+        self.logger = logger
+        self.gap = 60.0 / rate if rate else 0.0
+        self.domain_gap = 60.0 / domain_rate if domain_rate else 0.0
+        self.workers = max(1, int(workers))
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll = poll
+        self._send = send or (lambda msg: get_smtp_pool().send(msg))
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0}
+        self._cond = threading.Condition()
+        self._next_slot = 0.0
+        self._domain_next = {}
+        self._finishing = False
+        self._stopped = False
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f'outbox-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def notify(self):
+        """Wake idle workers (call after enqueueing)."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def close(self, timeout=None):
+        """
+        Deliver everything that is due, then stop. Messages waiting for a later retry
+        stay queued. With `timeout` (seconds), stop anyway once it has passed.
+        """
+        with self._cond:
+            self._finishing = True
+            self._cond.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for t in self._threads:
+            t.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+        return dict(self.stats)
+
+    # --- internals ---
+
+    def _claim(self):
+        """Pick the next message the rate limits allow; returns (message, monotonic send time) or None to stop."""
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                slot = max(now, self._next_slot)
+                due = self.outbox.due(per_domain=True)
+                for msg in due:
+                    if self._domain_next.get(msg['domain'], 0.0) <= slot:
+                        self._next_slot = slot + self.gap
+                        self._domain_next[msg['domain']] = slot + self.domain_gap
+                        self.outbox.mark_sending(msg['id'])
+                        return msg, slot
+                if not due and self._finishing:
+                    return None
+                wait = self.poll
+                if due:
+                    wait = min(wait, max(0.01, min(self._domain_next[m['domain']] for m in due) - now))
+                self._cond.wait(wait)
+        return None
+
+    def _worker(self):
+        while True:
+            claimed = self._claim()
+            if claimed is None:
+                return
+            msg, slot = claimed
+            delay = slot - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._deliver(msg)
+
+    def _deliver(self, msg):
+        attempts = msg['attempts'] + 1
+        try:
+            self._send(build_message(msg['recipient'], msg['subject'], msg['body'], is_html=bool(msg['is_html'])))
+        except Exception as e:
+            if _classify(e) == 'retry' and attempts < self.max_attempts:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+                self.outbox.mark_retry(msg['id'], attempts, delay, e)
+                self._count('retried')
+                METRICS.incr('retries_total', op='smtp')
+                logging.info("Deferred email to %s (attempt %d): %s; retrying in %.0fs",
+                             msg['recipient'], attempts, e, delay)
+                return
+            self.outbox.mark_failed(msg['id'], attempts, e)
+            self._count('failed')
+            logging.error("Giving up on email to %s after %d attempt(s): %s", msg['recipient'], attempts, e)
+            self._log(msg, 'failed')
+            return
+        self.outbox.mark_sent(msg['id'], attempts)
+        self._count('sent')
+        logging.info("Email sent to %s", msg['recipient'])
+        self._log(msg, 'sent')
+
+    def _count(self, key):
+        with self._cond:
+            self.stats[key] += 1
+
+    def _log(self, msg, status):
+        if self.logger is not None:
+            self.logger.record(url=msg['url'], contact=msg['recipient'], subject=msg['subject'], status=LOG_STATUS[status])
+
+
+__all__ = ['Outbox', 'OutboxDrainer', 'LOG_STATUS']
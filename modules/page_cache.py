@@ -0,0 +1,110 @@
+# modules/page_cache.py
+"""
+On-disk cache for fetched pages.
+
+Entries live in a single SQLite file (WAL mode, see modules.sqlite_cache)
+under the cache directory: zlib-compressed body, final URL, ETag /
+Last-Modified and access times.
+  - fresh entries (younger than `ttl`) are served without touching the network
+  - stale entries carry their validators so the caller can revalidate with
+    If-None-Match / If-Modified-Since and refresh() on a 304
+  - total compressed size is capped; least recently used entries go first
+Exports:
+  - PageCache(cache_dir, ttl=7 days, max_bytes=500 MB)
+  - cache_key(url)
+"""
+import hashlib
+import logging
+import os
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit
+
+from modules.sqlite_cache import SQLiteCache
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key           TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    final_url     TEXT,
+    etag          TEXT,
+    last_modified TEXT,
+    body          BLOB NOT NULL,
+    size          INTEGER NOT NULL,
+    stored_at     REAL NOT NULL,
+    last_access   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_last_access ON pages(last_access);
+"""
+
+
+def cache_key(url):
+    """Canonical cache key: lower-case scheme/host, no fragment, '/' for an empty path."""
+    parts = urlsplit(url.strip())
+    path = parts.path or '/'
+    canonical = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+class PageCache(SQLiteCache):
+    table = 'pages'
+    schema = _SCHEMA
+
+    def __init__(self, cache_dir='.cache/pages', ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        super().__init__(os.path.join(cache_dir, 'pages.sqlite'), ttl, max_bytes)
+
+    def get(self, url):
+        """
+        Return the cached entry for `url` or None:
+          {'html', 'final_url', 'etag', 'last_modified', 'fresh': bool}
+        """
+        key = cache_key(url)
+        with self._lock:
+            row = self._fetch(key, 'final_url, etag, last_modified, body, stored_at')
+            if row is None:
+                return None
+            now = time.time()
+            self._touch(key, now)
+        final_url, etag, last_modified, body, stored_at = row
+        try:
+            html = zlib.decompress(body).decode('utf-8')
+        except Exception as e:
+            logging.debug("Dropping unreadable cache entry for %s: %s", url, e)
+            self.delete(url)
+            return None
+        return {
+            'html': html,
+            'final_url': final_url or url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': (now - stored_at) < self.ttl,
+        }
+
+    def put(self, url, html, final_url=None, etag=None, last_modified=None):
+        if not html:
+            return
+        body = zlib.compress(html.encode('utf-8'), 6)
+        self._store(cache_key(url), len(body), url=url, final_url=final_url, etag=etag,
+                    last_modified=last_modified, body=body)
+
+    def refresh(self, url, etag=None, last_modified=None):
+        """Mark an entry as revalidated (304) so it is fresh for another `ttl`."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'UPDATE pages SET stored_at = ?, last_access = ?, etag = COALESCE(?, etag), '
+                'last_modified = COALESCE(?, last_modified) WHERE key = ?',
+                (now, now, etag, last_modified, cache_key(url)),
+            )
+            self._db.commit()
+
+    def delete(self, url):
+        self._delete(cache_key(url))
+
+
+__all__ = ['PageCache', 'cache_key', 'DEFAULT_TTL', 'DEFAULT_MAX_BYTES']
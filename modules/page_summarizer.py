@@ -0,0 +1,244 @@
+# modules/page_summarizer.py
+"""
+Token-budgeted page reducer for the pain-point prompt.
+
+Instead of the first N characters of the page (usually nav menus, cookie
+banners and footer link farms), build the prompt text from the parts that
+matter, in priority order, until the token budget is used:
+  1. title and meta description
+  2. headings (h1-h3)
+  3. the first screen of main content
+  4. calls to action (buttons, CTA links, "call / book / free quote" lines)
+  5. contact and services sections
+  6. remaining body text, in document order
+Boilerplate (nav, footer, aside, cookie/consent banners, modals, social
+widgets, link-dense blocks) is dropped first. A page whose whole stripped text
+already fits the budget is passed through as is, since the labels would only
+make it longer. Tokens are counted with modules.tokenizer (tiktoken when
+available).
+Exports:
+  - summarize_page(page, max_tokens=DEFAULT_MAX_TOKENS, model=None)
+"""
+import copy
+import re
+
+import lxml.etree
+
+from modules.parsed_page import as_parsed_page
+from modules.tokenizer import count_tokens, truncate_to_tokens
+
+DEFAULT_MAX_TOKENS = 1200
+FIRST_SCREEN_CHARS = 1500
+# What the prompt used to get: stripped text cut at 12000 characters
+LEGACY_MAX_CHARS = 12000
+LINK_FARM_MIN_LINKS = 5
+LINK_FARM_RATIO = 0.7
+
+DROP_TAGS = ('head', 'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'nav', 'footer', 'aside', 'select', 'canvas')
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'blockquote', 'body', 'br', 'button', 'dd', 'div', 'dl', 'dt', 'fieldset', 'figcaption',
+    'figure', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'label', 'li', 'main', 'ol', 'p', 'section',
+    'table', 'td', 'th', 'tr', 'ul',
+))
+HEADING_TAGS = frozenset(('h1', 'h2', 'h3'))
+
+BOILERPLATE_RE = re.compile(
+    r'cookie|consent|gdpr|banner-?ad|popup|modal|newsletter|breadcrumb|social|share|sharing|'
+    r'skip-?link|screen-reader|sr-only|visually-hidden|'
+    # Not a bare "menu": restaurant and cafe menus are the content that matters for those leads
+    r'(?:^|[\s_-])(?:nav|navbar|navigation|nav-?menu|menu-?toggle|mobile-?menu|menu-?bar|footer|sidebar)(?:$|[\s_-])',
+    re.I,
+)
+SECTION_RE = re.compile(r'contact|service|about|testimonial|review|pricing|hours|location|faq|why-?us', re.I)
+CTA_CLASS_RE = re.compile(r'\b(?:btn|button|cta)', re.I)
+CTA_TEXT_RE = re.compile(
+    r'\b(?:call|book|schedule|request|get (?:a|your|started)|free|quote|estimate|contact us|order|'
+    r'sign up|subscribe|buy|shop now|learn more|apply|reserve)\b', re.I)
+WS_RE = re.compile(r'\s+')
+
+_DROP_XP = lxml.etree.XPath('//' + ' | //'.join(DROP_TAGS) + ' | //*[@role="navigation" or @role="contentinfo" or @aria-hidden="true"]')
+_CLASSED_XP = lxml.etree.XPath('//*[@class or @id]')
+_META_DESC_XP = lxml.etree.XPath('//meta[@name="description" or @property="og:description"]/@content')
+_TITLE_XP = lxml.etree.XPath('//title')
+_LINKS_XP = lxml.etree.XPath('.//a')
+_HEADINGS_XP = lxml.etree.XPath('.//h1 | .//h2')
+_CONTAINERS_XP = lxml.etree.XPath('//ul | //ol | //div | //section | //table | //p')
+
+
+def _attrs(el):
+    return f"{el.get('class', '')} {el.get('id', '')}"
+
+
+def _link_dense(el):
+    """A block that is mostly anchor text (menus, tag clouds, footer link farms)."""
+    links = _LINKS_XP(el)
+    if len(links) < LINK_FARM_MIN_LINKS or _HEADINGS_XP(el):
+        return False
+    total = len(WS_RE.sub('', el.text_content()))
+    if not total:
+        return True
+    linked = sum(len(WS_RE.sub('', a.text_content())) for a in links)
+    return linked / total >= LINK_FARM_RATIO
+
+
+def _clean_copy(tree):
+    """Copy of the tree with boilerplate removed; the shared ParsedPage tree is never mutated."""
+    root = copy.deepcopy(tree)
+    for el in _DROP_XP(root):
+        if el.getparent() is not None:
+            el.drop_tree()
+    for el in _CLASSED_XP(root):
+        if el.getparent() is None or el.tag in ('html', 'body', 'main'):
+            continue
+        if BOILERPLATE_RE.search(_attrs(el)):
+            el.drop_tree()
+    # outermost link farms first; anything nested in a dropped block goes with it
+    for el in _CONTAINERS_XP(root):
+        if el.getparent() is not None and _link_dense(el):
+            el.drop_tree()
+    return root
+
+
+def _blocks(root):
+    """
+    Walk the cleaned tree and return rendered text blocks:
+    [{'text', 'tag', 'heading', 'cta', 'section'}] in document order.
+    """
+    blocks = []
+    buf = []
+    stack = []  # (tag, section_flag, cta_flag) of open block-ish ancestors
+
+    def flush(tag):
+        text = WS_RE.sub(' ', ''.join(buf)).strip()
+        buf.clear()
+        if text:
+            blocks.append({
+                'text': text,
+                'tag': tag,
+                'heading': tag in HEADING_TAGS,
+                'section': any(s for _, s, _ in stack),
+                'cta': any(c for _, _, c in stack),
+            })
+
+    for event, el in lxml.etree.iterwalk(root, events=('start', 'end')):
+        tag = el.tag if isinstance(el.tag, str) else None
+        if event == 'start':
+            if tag is None:
+                continue  # comments / processing instructions
+            if tag in BLOCK_TAGS:
+                flush(stack[-1][0] if stack else 'body')
+            attrs = _attrs(el)
+            is_cta = tag == 'button' or (tag == 'a' and bool(CTA_CLASS_RE.search(attrs)))
+            stack.append((tag, bool(SECTION_RE.search(attrs)), is_cta))
+            if el.text:
+                buf.append(el.text)
+        else:
+            if tag is not None:
+                if tag in BLOCK_TAGS:
+                    flush(tag)
+                else:
+                    buf.append(' ')
+                stack.pop()
+            if el.tail:
+                buf.append(el.tail)
+    flush('body')
+    return blocks
+
+
+def _dedupe(blocks):
+    seen = set()
+    out = []
+    for b in blocks:
+        key = b['text'].lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append(b)
+    return out
+
+
+def summarize_page(page, max_tokens=DEFAULT_MAX_TOKENS, model=None):
+    """
+    Reduce a page (ParsedPage, fetch dict or raw HTML) to the text worth sending to the LLM.
+    Returns {'text', 'tokens_before', 'tokens_after'}; tokens_before is what the old
+    "first 12000 characters" prompt input would have cost.
+    """
+    page = as_parsed_page(page)
+    stripped = page.stripped_text
+    tokens_before = count_tokens(stripped[:LEGACY_MAX_CHARS], model)
+    if page.tree is None:
+        return {'text': '', 'tokens_before': tokens_before, 'tokens_after': 0}
+    if len(stripped) <= LEGACY_MAX_CHARS and tokens_before <= max_tokens:
+        return {'text': stripped, 'tokens_before': tokens_before, 'tokens_after': tokens_before}
+
+    root = _clean_copy(page.tree)
+    blocks = _dedupe(_blocks(root))
+
+    title = ''
+    titles = _TITLE_XP(page.tree)
+    if titles:
+        title = WS_RE.sub(' ', titles[0].text_content()).strip()
+    desc = next((WS_RE.sub(' ', d).strip() for d in _META_DESC_XP(page.tree) if d.strip()), '')
+
+    # A heading that repeats the title (the usual h1) would be sent twice
+    used = {i for i, b in enumerate(blocks) if title and b['text'].lower() == title.lower()}
+    sections = []
+
+    def take(label, chosen):
+        lines = []
+        for i, b in chosen:
+            if i in used:
+                continue
+            used.add(i)
+            lines.append(b['text'])
+        if lines:
+            sections.append((label, lines))
+
+    indexed = list(enumerate(blocks))
+    take('Headings', [(i, b) for i, b in indexed if b['heading']])
+    first_screen, size = [], 0
+    for i, b in indexed:
+        if size >= FIRST_SCREEN_CHARS:
+            break
+        first_screen.append((i, b))
+        size += len(b['text'])
+    take('Top of page', first_screen)
+    take('Calls to action', [(i, b) for i, b in indexed
+                             if b['cta'] or (len(b['text']) <= 80 and CTA_TEXT_RE.search(b['text']))])
+    take('Contact / services', [(i, b) for i, b in indexed if b['section']])
+    take('Other content', indexed)
+
+    # Fill the budget in priority order, line by line
+    out = []
+    if title:
+        out.append(f"Title: {title}")
+    if desc:
+        out.append(f"Description: {desc}")
+    remaining = max_tokens - count_tokens('\n'.join(out), model)
+    for label, lines in sections:
+        header = f"\n[{label}]"
+        cost = count_tokens(header, model)
+        if remaining - cost <= 0:
+            break
+        kept = []
+        for line in lines:
+            line_cost = count_tokens(line, model) + 1
+            if line_cost > remaining - cost:
+                if not kept and remaining - cost > 20:
+                    kept.append(truncate_to_tokens(line, remaining - cost - 1, model))
+                    cost = remaining
+                break
+            kept.append(line)
+            cost += line_cost
+        if kept:
+            out.append(header)
+            out.extend(kept)
+            remaining -= cost
+
+    text = '\n'.join(out).strip()
+    if count_tokens(text, model) > max_tokens:
+        text = truncate_to_tokens(text, max_tokens, model)
+    return {'text': text, 'tokens_before': tokens_before, 'tokens_after': count_tokens(text, model)}
+
+
+__all__ = ['summarize_page', 'DEFAULT_MAX_TOKENS']
@@ -1,22 +1,45 @@
 # modules/pain_finder.py (Upgraded with AI)
+import logging
 import re
 import os
-import openai
-from bs4 import BeautifulSoup
+from modules.parsed_page import as_parsed_page
+from modules.response_cache import make_key
+from modules.llm_executor import get_llm_executor
+from modules.page_summarizer import summarize_page
 
-# Initialize the OpenAI client
-# It will automatically pick up the OPENAI_API_KEY from your .env file
-client = openai.OpenAI()
+# OpenAI calls go through the shared rate-limited executor (modules.llm_executor);
+# its client picks up OPENAI_API_KEY from your .env file.
+
+AI_MODEL = "gpt-3.5-turbo"
+# Bump whenever the prompt or the response post-processing changes; old cache entries then stop matching.
+PROMPT_VERSION = 2
+# Token budget for the page text in the prompt (see modules.page_summarizer)
+AI_INPUT_TOKENS = 1200
+
+# Optional modules.response_cache.ResponseCache for AI results; set by main via set_ai_cache().
+AI_CACHE = None
+
+def set_ai_cache(cache):
+    global AI_CACHE
+    AI_CACHE = cache
+
+
+class AIAnalysisError(RuntimeError):
+    """The OpenAI call for a page failed (raised by analyze_content_with_ai(strict=True))."""
+
+
+class AIAnalysisSkipped(AIAnalysisError):
+    """No AI analysis was attempted (no OPENAI_API_KEY)."""
 
 def check_structural_points(page_content):
     """
     Analyzes objective, structural issues of the website.
-    `page_content` is the dictionary from fetch_page.
+    `page_content` is a ParsedPage or the dictionary from fetch_page.
     """
+    page = as_parsed_page(page_content)
     pains = []
-    url = page_content.get('url', '')
-    html = page_content.get('html', '')
-    headers = page_content.get('headers', {})
+    url = page.url
+    html = page.html
     
     # 1. Cybersecurity: Check for SSL
     if not url.startswith('https://'):
@@ -31,33 +54,48 @@ def check_structural_points(page_content):
         pains.append("I couldn't detect a standard Google Analytics or Tag Manager script, meaning you might be missing key insights into your visitor traffic.")
         
     # 4. Web Design: Check for missing image alt tags (Accessibility/SEO)
-    soup = BeautifulSoup(html, 'html.parser')
-    images = soup.find_all('img')
-    missing_alt_tags = sum(1 for img in images if not img.get('alt', '').strip())
+    missing_alt_tags = sum(1 for img in page.iter('img') if not img.get('alt', '').strip())
     if missing_alt_tags > 5: # If more than 5 images are missing alt text
         pains.append(f"Found {missing_alt_tags} images without descriptive 'alt' text, which negatively impacts SEO and accessibility.")
 
     return pains
 
 
-def analyze_content_with_ai(html_text):
+def prepare_ai_input(page_content):
+    """The page text the AI sees: summarize_page() output trimmed to AI_INPUT_TOKENS."""
+    # Title, headings, first screen, CTAs and contact/services sections first;
+    # nav, footers, cookie banners and link farms dropped.
+    return summarize_page(page_content, max_tokens=AI_INPUT_TOKENS, model=AI_MODEL)
+
+
+def analyze_content_with_ai(html_text, usage=None, summary=None, strict=False):
     """
     Uses OpenAI's API to analyze the website content for more nuanced pain points.
+    `html_text` may be raw HTML or a ParsedPage; pass `summary` (from prepare_ai_input,
+    e.g. computed in a worker process) instead to skip the page preparation.
+    If `usage` is a dict it receives tokens_before / tokens_after for the page text.
+    A skipped or failed call returns a one-line explanation in place of the pain
+    points, or with `strict` raises AIAnalysisSkipped / AIAnalysisError instead.
     """
+    if summary is None:
+        summary = prepare_ai_input(html_text)
+    truncated_text = summary['text']
+    if usage is not None:
+        usage['tokens_before'] = summary['tokens_before']
+        usage['tokens_after'] = summary['tokens_after']
+    logging.debug("AI input: %d -> %d tokens", summary['tokens_before'], summary['tokens_after'])
+
+    cache_key = make_key('pain_points', AI_MODEL, PROMPT_VERSION, truncated_text)
+    if AI_CACHE:
+        cached = AI_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
     if not os.getenv("OPENAI_API_KEY"):
+        if strict:
+            raise AIAnalysisSkipped("OPENAI_API_KEY not found")
         return ["AI analysis skipped: OPENAI_API_KEY not found."]
 
-    # Use BeautifulSoup to get clean text, which is cheaper and more effective
-    soup = BeautifulSoup(html_text, 'html.parser')
-    # Remove script and style elements
-    for script in soup(["script", "style"]):
-        script.decompose()
-    text = soup.get_text(separator=' ', strip=True)
-    
-    # Truncate to avoid excessive token usage
-    max_chars = 12000 # Roughly 3000 tokens
-    truncated_text = text[:max_chars]
-
     # This prompt is key. We're telling the AI to act as a consultant.
     prompt = f"""
     You are a web conversion and cybersecurity consultant analyzing a small business website. 
@@ -77,8 +115,8 @@ def analyze_content_with_ai(html_text):
     """
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = get_llm_executor().chat(
+            model=AI_MODEL,
             messages=[
                 {"role": "system", "content": "You are a helpful consultant."},
                 {"role": "user", "content": prompt}
@@ -89,19 +127,29 @@ def analyze_content_with_ai(html_text):
         )
         ai_pains = response.choices[0].message.content.strip().split('\n')
         # Clean up the response, removing any leading dashes or numbers
-        return [re.sub(r'^[-\d\.\s]*', '', pain) for pain in ai_pains if pain]
+        pains = [re.sub(r'^[-\d\.\s]*', '', pain) for pain in ai_pains if pain]
+        if AI_CACHE:
+            AI_CACHE.put(cache_key, pains)
+        return pains
     except Exception as e:
+        if strict:
+            raise AIAnalysisError(f"AI analysis failed: {e}") from e
         return [f"AI analysis failed: {e}"]
 
 
-def find_structural_and_ai_pain_points(page_content):
+def find_structural_and_ai_pain_points(page_content, usage=None):
     """
     Main function to be called from main.py.
     Combines structural and AI analysis for a comprehensive list of pain points.
+    `usage`, if given, is filled in by analyze_content_with_ai.
     """
-    structural_pains = check_structural_points(page_content)
-    ai_pains = analyze_content_with_ai(page_content.get('html', ''))
-    
+    page = as_parsed_page(page_content)
+    structural_pains = check_structural_points(page)
+    ai_pains = analyze_content_with_ai(page, usage=usage)
+    return merge_pain_points(structural_pains, ai_pains)
+
+
+def merge_pain_points(structural_pains, ai_pains):
     # Combine and return a unique list
     all_pains = list(dict.fromkeys(structural_pains + ai_pains))
     return all_pains[:5] # Return top 5 most relevant pains
\ No newline at end of file
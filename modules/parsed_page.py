@@ -0,0 +1,126 @@
+# modules/parsed_page.py
+"""
+One parse per fetched page.
+
+ParsedPage wraps a fetch result and parses the HTML with lxml once; the
+contact extractor, the structural checks and the AI text prep all read from
+the same tree. Derived views are computed lazily and cached on the object:
+  - tree           lxml.html document
+  - visible_text   text nodes outside <script>/<style> joined with ' '
+                   (what soup.get_text(separator=' ') returns)
+  - stripped_text  visible text with each node stripped, single-space joined
+  - jsonld         decoded application/ld+json blocks (via extruct)
+  - microdata      schema.org microdata items (via extruct)
+Exports:
+  - ParsedPage(html, url='', final_url=None, headers=None)
+  - ParsedPage.from_fetch(page_content, url=None)
+  - ParsedPage.from_bytes(data, url='', final_url=None)
+  - as_parsed_page(obj, url=None)
+"""
+import logging
+from functools import cached_property
+from urllib.parse import urljoin
+
+import lxml.etree
+import lxml.html
+
+from modules.metrics import METRICS
+
+_VISIBLE_TEXT_XP = lxml.etree.XPath('//text()[not(ancestor::script or ancestor::style)]')
+_BASE_HREF_XP = lxml.etree.XPath('//base/@href')
+
+
+class ParsedPage:
+    def __init__(self, html, url='', final_url=None, headers=None):
+        self.html = html or ''
+        self.url = url or final_url or ''
+        self.final_url = final_url or self.url
+        self.headers = headers or {}
+        self._data = None
+
+    @classmethod
+    def from_bytes(cls, data, url='', final_url=None):
+        """Build from UTF-8 HTML bytes; lxml parses the bytes as given instead of re-encoding the text."""
+        page = cls(data.decode('utf-8', errors='replace'), url=url, final_url=final_url)
+        page._data = data
+        return page
+
+    @classmethod
+    def from_fetch(cls, page_content, url=None):
+        """Build from the dict returned by scraper.fetch_page."""
+        return cls(page_content.get('html', ''),
+                   url=url or page_content.get('url') or page_content.get('final_url', ''),
+                   final_url=page_content.get('final_url'),
+                   headers=page_content.get('headers'))
+
+    @cached_property
+    def tree(self):
+        """The lxml document, or None for empty / unparseable HTML."""
+        if not self.html.strip():
+            return None
+        data = self._data
+        if data is None:
+            data = self.html.encode('utf-8') if isinstance(self.html, str) else self.html
+        try:
+            return lxml.html.fromstring(data, parser=lxml.html.HTMLParser(encoding='utf-8'))
+        except (lxml.etree.ParserError, ValueError) as e:
+            logging.debug("lxml could not parse %s: %s", self.url, e)
+            return None
+
+    @cached_property
+    def visible_text(self):
+        return ' '.join(_VISIBLE_TEXT_XP(self.tree)) if self.tree is not None else ''
+
+    @cached_property
+    def stripped_text(self):
+        if self.tree is None:
+            return ''
+        return ' '.join(s for s in (t.strip() for t in _VISIBLE_TEXT_XP(self.tree)) if s)
+
+    @cached_property
+    def base_url(self):
+        if self.tree is not None:
+            hrefs = _BASE_HREF_XP(self.tree)
+            if hrefs:
+                return urljoin(self.final_url or '', hrefs[0].strip())
+        return self.final_url or self.url
+
+    @cached_property
+    def jsonld(self):
+        if self.tree is None:
+            return []
+        try:
+            from extruct.jsonld import JsonLdExtractor
+            with METRICS.timer('extruct_seconds', kind='jsonld'):
+                return JsonLdExtractor().extract_items(self.tree, base_url=self.base_url)
+        except Exception as e:
+            logging.debug("json-ld extraction failed for %s: %s", self.url, e)
+            return []
+
+    @cached_property
+    def microdata(self):
+        if self.tree is None:
+            return []
+        try:
+            from extruct.w3cmicrodata import MicrodataExtractor
+            with METRICS.timer('extruct_seconds', kind='microdata'):
+                return MicrodataExtractor().extract_items(self.tree, self.base_url)
+        except Exception as e:
+            logging.debug("microdata extraction failed for %s: %s", self.url, e)
+            return []
+
+    def iter(self, tag):
+        """Iterate elements named `tag` (e.g. 'img', 'form')."""
+        return self.tree.iter(tag) if self.tree is not None else iter(())
+
+
+def as_parsed_page(obj, url=None):
+    """Accept a ParsedPage, a fetch_page dict or raw HTML and return a ParsedPage."""
+    if isinstance(obj, ParsedPage):
+        return obj
+    if isinstance(obj, dict):
+        return ParsedPage.from_fetch(obj, url=url)
+    return ParsedPage(obj or '', url=url or '')
+
+
+__all__ = ['ParsedPage', 'as_parsed_page']
@@ -0,0 +1,108 @@
+# modules/pipeline.py
+"""
+Staged lead pipeline.
+
+Each stage owns a small pool of worker threads and reads from a bounded queue
+fed by the stage before it, so a slow stage applies back-pressure upstream
+instead of letting work pile up in memory.
+Exports:
+  - Stage(name, func, workers=1)
+  - run_pipeline(items, stages, queue_size=100, on_done=None)
+"""
+import logging
+import queue
+import threading
+import time
+
+from modules.metrics import METRICS
+
+_STOP = object()
+
+
+class Stage:
+    """A named step of the pipeline and the number of threads that run it."""
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers or 1))
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, workers={self.workers})"
+
+
+def run_pipeline(items, stages, queue_size=100, on_done=None):
+    """
+    Push every item from `items` through `stages` in order.
+
+    A stage function receives an item and returns the item to hand to the next
+    stage, or None to drop it (skipped lead, fetch failure, ...). Exceptions are
+    logged and drop the item. `on_done(item)` is called exactly once per input
+    item when it leaves the pipeline, whether it finished or was dropped.
+    Returns the list of items that made it through every stage.
+    """
+    if not stages:
+        return []
+
+    queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    results = []
+    lock = threading.Lock()
+
+    def finish(item, completed):
+        with lock:
+            if completed:
+                results.append(item)
+            if on_done:
+                try:
+                    on_done(item)
+                except Exception as e:
+                    logging.debug("on_done callback failed: %s", e)
+
+    def worker(idx):
+        stage = stages[idx]
+        q_in = queues[idx]
+        last = idx == len(stages) - 1
+        while True:
+            item = q_in.get()
+            if item is _STOP:
+                break
+            start = time.perf_counter()
+            try:
+                out = stage.func(item)
+                outcome = 'passed' if out is not None else 'dropped'
+            except Exception as e:
+                logging.error("Stage '%s' failed: %s", stage.name, e)
+                out = None
+                outcome = 'error'
+            METRICS.observe('stage_seconds', time.perf_counter() - start, stage=stage.name)
+            METRICS.incr('stage_items_total', stage=stage.name, outcome=outcome)
+            if out is None:
+                finish(item, completed=False)
+            elif last:
+                finish(out, completed=True)
+            else:
+                queues[idx + 1].put(out)
+
+    pools = []
+    for idx, stage in enumerate(stages):
+        threads = [threading.Thread(target=worker, args=(idx,), name=f"{stage.name}-{n}", daemon=True)
+                   for n in range(stage.workers)]
+        for t in threads:
+            t.start()
+        pools.append(threads)
+
+    # Feed from the calling thread; the bounded first queue throttles the producer.
+    for item in items:
+        queues[0].put(item)
+
+    # Shut stages down front to back so each one drains before the next is told to stop.
+    for idx, stage in enumerate(stages):
+        for _ in range(stage.workers):
+            queues[idx].put(_STOP)
+        for t in pools[idx]:
+            t.join()
+
+    return results
+
+
+__all__ = ['Stage', 'run_pipeline']
@@ -0,0 +1,83 @@
+# modules/response_cache.py
+"""
+Persistent key -> JSON value cache for paid API responses (OpenAI, SerpApi, ...).
+
+Values are zlib-compressed JSON in a WAL-mode SQLite file (storage and LRU
+eviction shared with page_cache via modules.sqlite_cache). Entries expire
+after `ttl` seconds, the compressed total is capped with LRU eviction, and
+hit / miss counters are kept for end-of-run reporting.
+Exports:
+  - ResponseCache(path, ttl=30 days, max_bytes=200 MB)
+  - make_key(*parts)
+"""
+import hashlib
+import json
+import logging
+import time
+import zlib
+
+from modules.sqlite_cache import SQLiteCache
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    value       BLOB NOT NULL,
+    size        INTEGER NOT NULL,
+    stored_at   REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access);
+"""
+
+
+def make_key(*parts):
+    """Stable hash of any JSON-serialisable parts (dict order does not matter)."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache(SQLiteCache):
+    table = 'responses'
+    schema = _SCHEMA
+    evict_expired_first = True
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(path, ttl, max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, ttl=None):
+        """Return the cached value for `key`, or None on a miss / expired entry."""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        with self._lock:
+            row = self._fetch(key, 'value, stored_at')
+            if row is None or (ttl is not None and now - row[1] >= ttl):
+                self.misses += 1
+                return None
+            self._touch(key, now)
+            self.hits += 1
+        try:
+            return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+        except Exception as e:
+            logging.debug("Dropping unreadable cached response %s: %s", key, e)
+            self.delete(key)
+            return None
+
+    def put(self, key, value):
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'), 6)
+        self._store(key, len(blob), value=blob)
+
+    def delete(self, key):
+        self._delete(key)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0}
+
+
+__all__ = ['ResponseCache', 'make_key', 'DEFAULT_TTL', 'DEFAULT_MAX_BYTES']
@@ -0,0 +1,111 @@
+# modules/robots.py
+"""
+Per-host robots.txt cache.
+
+robots.txt is fetched at most once per host per run (and, with a persistent
+store, once per TTL across runs), parsed with urllib.robotparser and checked
+for our user-agent token. Concurrent lookups for the same host wait on the
+single in-flight fetch instead of each downloading the file.
+
+Status handling follows RFC 9309:
+  - 2xx          parse the rules
+  - 4xx          "unavailable": no rules, allow everything
+  - 5xx          disallow for this run (not persisted, retried next run)
+  - unreachable  unknown: allow for this run (not persisted). Direct requests
+                 failing is what the Scrapfly / ScraperAPI / Selenium fallbacks
+                 in fetch_page are for, so this must not stop them
+Exports:
+  - RobotsCache(store=None, agent=ROBOTS_AGENT)
+  - ROBOTS_AGENT
+"""
+import logging
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from modules import fetchers
+
+# Product token matched against robots.txt User-agent lines (see fetchers.HEADERS)
+ROBOTS_AGENT = 'outreach-bot'
+
+_DISALLOW_ALL = "User-agent: *\nDisallow: /\n"
+_ALLOW_ALL = "# no robots.txt rules\n"
+
+
+class RobotsCache:
+    def __init__(self, store=None, agent=ROBOTS_AGENT, timeout=5):
+        """`store` is an optional modules.page_cache.PageCache used to keep robots.txt across runs."""
+        self.store = store
+        self.agent = agent
+        self.timeout = timeout
+        self._parsers = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def robots_url(url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}/robots.txt"
+
+    def allowed(self, url, delay=None):
+        """True if our agent may fetch `url` according to its host's robots.txt."""
+        parser = self.parser_for(url, delay=delay)
+        return parser.can_fetch(self.agent, url)
+
+    def parser_for(self, url, delay=None):
+        robots_url = self.robots_url(url)
+        key = robots_url.lower()
+        with self._lock:
+            pending = self._parsers.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._parsers[key] = Future()
+        if not owner:
+            return pending.result()
+        try:
+            parser = self._load(robots_url, delay)
+        except Exception as e:  # never leave waiters hanging
+            logging.debug("robots.txt handling failed for %s: %s", robots_url, e)
+            parser = self._parse(_ALLOW_ALL)
+        pending.set_result(parser)
+        return parser
+
+    def _load(self, robots_url, delay):
+        if self.store:
+            entry = self.store.get(robots_url)
+            if entry and entry['fresh']:
+                return self._parse(entry['html'])
+
+        try:
+            r = fetchers.fetch('direct', robots_url, delay=delay, timeout=self.timeout)
+            text, persist = r['html'] or _ALLOW_ALL, True
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else 0
+            if 400 <= status < 500:
+                text, persist = _ALLOW_ALL, True
+            else:
+                logging.warning("robots.txt unavailable (HTTP %s) for %s; treating host as disallowed", status, robots_url)
+                text, persist = _DISALLOW_ALL, False
+        except requests.RequestException as e:
+            logging.info("robots.txt unreachable for %s (%s); no rules known, leaving it to the fetch fallbacks",
+                         robots_url, e)
+            text, persist = _ALLOW_ALL, False
+
+        if persist and self.store:
+            self.store.put(robots_url, text, final_url=robots_url)
+        return self._parse(text)
+
+    @staticmethod
+    def _parse(text):
+        parser = RobotFileParser()
+        parser.parse(text.splitlines())
+        return parser
+
+    def clear(self):
+        with self._lock:
+            self._parsers.clear()
+
+
+__all__ = ['RobotsCache', 'ROBOTS_AGENT']
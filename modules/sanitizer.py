@@ -0,0 +1,81 @@
+# modules/sanitizer.py
+"""
+Clean-up of generated email text, shared by email_generator (template output)
+and openai_prompt (LLM output).
+
+Bracketed placeholders ([..], {..}, <..>) and then "as an AI ..." phrases are
+removed by precompiled patterns in the same order as the original re.sub
+passes (a phrase pass is skipped when the phrase doesn't occur); optional
+placeholder-line filtering, blank-line collapsing and trimming follow.
+Exports:
+  - sanitize(text, placeholder_lines=False)
+"""
+import re
+
+AI_PHRASES = (
+    'as an ai language model',
+    'i am an ai',
+    'as an ai',
+    "i'm an ai",
+    'i am a language model',
+    'as a language model',
+)
+# Short lines containing any of these are template leftovers ("Your Name", "[Company]", ...)
+PLACEHOLDER_TOKENS = ('your name', 'your company', 'company name', '[name]', 'name', '[company]', 'your title')
+PLACEHOLDER_LINE_MAX = 40
+
+
+# Applied in this order, like the sequential re.sub passes they replace: a
+# later pattern can match text that an earlier removal joined together
+# ('as an [x]ai' -> 'as an ai' -> ''), so the order is part of the output.
+# [^]\n]* matches exactly what the old lazy \[.*?\] did: up to the first
+# closing bracket on the same line.
+_BRACKET_RES = tuple((close, re.compile(re.escape(open_) + '[^%s\n]*' % re.escape(close) + re.escape(close)))
+                     for open_, close in ('[]', '{}', '<>'))
+_PHRASE_RES = tuple(re.compile(re.escape(p), re.IGNORECASE) for p in AI_PHRASES)
+_BLANK_RUN_RE = re.compile(r'\n{3,}')
+
+
+def _strip_phrases(text):
+    if not text.isascii():
+        # IGNORECASE also folds a few non-ASCII letters (dotless i, long s) that
+        # str.lower() leaves alone, so only the regexes decide here
+        for pattern in _PHRASE_RES:
+            text = pattern.sub('', text)
+        return text
+    # Case-insensitive regex scans are slow; a lowercase substring test skips
+    # the passes that would find nothing, which is nearly all of them
+    lower = text.lower()
+    for phrase, pattern in zip(AI_PHRASES, _PHRASE_RES):
+        if phrase in lower:
+            text = pattern.sub('', text)
+            lower = text.lower()
+    return text
+
+
+def _is_placeholder_line(line):
+    stripped = line.strip()
+    if len(stripped) >= PLACEHOLDER_LINE_MAX:
+        return False
+    lower = stripped.lower()
+    return any(tok in lower for tok in PLACEHOLDER_TOKENS)
+
+
+def sanitize(text, placeholder_lines=False):
+    """
+    Remove placeholders and AI-identifying phrases, collapse 3+ newlines to one
+    blank line and trim. With `placeholder_lines`, also drop short lines that
+    look like unfilled template fields.
+    """
+    if not text:
+        return text
+    for close, pattern in _BRACKET_RES:
+        if close in text:
+            text = pattern.sub('', text)
+    text = _strip_phrases(text)
+    if placeholder_lines:
+        text = '\n'.join(line for line in text.splitlines() if not _is_placeholder_line(line))
+    return _BLANK_RUN_RE.sub('\n\n', text).strip()
+
+
+__all__ = ['sanitize', 'AI_PHRASES', 'PLACEHOLDER_TOKENS']
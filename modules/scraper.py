@@ -1,99 +1,144 @@
 # modules/scraper.py
-import time, logging, requests, os
-from urllib.parse import urlparse
+import asyncio
+import logging
 from tenacity import retry, stop_after_attempt, wait_exponential
-try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
-    from webdriver_manager.chrome import ChromeDriverManager
-except Exception:
-    webdriver = None
-
-HEADERS = {'User-Agent': 'Mozilla/5.0 (compatible; outreach-bot/1.0)'}
-
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-def _requests_fetch(url, timeout=15):
-    r = requests.get(url, headers=HEADERS, timeout=timeout)
-    r.raise_for_status()
-    return r.text, r.url, r.status_code
-
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=2, max=10))
-def _selenium_fetch(url, timeout=30):
-    options = Options()
-    options.add_argument('--headless=new')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-gpu')
-    driver = webdriver.Chrome(ChromeDriverManager().install(), options=options)
-    driver.set_page_load_timeout(timeout)
-    driver.get(url)
-    html = driver.page_source
-    final = driver.current_url
-    driver.quit()
-    return html, final, 200
-
-def _scrapfly_fetch(url, api_key, render_js=False):
+from modules import fetchers
+from modules.fetchers import HEADERS
+from modules.metrics import METRICS
+from modules.robots import RobotsCache
+
+# Set by main (--cache-dir / --no-cache) via set_page_cache(); None disables caching.
+PAGE_CACHE = None
+
+def set_page_cache(cache):
+    global PAGE_CACHE
+    PAGE_CACHE = cache
+
+# Per-host robots.txt rules, fetched once per run; main swaps in a persistent one.
+ROBOTS = RobotsCache()
+
+def set_robots_cache(robots):
+    global ROBOTS
+    ROBOTS = robots
+
+def _count_retry(op):
+    # tenacity before_sleep hook: one retries_total{op} per retry actually taken
+    return lambda retry_state: METRICS.incr('retries_total', op=op)
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10),
+       before_sleep=_count_retry('fetch_direct'))
+def _requests_fetch(url, timeout=15, delay=None, headers=None):
+    # Returns the full result dict (incl. status_code / etag / last_modified) for cache revalidation
+    return fetchers.fetch('direct', url, delay=delay, timeout=timeout, headers=headers)
+
+@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=2, max=10),
+       before_sleep=_count_retry('fetch_selenium'))
+def _selenium_fetch(url, timeout=30, delay=None):
+    r = fetchers.fetch('selenium', url, delay=delay, timeout=timeout)
+    return r['html'], r['final_url'], r['status_code']
+
+def _scrapfly_fetch(url, render_js=False, delay=None):
     try:
-        params = {'key': api_key, 'url': url, 'render_js': str(render_js).lower()}
-        resp = requests.get("https://api.scrapfly.io/scrape/", params=params, timeout=20)
-        resp.raise_for_status()
-        return resp.text, url, resp.status_code
+        r = fetchers.fetch('scrapfly', url, delay=delay, render_js=render_js)
+        return r['html'], r['final_url'], r['status_code']
     except Exception as e:
         logging.debug("Scrapfly fetch failed: %s", e)
         return None, None, None
 
-def _scraperapi_fetch(url, api_key):
+def _scraperapi_fetch(url, delay=None):
     try:
-        resp = requests.get(f"http://api.scraperapi.com?api_key={api_key}&url={url}", timeout=20)
-        resp.raise_for_status()
-        return resp.text, url, resp.status_code
+        r = fetchers.fetch('scraperapi', url, delay=delay)
+        return r['html'], r['final_url'], r['status_code']
     except Exception as e:
         logging.debug("ScraperAPI fetch failed: %s", e)
         return None, None, None
 
-def fetch_page(url, use_selenium=False, render_js=False, delay=1.0, timeout=20, robots_check=False):
+def _cache_store(cache, url, html, final_url, etag=None, last_modified=None):
+    if cache and html:
+        try:
+            cache.put(url, html, final_url=final_url, etag=etag, last_modified=last_modified)
+        except Exception as e:
+            logging.debug("Page cache write failed for %s: %s", url, e)
+
+def fetch_page(url, use_selenium=False, render_js=False, delay=1.0, timeout=20, robots_check=True, use_cache=True):
     """
     Upgrades: Added tenacity retries to requests/selenium, render_js param for Scrapfly,
     unified proxy logic, improved error logging, return dict for consistency (html, final_url).
+    `delay` is the minimum gap between hits on the same host (see modules.throttle);
+    requests to other hosts are not held back by it.
+    With a page cache configured, fresh entries are returned without any network
+    call and stale ones are revalidated with If-None-Match / If-Modified-Since.
+    Where each page came from is counted in fetch_page_total{source} (modules.metrics).
     """
-    time.sleep(delay)
+    cache = PAGE_CACHE if use_cache else None
+    cached = None
+    if cache:
+        try:
+            cached = cache.get(url)
+        except Exception as e:
+            logging.debug("Page cache read failed for %s: %s", url, e)
+        if cached and cached['fresh']:
+            METRICS.incr('fetch_page_total', source='cache')
+            return {'html': cached['html'], 'final_url': cached['final_url'], 'from_cache': True}
+
     if robots_check:
         try:
-            parsed = urlparse(url)
-            robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
-            r = requests.get(robots_url, headers=HEADERS, timeout=5)
-            if r.status_code == 200 and 'Disallow: /' in r.text:
+            if not ROBOTS.allowed(url, delay=delay):
                 logging.warning("robots.txt blocks crawling for %s", url)
+                METRICS.incr('fetch_page_total', source='robots_blocked')
                 return {'html': '', 'final_url': url}
-        except Exception:
-            logging.debug("robots check failed or not present")
+        except Exception as e:
+            logging.debug("robots check failed: %s", e)
 
-    # 1) try requests with retry
+    # 1) try requests with retry (conditional GET when we hold a stale copy)
+    conditional = {}
+    if cached:
+        if cached.get('etag'):
+            conditional['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            conditional['If-Modified-Since'] = cached['last_modified']
     try:
-        html, final, code = _requests_fetch(url, timeout=timeout)
-        return {'html': html, 'final_url': final}
+        r = _requests_fetch(url, timeout=timeout, delay=delay, headers=conditional or None)
+        if r['status_code'] == 304 and cached:
+            cache.refresh(url, etag=r.get('etag'), last_modified=r.get('last_modified'))
+            METRICS.incr('fetch_page_total', source='revalidated')
+            return {'html': cached['html'], 'final_url': cached['final_url'], 'from_cache': True}
+        _cache_store(cache, url, r['html'], r['final_url'], r.get('etag'), r.get('last_modified'))
+        METRICS.incr('fetch_page_total', source='direct')
+        return {'html': r['html'], 'final_url': r['final_url']}
     except Exception as e:
         logging.debug("Requests fetch failed after retries: %s", e)
 
     # 2) try Scrapfly / ScraperAPI if env keys exist
     try:
-        if os.getenv('SCRAPFLY_KEY'):
-            html, final, code = _scrapfly_fetch(url, os.getenv('SCRAPFLY_KEY'), render_js=render_js)
+        if fetchers.get_backend('scrapfly').available():
+            html, final, code = _scrapfly_fetch(url, render_js=render_js, delay=delay)
             if html:
+                _cache_store(cache, url, html, final)
+                METRICS.incr('fetch_page_total', source='scrapfly')
                 return {'html': html, 'final_url': final}
-        if os.getenv('SCRAPERAPI_KEY'):
-            html, final, code = _scraperapi_fetch(url, os.getenv('SCRAPERAPI_KEY'))
+        if fetchers.get_backend('scraperapi').available():
+            html, final, code = _scraperapi_fetch(url, delay=delay)
             if html:
+                _cache_store(cache, url, html, final)
+                METRICS.incr('fetch_page_total', source='scraperapi')
                 return {'html': html, 'final_url': final}
     except Exception as e:
         logging.debug("Proxy fetchers error: %s", e)
 
     # 3) selenium fallback with retry
-    if use_selenium and webdriver:
+    if use_selenium and fetchers.get_backend('selenium').available():
         try:
-            html, final, code = _selenium_fetch(url, timeout=timeout)
+            html, final, code = _selenium_fetch(url, timeout=timeout, delay=delay)
+            _cache_store(cache, url, html, final)
+            METRICS.incr('fetch_page_total', source='selenium')
             return {'html': html, 'final_url': final}
         except Exception as e:
             logging.error("Selenium fetch failed after retries: %s", e)
 
-    return {'html': '', 'final_url': url}
\ No newline at end of file
+    METRICS.incr('fetch_page_total', source='failed')
+    return {'html': '', 'final_url': url}
+
+async def async_fetch_page(url, **kwargs):
+    """Awaitable fetch_page for asyncio callers; same arguments and return value."""
+    return await asyncio.to_thread(fetch_page, url, **kwargs)
@@ -1,27 +1,252 @@
 # modules/sender.py
-import os, logging, smtplib
+"""
+Outgoing email.
+
+Messages go out over SMTPPool, which keeps up to `size` authenticated SMTP
+connections open and sends many messages over each one instead of doing
+connect + STARTTLS + login per email. Dropped connections are detected and
+reopened; connections are recycled after `max_messages` messages (many
+providers cap messages per session). The process-wide pool is built from the
+SMTP_* env vars on first use; main closes it at the end of the run.
+Exports:
+  - send_email_with_approval(to_email, subject, body, dry_run=True, is_html=False, cc=None, bcc=None)
+  - build_message(to_email, subject, body, is_html=False, cc=None, bcc=None)
+  - SMTPPool(host, port=587, user=None, password=None, size=1, ...)
+  - get_smtp_pool() / set_smtp_pool(pool) / close_smtp_pool()
+"""
+import os, logging, smtplib, threading, time
 from email.message import EmailMessage
 from email.mime.text import MIMEText
 from tenacity import retry, stop_after_attempt, wait_fixed
+from modules.metrics import METRICS
 
 SMTP_HOST = os.getenv('SMTP_HOST')
 SMTP_PORT = int(os.getenv('SMTP_PORT') or 587)
 SMTP_USER = os.getenv('SMTP_USER')
 SMTP_PASS = os.getenv('SMTP_PASS')
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-def send_email_with_approval(to_email, subject, body, dry_run=True, is_html=False, cc=None, bcc=None):
+# Errors that mean the connection itself is gone (as opposed to a rejected message);
+# checked after the SMTP response errors, which are OSError subclasses too
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, OSError)
+
+
+class _Connection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
     """
-    Upgrades: Added retries, HTML support via MIME, CC/BCC, better From fallback,
-    raised errors for missing creds, logging enhancements.
+    Thread-safe pool of open SMTP sessions. `starttls` is True / False / 'auto'
+    (upgrade when the server offers it); port 465 uses implicit TLS. Credentials
+    are only sent over TLS: with a `user` set, a session that ended up unencrypted
+    raises SMTPNotSupportedError instead of logging in. Idle connections older
+    than `check_after` seconds are probed with NOOP before reuse.
     """
-    if not to_email:
-        logging.error("No recipient email provided.")
-        return False
 
-    if not (SMTP_HOST and SMTP_USER and SMTP_PASS) and not dry_run:
-        raise ValueError("SMTP credentials missing; cannot send.")
+    def __init__(self, host, port=587, user=None, password=None, size=1, starttls=True,
+                 max_messages=100, timeout=30, check_after=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = max(1, int(size))
+        self.starttls = starttls
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.check_after = check_after
+        self.stats = {'sent': 0, 'connects': 0, 'reconnects': 0}
+        self._idle = []
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    # --- connections ---
+
+    def _connect(self):
+        if self.port == 465:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+            encrypted = True
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            smtp.ehlo()
+            encrypted = False
+            try:
+                if self.starttls is True or (self.starttls == 'auto' and smtp.has_extn('starttls')):
+                    smtp.starttls()
+                    smtp.ehlo()
+                    encrypted = True
+            except Exception:
+                smtp.close()
+                raise
+        if self.user:
+            if not encrypted:
+                smtp.close()
+                raise smtplib.SMTPNotSupportedError(
+                    f"{self.host}:{self.port} did not negotiate TLS; refusing to send SMTP credentials in plaintext")
+            smtp.login(self.user, self.password)
+        with self._cond:
+            self.stats['connects'] += 1
+        return _Connection(smtp)
+
+    @staticmethod
+    def _quit(conn):
+        try:
+            conn.smtp.quit()
+        except Exception:
+            try:
+                conn.smtp.close()
+            except Exception:
+                pass
+
+    def _alive(self, conn):
+        if time.monotonic() - conn.last_used < self.check_after:
+            return True
+        try:
+            return conn.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("SMTP pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    conn = None
+                    break
+                self._cond.wait()
+        if conn is not None and self._alive(conn):
+            return conn
+        if conn is not None:
+            self._quit(conn)
+            with self._cond:
+                self.stats['reconnects'] += 1
+        try:
+            return self._connect()
+        except Exception:
+            self._discard()
+            raise
+
+    def _release(self, conn):
+        conn.last_used = time.monotonic()
+        with self._cond:
+            keep = not self._closed and conn.sent < self.max_messages
+            if keep:
+                self._idle.append(conn)
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not keep:
+            self._quit(conn)
+
+    def _discard(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    # --- public API ---
+
+    def send(self, msg):
+        """
+        Send an EmailMessage. A connection that turns out to be dead is replaced and
+        the message retried once; SMTP rejections (bad recipient, 5xx) are raised.
+        """
+        start = time.perf_counter()
+        try:
+            self._send(msg)
+        except Exception:
+            METRICS.incr('smtp_messages_total', outcome='error')
+            raise
+        finally:
+            METRICS.observe('smtp_send_seconds', time.perf_counter() - start)
+        METRICS.incr('smtp_messages_total', outcome='sent')
+
+    def _send(self, msg):
+        for attempt in (1, 2):
+            conn = self._acquire()
+            try:
+                conn.smtp.send_message(msg)
+            except smtplib.SMTPResponseException:
+                # the server answered, so the session is still usable; reset the transaction
+                try:
+                    conn.smtp.rset()
+                    self._release(conn)
+                except Exception:
+                    self._quit(conn)
+                    self._discard()
+                raise
+            except smtplib.SMTPRecipientsRefused:
+                self._release(conn)
+                raise
+            except _CONNECTION_ERRORS as e:
+                self._quit(conn)
+                self._discard()
+                if attempt == 2:
+                    raise
+                logging.info("SMTP connection dropped (%s); reconnecting", e.__class__.__name__)
+                METRICS.incr('retries_total', op='smtp_reconnect')
+                with self._cond:
+                    self.stats['reconnects'] += 1
+                continue
+            conn.sent += 1
+            with self._cond:
+                self.stats['sent'] += 1
+            self._release(conn)
+            return
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats)
+
+    def close(self):
+        """Send QUIT on every idle connection; busy ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._quit(conn)
 
+
+SMTP_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_smtp_pool(size=None):
+    """Process-wide pool built from SMTP_HOST / SMTP_PORT / SMTP_USER / SMTP_PASS on first use."""
+    global SMTP_POOL
+    if SMTP_POOL is None:
+        with _POOL_LOCK:
+            if SMTP_POOL is None:
+                SMTP_POOL = SMTPPool(SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS, size=size or 1, starttls=True)
+    return SMTP_POOL
+
+
+def set_smtp_pool(pool):
+    global SMTP_POOL
+    with _POOL_LOCK:
+        SMTP_POOL = pool
+
+
+def close_smtp_pool():
+    global SMTP_POOL
+    with _POOL_LOCK:
+        pool, SMTP_POOL = SMTP_POOL, None
+    if pool is not None:
+        pool.close()
+        return pool.snapshot()
+    return None
+
+
+def build_message(to_email, subject, body, is_html=False, cc=None, bcc=None):
     sender_name = os.getenv('SENDER_NAME', 'Outreach Bot')
     from_email = SMTP_USER or 'no-reply@example.com'
     msg = EmailMessage()
@@ -38,18 +263,33 @@ def send_email_with_approval(to_email, subject, body, dry_run=True, is_html=Fals
         msg.add_alternative(body, subtype='html')
     else:
         msg.set_content(body)
+    return msg
+
+
+@retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
+def send_email_with_approval(to_email, subject, body, dry_run=True, is_html=False, cc=None, bcc=None):
+    """
+    Upgrades: Added retries, HTML support via MIME, CC/BCC, better From fallback,
+    raised errors for missing creds, logging enhancements.
+    Sends over the shared SMTP pool, so consecutive emails reuse one session.
+    """
+    if not to_email:
+        logging.error("No recipient email provided.")
+        return False
+
+    if not (SMTP_HOST and SMTP_USER and SMTP_PASS) and not dry_run:
+        raise ValueError("SMTP credentials missing; cannot send.")
+
+    msg = build_message(to_email, subject, body, is_html=is_html, cc=cc, bcc=bcc)
 
     if dry_run:
         logging.info("[DRY RUN] Would send email to %s with subject '%s'", to_email, subject)
         return True
 
     try:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as s:
-            s.starttls()
-            s.login(SMTP_USER, SMTP_PASS)
-            s.send_message(msg)
+        get_smtp_pool().send(msg)
         logging.info("Email sent to %s", to_email)
         return True
     except Exception as e:
         logging.error("Failed to send after retries: %s", e)
-        return False
\ No newline at end of file
+        return False
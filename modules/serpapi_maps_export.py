@@ -12,6 +12,7 @@ import os
 import logging
 from dotenv import load_dotenv
 from modules.lead_discovery import _serpapi_maps_query  # Assume this exists; if not, implement here
+from modules.discovery_cache import configure_discovery_cache
 
 load_dotenv()
 
@@ -24,10 +25,13 @@ def build_parser():
     p.add_argument('--city', help='City name as fallback if no latlng')
     p.add_argument('--limit', type=int, default=50)
     p.add_argument('--out', default='places_export.csv')
+    p.add_argument('--refresh', action='store_true', help='Ignore the cached response and query SerpApi again')
+    p.add_argument('--no-cache', action='store_true', help='Do not read or write the discovery cache')
     return p
 
 def main():
     args = build_parser().parse_args()
+    configure_discovery_cache(refresh=args.refresh, enabled=not args.no_cache)
     serp_key = os.getenv('SERPAPI_KEY')
     if not serp_key:
         logging.error("SERPAPI_KEY not set in .env (required).")
@@ -0,0 +1,97 @@
+# modules/sqlite_cache.py
+"""
+Storage shared by the on-disk caches (page_cache, response_cache).
+
+Each cache is one SQLite file in WAL mode with a single table that has at
+least key / size / stored_at / last_access columns. SQLiteCache opens it,
+keeps the running total of the compressed `size` column, and evicts least
+recently used rows once that total exceeds `max_bytes`. Subclasses set
+`table` / `schema` and build their public get/put on the helpers below.
+Exports:
+  - SQLiteCache(path, ttl, max_bytes)
+"""
+import os
+import sqlite3
+import threading
+import time
+
+
+class SQLiteCache:
+    table = None   # set by subclasses
+    schema = None  # CREATE statements for `table`, run on open
+    # Drop entries older than `ttl` before falling back to LRU. Off for caches
+    # that still use stale entries (page_cache revalidates them).
+    evict_expired_first = False
+
+    def __init__(self, path, ttl, max_bytes):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(self.schema)
+        self._total = self._db.execute(f'SELECT COALESCE(SUM(size), 0) FROM {self.table}').fetchone()[0]
+
+    # The helpers below that take no lock expect the caller to hold self._lock.
+
+    def _fetch(self, key, columns):
+        return self._db.execute(f'SELECT {columns} FROM {self.table} WHERE key = ?', (key,)).fetchone()
+
+    def _touch(self, key, now):
+        self._db.execute(f'UPDATE {self.table} SET last_access = ? WHERE key = ?', (now, key))
+        self._db.commit()
+
+    def _store(self, key, size, **columns):
+        """Insert or replace the row for `key` (size = its compressed bytes) and evict if over the cap."""
+        now = time.time()
+        names = ['key', 'size', 'stored_at', 'last_access', *columns]
+        with self._lock:
+            old = self._fetch(key, 'size')
+            self._db.execute(
+                f'INSERT OR REPLACE INTO {self.table} ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})',
+                (key, size, now, now, *columns.values()),
+            )
+            self._total += size - (old[0] if old else 0)
+            self._evict()
+            self._db.commit()
+
+    def _delete(self, key):
+        with self._lock:
+            old = self._fetch(key, 'size')
+            if old:
+                self._db.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                self._total -= old[0]
+                self._db.commit()
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        if self.evict_expired_first and self.ttl is not None:
+            cutoff = time.time() - self.ttl
+            freed = self._db.execute(
+                f'SELECT COALESCE(SUM(size), 0) FROM {self.table} WHERE stored_at < ?', (cutoff,)).fetchone()[0]
+            if freed:
+                self._db.execute(f'DELETE FROM {self.table} WHERE stored_at < ?', (cutoff,))
+                self._total -= freed
+        while self._total > self.max_bytes:
+            rows = self._db.execute(f'SELECT key, size FROM {self.table} ORDER BY last_access LIMIT 100').fetchall()
+            if not rows:
+                self._total = 0
+                break
+            for key, size in rows:
+                self._db.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                self._total -= size
+                if self._total <= self.max_bytes:
+                    break
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+__all__ = ['SQLiteCache']
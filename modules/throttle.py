@@ -0,0 +1,138 @@
+# modules/throttle.py
+"""
+Politeness / rate limiting helpers shared by the fetchers.
+Exports:
+  - HostScheduler(min_gap=1.0)
+  - HOST_SCHEDULER (process-wide instance used by modules.scraper)
+  - ProviderQuota(name, concurrency=4, per_minute=60, max_calls=None)
+  - QuotaExhausted
+  - provider_quota(name) / configure_quota(name, **kwargs)
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+class HostScheduler:
+    """
+    Enforce a minimum gap between requests to the same host.
+
+    Each call to `wait()` reserves the next free slot for the URL's netloc and
+    sleeps until it arrives, so concurrent workers hitting one host are spaced
+    out while requests to unrelated hosts go through immediately.
+    """
+
+    # Hosts whose slot has already passed are forgotten once the table grows past this.
+    MAX_TRACKED_HOSTS = 10000
+
+    def __init__(self, min_gap=1.0):
+        self.min_gap = min_gap
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_key(url):
+        return (urlparse(url).netloc or url).lower()
+
+    def wait(self, url, min_gap=None):
+        """Block until a request to `url`'s host is allowed. Returns the seconds slept."""
+        gap = self.min_gap if min_gap is None else min_gap
+        key = self.host_key(url)
+        with self._lock:
+            now = time.monotonic()
+            if len(self._next_slot) > self.MAX_TRACKED_HOSTS:
+                self._next_slot = {k: v for k, v in self._next_slot.items() if v > now}
+            slot = max(now, self._next_slot.get(key, now))
+            self._next_slot[key] = slot + max(0.0, gap)
+        pause = slot - now
+        if pause > 0:
+            time.sleep(pause)
+        return pause
+
+    def reset(self):
+        with self._lock:
+            self._next_slot.clear()
+
+
+HOST_SCHEDULER = HostScheduler()
+
+
+class QuotaExhausted(RuntimeError):
+    """Raised when a provider's per-run call budget (max_calls) is used up."""
+
+
+class ProviderQuota:
+    """
+    Shared budget for a paid API (SerpApi, Scrapfly, ...), used by every thread
+    that calls it: at most `concurrency` calls in flight, call starts spaced to
+    `per_minute`, and optionally at most `max_calls` calls for the whole run.
+    Defaults can be overridden with QUOTA_<NAME>_CONCURRENCY / _RPM / _MAX_CALLS.
+    """
+
+    def __init__(self, name, concurrency=4, per_minute=60, max_calls=None):
+        prefix = f"QUOTA_{name.upper()}_"
+        self.name = name
+        self.concurrency = int(os.getenv(prefix + 'CONCURRENCY') or concurrency)
+        self.per_minute = float(os.getenv(prefix + 'RPM') or per_minute or 0)
+        max_env = os.getenv(prefix + 'MAX_CALLS')
+        self.max_calls = int(max_env) if max_env else max_calls
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, self.concurrency))
+        self._pacer = HostScheduler(min_gap=60.0 / self.per_minute if self.per_minute else 0.0)
+
+    @contextmanager
+    def slot(self):
+        """Hold one call's worth of quota for the duration of the `with` block."""
+        with self._lock:
+            if self.max_calls is not None and self.calls >= self.max_calls:
+                raise QuotaExhausted(f"{self.name}: call budget of {self.max_calls} used up")
+            self.calls += 1
+        with self._slots:
+            self._pacer.wait(self.name)
+            yield
+
+    def snapshot(self):
+        return {'calls': self.calls, 'max_calls': self.max_calls,
+                'concurrency': self.concurrency, 'per_minute': self.per_minute}
+
+
+# Conservative defaults per provider: (concurrency, calls per minute)
+QUOTA_DEFAULTS = {
+    'serpapi': (4, 60),
+    'scrapfly': (5, 60),
+    'scraperapi': (5, 60),
+}
+
+_QUOTAS = {}
+_QUOTAS_LOCK = threading.Lock()
+
+
+def provider_quota(name):
+    """The process-wide ProviderQuota for `name`, created from QUOTA_DEFAULTS on first use."""
+    quota = _QUOTAS.get(name)
+    if quota is None:
+        with _QUOTAS_LOCK:
+            quota = _QUOTAS.get(name)
+            if quota is None:
+                concurrency, per_minute = QUOTA_DEFAULTS.get(name, (4, 60))
+                quota = _QUOTAS[name] = ProviderQuota(name, concurrency, per_minute)
+    return quota
+
+
+def configure_quota(name, **kwargs):
+    """Replace `name`'s quota (calls already in flight finish under the old one)."""
+    with _QUOTAS_LOCK:
+        _QUOTAS[name] = ProviderQuota(name, **kwargs)
+    return _QUOTAS[name]
+
+
+def quota_snapshots():
+    with _QUOTAS_LOCK:
+        return {name: q.snapshot() for name, q in _QUOTAS.items()}
+
+
+__all__ = ['HostScheduler', 'HOST_SCHEDULER', 'ProviderQuota', 'QuotaExhausted', 'QUOTA_DEFAULTS',
+           'provider_quota', 'configure_quota', 'quota_snapshots']
@@ -0,0 +1,74 @@
+# modules/tokenizer.py
+"""
+Token counting for prompt budgets.
+
+Uses tiktoken when it is installed and its encoding files are available;
+otherwise falls back to the ~4 characters per token estimate so budgets still
+work offline. tiktoken is imported on the first count, not at import time.
+Exports:
+  - count_tokens(text, model=None)
+  - truncate_to_tokens(text, max_tokens, model=None)
+  - exact_tokenizer(model=None) -> bool
+"""
+import logging
+import threading
+
+DEFAULT_ENCODING = 'cl100k_base'
+CHARS_PER_TOKEN = 4
+
+_ENCODINGS = {}
+_LOCK = threading.Lock()
+
+
+def _encoding(model=None):
+    key = model or DEFAULT_ENCODING
+    if key not in _ENCODINGS:
+        with _LOCK:
+            if key not in _ENCODINGS:
+                enc = None
+                try:
+                    import tiktoken
+                except ImportError:
+                    _ENCODINGS[key] = None
+                    return None
+                try:
+                    enc = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(DEFAULT_ENCODING)
+                except KeyError:
+                    try:
+                        enc = tiktoken.get_encoding(DEFAULT_ENCODING)
+                    except Exception as e:
+                        logging.debug("tiktoken encoding unavailable (%s); estimating tokens", e)
+                except Exception as e:  # e.g. encoding file can't be downloaded
+                    logging.debug("tiktoken encoding unavailable (%s); estimating tokens", e)
+                _ENCODINGS[key] = enc
+    return _ENCODINGS[key]
+
+
+def exact_tokenizer(model=None):
+    """True when counts come from the real tokenizer rather than the character estimate."""
+    return _encoding(model) is not None
+
+
+def count_tokens(text, model=None):
+    if not text:
+        return 0
+    enc = _encoding(model)
+    if enc is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text, max_tokens, model=None):
+    """Cut `text` so that it is at most `max_tokens` tokens long."""
+    if not text or max_tokens <= 0:
+        return ''
+    enc = _encoding(model)
+    if enc is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens])
+
+
+__all__ = ['count_tokens', 'truncate_to_tokens', 'exact_tokenizer']
@@ -0,0 +1,222 @@
+# modules/url_index.py
+"""
+URL canonicalisation and the registrable-domain index used to drop duplicate
+leads before anything is fetched.
+
+canonical_url() folds the variants one business site shows up under
+(http/https, www., default ports, trailing slash, fragment, utm_* and other
+tracking parameters) into one string. registrable_domain() reduces a URL to
+the name a business actually registered (shop.example.co.uk -> example.co.uk)
+using the Public Suffix List bundled with tldextract, including its private
+section so tenants of shared hosts (foo.wixsite.com) stay distinct; without
+tldextract a small built-in suffix table is used.
+
+site_key() is what leads are deduplicated on: the registrable domain, except
+on hosts where many businesses live under a path (facebook.com/joesplumbing,
+sites.google.com/view/acme), where the first meaningful path segment is kept
+so each business stays distinct. DomainIndex is a thread-safe set of site keys.
+Ingestion, discovery and OutreachLogger each keep one, so a site is fetched and
+emailed at most once no matter how its URL was written.
+
+Malformed URLs (bad port, unbalanced IPv6 bracket) give '' from every function
+here; unique_leads passes such leads through for the fetch stage to reject.
+Exports:
+  - canonical_url(url)
+  - registrable_domain(url)
+  - site_key(url)
+  - DomainIndex(urls=())
+  - unique_leads(leads, index, skip=None)
+"""
+import ipaddress
+import logging
+import threading
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = frozenset({
+    'gclid', 'gclsrc', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'ref', 'ref_src', 'srsltid',
+})
+TRACKING_PREFIXES = ('utm_', 'pk_', 'mtm_')
+
+# Fallback when tldextract is missing: common multi-label public suffixes and shared hosts
+_MULTI_LABEL_SUFFIXES = frozenset({
+    'co.uk', 'org.uk', 'me.uk', 'ltd.uk', 'plc.uk', 'ac.uk', 'gov.uk', 'com.au', 'net.au', 'org.au',
+    'co.nz', 'org.nz', 'co.za', 'com.br', 'com.mx', 'co.jp', 'co.in', 'co.il', 'co.kr', 'com.sg',
+    'com.hk', 'com.cn', 'com.tr', 'com.ar',
+    'github.io', 'blogspot.com', 'wixsite.com', 'wordpress.com', 'squarespace.com', 'weebly.com',
+    'myshopify.com', 'godaddysites.com', 'herokuapp.com', 'netlify.app', 'vercel.app', 'web.app',
+})
+
+# Hosts (and their subdomains, e.g. m.facebook.com) that serve many businesses under paths
+PATH_HOSTED = frozenset({
+    'facebook.com', 'fb.com', 'instagram.com', 'sites.google.com', 'business.google.com', 'linktr.ee',
+    'linkedin.com', 'twitter.com', 'x.com', 'tiktok.com', 'youtube.com', 'pinterest.com', 'yelp.com',
+    'nextdoor.com', 'tumblr.com', 'medium.com', 'about.me', 'carrd.co',
+})
+# Path segments that only group pages on those hosts (facebook.com/pages/..., sites.google.com/view/...)
+_CONTAINER_SEGMENTS = frozenset({'pages', 'pg', 'people', 'groups', 'view', 'site', 'company', 'in', 'biz',
+                                 'channel', 'c', 'user', 'profile.php'})
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def _tld_extractor():
+    """tldextract with its bundled suffix list (no network), or False when it isn't installed."""
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                try:
+                    import tldextract
+                    _extractor = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None,
+                                                       include_psl_private_domains=True)
+                except ImportError:
+                    logging.debug("tldextract not installed; using the built-in suffix table")
+                    _extractor = False
+    return _extractor
+
+
+def _host(url):
+    parts = urlsplit(url if '//' in url else '//' + url)
+    host = (parts.hostname or '').rstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+
+@lru_cache(maxsize=65536)
+def registrable_domain(url):
+    """Registrable domain of a URL or bare host ('' if there is none). IPs and single-label hosts are returned as-is."""
+    canonical = canonical_url(url)
+    host = (urlsplit(canonical).hostname or '') if canonical else ''
+    if not host or '.' not in host:
+        return host
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    extractor = _tld_extractor()
+    if extractor:
+        parts = extractor(host)
+        domain = getattr(parts, 'top_domain_under_public_suffix', None) or parts.registered_domain
+        return domain or host
+    labels = host.split('.')
+    size = 3 if '.'.join(labels[-2:]) in _MULTI_LABEL_SUFFIXES else 2
+    return '.'.join(labels[-size:])
+
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+@lru_cache(maxsize=65536)
+def canonical_url(url):
+    """
+    One string per page regardless of how the URL was written: https, lowercase
+    host without www. or default port, no fragment, no trailing slash, tracking
+    parameters removed and the rest sorted. '' for a URL with no usable host.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url if '//' in url else '//' + url)
+        host = _host(url)
+        port = parts.port if parts.port not in (None, 80, 443) else None
+    except ValueError:
+        return ''
+    if not host:
+        return ''
+    netloc = f"{host}:{port}" if port else host
+    path = parts.path.rstrip('/')
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)))
+    return urlunsplit(('https', netloc, path, query, ''))
+
+
+def _path_hosted(host):
+    for candidate in PATH_HOSTED:
+        if host == candidate or host.endswith('.' + candidate):
+            return candidate
+    return None
+
+
+@lru_cache(maxsize=65536)
+def site_key(url):
+    """
+    The registrable domain, or for a business hosted under a path on a shared host
+    (PATH_HOSTED) that host plus the business's path segment: facebook.com/joesplumbing.
+    """
+    domain = registrable_domain(url)
+    if not domain:
+        return ''
+    canonical = canonical_url(url)
+    parts = urlsplit(canonical)
+    shared = _path_hosted(parts.hostname or '')
+    if not shared:
+        return domain
+    segments = [seg for seg in parts.path.lower().split('/') if seg]
+    kept = []
+    for seg in segments:
+        kept.append(seg)
+        if seg not in _CONTAINER_SEGMENTS:
+            break
+    if shared == 'facebook.com' and segments[:1] == ['profile.php']:
+        # facebook.com/profile.php?id=123: the ID is the page
+        kept.append(dict(parse_qsl(parts.query)).get('id', ''))
+    return '/'.join([shared, *kept]) if kept else shared
+
+
+class DomainIndex:
+    """Thread-safe set of site keys (see site_key)."""
+
+    def __init__(self, urls=()):
+        self._domains = {d for d in map(site_key, urls) if d}
+        self._lock = threading.Lock()
+
+    def __contains__(self, url):
+        domain = site_key(url)
+        return bool(domain) and domain in self._domains
+
+    def __len__(self):
+        return len(self._domains)
+
+    def add(self, url):
+        domain = site_key(url)
+        if domain:
+            with self._lock:
+                self._domains.add(domain)
+
+    def claim(self, url):
+        """Add `url`'s site key; True if it was new, False if it was already indexed."""
+        domain = site_key(url)
+        if not domain:
+            return True
+        with self._lock:
+            if domain in self._domains:
+                return False
+            self._domains.add(domain)
+            return True
+
+
+def unique_leads(leads, index, skip=None):
+    """
+    Yield the leads whose site `index` hasn't seen yet, claiming it as they pass.
+    `skip(url)` can veto further leads (e.g. OutreachLogger.already_processed).
+    Leads without a URL, or with one too malformed to key, are passed through for
+    the pipeline to reject.
+    """
+    for lead in leads:
+        url = lead.get('url')
+        if not url:
+            yield lead
+            continue
+        if skip is not None and skip(url):
+            logging.info(f"Skipping already processed URL: {url}")
+            continue
+        if not index.claim(url):
+            logging.info(f"Skipping duplicate site: {url}")
+            continue
+        yield lead
+
+
+__all__ = ['canonical_url', 'registrable_domain', 'site_key', 'DomainIndex', 'unique_leads', 'TRACKING_PARAMS']
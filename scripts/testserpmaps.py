@@ -2,16 +2,18 @@
 import os
 import csv
 import argparse
-import requests
+import sys
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.discovery_cache import configure_discovery_cache, serpapi_search
+
 load_dotenv()
 
-def maps_scrape(lat, lng, query, limit):
+def maps_scrape(lat, lng, query, limit, refresh=False):
     key = os.getenv("SERPAPI_KEY")
     if not key:
         raise RuntimeError("SERPAPI_KEY not set in .env")
-    url = "https://serpapi.com/search.json"
     params = {
         "engine": "google_maps",
         "q": query,
@@ -19,9 +21,7 @@ def maps_scrape(lat, lng, query, limit):
         "type": "search",
         "api_key": key
     }
-    r = requests.get(url, params=params, timeout=30)
-    r.raise_for_status()
-    data = r.json()
+    data = serpapi_search(params, refresh=refresh)
     return data.get("places_results", [])[:limit]
 
 if __name__ == "__main__":
@@ -31,9 +31,12 @@ if __name__ == "__main__":
     parser.add_argument("--query", type=str, required=True)
     parser.add_argument("--limit", type=int, default=50)
     parser.add_argument("--out", type=str, default="maps_results.csv")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cached response and query SerpApi again")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the discovery cache")
     args = parser.parse_args()
+    configure_discovery_cache(enabled=not args.no_cache)
 
-    places = maps_scrape(args.lat, args.lng, args.query, args.limit)
+    places = maps_scrape(args.lat, args.lng, args.query, args.limit, refresh=args.refresh)
 
     with open(args.out, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=["title", "address", "phone", "website"])
@@ -0,0 +1,53 @@
+# tests/test_sanitizer.py
+"""modules.sanitizer must keep producing what the original multi-pass _sanitize_text did."""
+import random
+import re
+
+import pytest
+
+from modules.sanitizer import sanitize
+
+
+def _old_sanitize_text(text):
+    # email_generator._sanitize_text as it was before modules.sanitizer (the reference)
+    if not text:
+        return text
+    text = re.sub(r'\[.*?\]', '', text)
+    text = re.sub(r'\{.*?\}', '', text)
+    text = re.sub(r'<.*?>', '', text)
+    for p in [r'as an ai language model', r'i am an ai', r'as an ai', r'i\'m an ai',
+              r'i am a language model', r'as a language model']:
+        text = re.sub(p, '', text, flags=re.IGNORECASE)
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        placeholders = {'your name', 'your company', 'company name', '[name]', 'name', '[company]', 'your title'}
+        lower = stripped.lower()
+        if (len(stripped) < 40) and any(tok in lower for tok in placeholders):
+            continue
+        lines.append(line)
+    text = '\n'.join(lines)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+@pytest.mark.parametrize('text', [
+    'as an [x]ai hello',                   # phrase only exists once the placeholder is gone
+    'As an {tok}AI language model, hi',
+    '}<{>b }>',
+    '{a[b}c]',
+    'Hi [Name],\n\n\n\nYour Name\nAs an AI, I noticed <b>this</b>.',
+    "I'm an aiı and İ am an AI",  # non-ASCII letters that IGNORECASE folds
+    '',
+])
+def test_matches_old_passes(text):
+    assert sanitize(text, placeholder_lines=True) == _old_sanitize_text(text)
+
+
+def test_matches_old_passes_fuzz():
+    rng = random.Random(17)
+    alphabet = list('[]{}<>ab \n') + ['as an ', 'ai', ' language model', "i'm ", 'I AM AN AI', 'name',
+                                       'x\n\n\n', 'ı', 'ſ']
+    for _ in range(5000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 25)))
+        assert sanitize(text, placeholder_lines=True) == _old_sanitize_text(text), repr(text)
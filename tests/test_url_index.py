@@ -0,0 +1,49 @@
+# tests/test_url_index.py
+"""Canonicalisation and site keys used to deduplicate leads (modules.url_index)."""
+import pytest
+
+from modules.url_index import DomainIndex, canonical_url, registrable_domain, site_key
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('http://example.com', 'https://example.com'),
+    ('https://www.example.com/', 'https://example.com'),
+    ('HTTPS://WWW.Example.COM/About/', 'https://example.com/About'),
+    ('https://example.com/?utm_source=maps&utm_medium=x&page=2', 'https://example.com?page=2'),
+    ('https://example.com/?gclid=abc#contact', 'https://example.com'),
+])
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected
+
+
+@pytest.mark.parametrize('url', ['http://example.com:99999/', 'http://example.com:abc/', 'http://[::1/', '', '/about'])
+def test_malformed_urls_have_no_key(url):
+    assert canonical_url(url) == ''
+    assert registrable_domain(url) == ''
+    assert site_key(url) == ''
+
+
+def test_same_site_variants_share_a_key():
+    variants = ['http://example.com', 'https://www.example.com/', 'https://example.com/?utm_source=x',
+                'https://example.com/services/plumbing/']
+    assert {site_key(u) for u in variants} == {'example.com'}
+
+
+def test_path_hosted_businesses_stay_distinct():
+    assert site_key('https://www.facebook.com/joesplumbing/') == 'facebook.com/joesplumbing'
+    assert site_key('https://facebook.com/joesplumbing/about') == 'facebook.com/joesplumbing'
+    assert site_key('https://www.facebook.com/annsbakery') != site_key('https://www.facebook.com/joesplumbing')
+    assert site_key('https://m.facebook.com/profile.php?id=42') == site_key('https://www.facebook.com/profile.php?id=42')
+    assert site_key('https://www.facebook.com/profile.php?id=42') != site_key('https://www.facebook.com/profile.php?id=43')
+    assert site_key('https://sites.google.com/view/joes/home') == 'sites.google.com/view/joes'
+
+
+def test_domain_index_claims_once():
+    index = DomainIndex()
+    assert index.claim('https://www.example.com/')
+    assert not index.claim('http://example.com/contact?utm_source=x')
+    assert index.claim('https://facebook.com/joesplumbing')
+    assert index.claim('https://facebook.com/annsbakery')
+    # no key: passed through for the pipeline to reject, and never indexed
+    assert index.claim('http://example.com:abc/')
+    assert len(index) == 3